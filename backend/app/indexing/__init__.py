@@ -0,0 +1,4 @@
+# ==========================================================
+# LexChain — shared indexing pipeline (embedding, index build)
+# ==========================================================
+# Used by the /ingest router, build_index.py and tools/ingest_*.py.
@@ -0,0 +1,82 @@
+# ==========================================================
+# LexChain — Paragraph-Aware Token Chunker
+# ==========================================================
+# Packs whole judgment paragraphs (as produced by
+# normalize.split_paragraphs, separated by blank lines) into
+# chunks of at most CHUNK_TOKENS tokens of the embedding
+# model's tokenizer (for a local model, never more than it
+# embeds without truncating). Only a paragraph that is too long on its
+# own is cut, at sentence boundaries where possible. Chunks do
+# not overlap; each one records its ordinal and the IDs of its
+# neighbours so retrieval can widen context by ID lookup.
+# ==========================================================
+import os, re
+from typing import Any, Dict, List, Optional
+
+from .tokens import count_tokens, max_input_tokens
+
+# ---------- Config ----------
+CHUNKER_VERSION = 2            # bump when output changes, so delta ingest re-chunks everything
+CHUNK_TOKENS = int(os.getenv("LEXCHAIN_CHUNK_TOKENS", "400"))
+
+_SENTENCE_END = re.compile(r"(?<=[.;:?!”\"])\s+(?=[A-Z(“\"‘'\[])")
+
+def _split_long(text: str, model: str, max_tokens: int) -> List[str]:
+    """Cut one oversized paragraph at sentence boundaries, then at word boundaries."""
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        if count_tokens(sentence, model) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words, current, current_tokens = sentence.split(" "), [], 0
+        for w in words:
+            n = count_tokens(" " + w, model)
+            if current and current_tokens + n > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(w)
+            current_tokens += n
+        if current:
+            pieces.append(" ".join(current))
+    return _pack(pieces, model, max_tokens, sep=" ")
+
+def _pack(parts: List[str], model: str, max_tokens: int, sep: str) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    sep_tokens = count_tokens(sep, model) if sep.strip() else 0
+    for part in parts:
+        n = count_tokens(part, model)
+        if current and current_tokens + sep_tokens + n > max_tokens:
+            chunks.append(sep.join(current))
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += n + (sep_tokens if len(current) > 1 else 0)
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
+
+def chunk_text(text: str, model: str = "text-embedding-3-small", max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Greedily pack blank-line-separated paragraphs into chunks of ≤ max_tokens tokens."""
+    limit = max_input_tokens(model)
+    if limit is not None:
+        max_tokens = min(max_tokens, limit)
+    parts: List[str] = []
+    for para in (p.strip() for p in (text or "").split("\n\n")):
+        if not para:
+            continue
+        if count_tokens(para, model) > max_tokens:
+            parts.extend(_split_long(para, model, max_tokens))
+        else:
+            parts.append(para)
+    return _pack(parts, model, max_tokens, sep="\n\n")
+
+def link_metadata(ids: List[str]) -> List[Dict[str, Any]]:
+    """Per-chunk ordinal and neighbour IDs, aligned with `ids` (the chunks of one case, in order)."""
+    n = len(ids)
+    out: List[Dict[str, Any]] = []
+    for i, _ in enumerate(ids):
+        prev_id: Optional[str] = ids[i - 1] if i > 0 else None
+        next_id: Optional[str] = ids[i + 1] if i + 1 < n else None
+        out.append({"chunk": i, "n_chunks": n, "prev_id": prev_id, "next_id": next_id})
+    return out
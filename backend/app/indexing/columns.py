@@ -0,0 +1,247 @@
+# ==========================================================
+# LexChain — Columnar Chunk Metadata
+# ==========================================================
+# Typed side-table written next to each index build as
+# columns.npz, one row per FAISS row (same order as
+# index_to_docstore_id):
+#   doc_id       docstore ID (alignment check)
+#   case_key     e.g. en/cases/hkca/2004/110
+#   case         int32 ordinal of case_key (for grouping)
+#   chunk        ordinal of the chunk within its case
+#   year         int16, 0 = unknown
+#   date         proleptic ordinal of the judgment date, 0 = unknown
+#   court        int16 code into `courts`, -1 = unknown
+#   neutral_cit  e.g. [2004] HKCA 110
+#   topics       bool rows × len(`topics`), the case's topic tags
+# Metadata in the docstore is free-form (year as int or
+# string, court as "None", name or HKLII code); it is parsed
+# once here so filters, sorts and facets are array masks.
+# ==========================================================
+import os, re
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# ---------- Config ----------
+COLUMNS_FILE = "columns.npz"
+COLUMNS_VERSION = 3
+
+# Court names the extractor finds in page headers → HKLII court codes used in case keys
+COURT_CODES = {
+    "court of final appeal": "hkcfa",
+    "court of appeal": "hkca",
+    "court of first instance": "hkcfi",
+    "district court": "hkdc",
+    "magistrates’ court": "hkmagc",
+    "magistrates' court": "hkmagc",
+    "lands tribunal": "hkldt",
+    "family court": "hkfc",
+}
+
+_NULLS = {"", "none", "null", "nan", "unknown"}
+_YEAR = re.compile(r"^(1[89]|20)\d{2}$")
+
+# ---------- Parsing ----------
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    s = str(value).strip()
+    return None if s.lower() in _NULLS else s
+
+def parse_year(value: Any) -> int:
+    s = _clean(value)
+    if s is None:
+        return 0
+    s = s.split(".")[0]  # "2004.0" from pandas-written caches
+    return int(s) if _YEAR.match(s) else 0
+
+def parse_date(value: Any) -> int:
+    s = _clean(value)
+    if s is None:
+        return 0
+    try:
+        return date.fromisoformat(s[:10]).toordinal()
+    except ValueError:
+        return 0
+
+def court_code(meta: Dict[str, Any]) -> Optional[str]:
+    """HKLII court code from the case key, else from a court name or code in `court`."""
+    key = _clean(meta.get("case_key"))
+    parts = key.split("/") if key else []
+    if len(parts) >= 3 and parts[1] == "cases":
+        return parts[2]
+    court = _clean(meta.get("court"))
+    if court is None:
+        return None
+    return COURT_CODES.get(court.lower(), court.lower())
+
+# ---------- Table ----------
+class ColumnTable:
+    """Column arrays aligned with FAISS rows, plus the court and topic vocabularies."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], courts: Sequence[str], topics: Sequence[str] = ()):
+        self.columns = columns
+        self.courts = list(courts)
+        self.topics = list(topics)
+
+    def __len__(self) -> int:
+        return len(self.columns["doc_id"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @classmethod
+    def from_metadatas(cls, doc_ids: Sequence[str], metadatas: Iterable[Dict[str, Any]]) -> "ColumnTable":
+        doc_ids = list(doc_ids)
+        n = len(doc_ids)
+        year = np.zeros(n, dtype="int16")
+        day = np.zeros(n, dtype="int32")
+        court = np.full(n, -1, dtype="int16")
+        chunk = np.zeros(n, dtype="int32")
+        case_key: List[str] = []
+        neutral: List[str] = []
+        tagged: List[List[int]] = []
+        topics: Dict[str, int] = {}
+        case = np.zeros(n, dtype="int32")
+        courts: Dict[str, int] = {}
+        cases: Dict[str, int] = {}
+        for i, meta in enumerate(metadatas):
+            meta = meta or {}
+            day[i] = parse_date(meta.get("judgment_date") or meta.get("date"))
+            year[i] = parse_year(meta.get("year")) or (date.fromordinal(int(day[i])).year if day[i] else 0)
+            code = court_code(meta)
+            if code is not None:
+                court[i] = courts.setdefault(code, len(courts))
+            chunk[i] = int(meta.get("chunk") or 0)
+            case_key.append(_clean(meta.get("case_key")) or _clean(meta.get("id")) or doc_ids[i])
+            case[i] = cases.setdefault(case_key[-1], len(cases))
+            neutral.append(_clean(meta.get("neutral_cit")) or "")
+            tagged.append([topics.setdefault(t, len(topics)) for t in meta.get("topics") or []])
+        topic = np.zeros((n, len(topics)), dtype=bool)
+        for i, t in enumerate(tagged):
+            topic[i, t] = True
+        columns = {
+            "doc_id": np.array(doc_ids, dtype=str),
+            "case_key": np.array(case_key, dtype=str),
+            "case": case,
+            "chunk": chunk,
+            "year": year,
+            "date": day,
+            "court": court,
+            "neutral_cit": np.array(neutral, dtype=str),
+            "topics": topic,
+        }
+        return cls(columns, sorted(courts, key=courts.get), sorted(topics, key=topics.get))
+
+    @classmethod
+    def from_vectorstore(cls, vs) -> "ColumnTable":
+        """Parse the docstore metadata of every row, in FAISS row order."""
+        ids = [vs.index_to_docstore_id[i] for i in range(vs.index.ntotal)]
+        return cls.from_metadatas(ids, (getattr(vs.docstore.search(i), "metadata", None) for i in ids))
+
+    # ----- persistence -----
+    def save(self, folder: Path):
+        folder = Path(folder)
+        tmp = folder / (COLUMNS_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, version=np.array(COLUMNS_VERSION), courts=np.array(self.courts, dtype=str),
+                     topic_names=np.array(self.topics, dtype=str), **self.columns)
+        os.replace(tmp, folder / COLUMNS_FILE)
+
+    @classmethod
+    def load(cls, folder: Path) -> Optional["ColumnTable"]:
+        p = Path(folder) / COLUMNS_FILE
+        if not p.exists():
+            return None
+        with np.load(p, allow_pickle=False) as z:
+            if int(z["version"]) != COLUMNS_VERSION:
+                return None
+            courts = z["courts"].tolist()
+            topics = z["topic_names"].tolist()
+            columns = {k: z[k] for k in z.files if k not in ("version", "courts", "topic_names")}
+        return cls(columns, courts, topics)
+
+    # ----- queries -----
+    def court_ids(self, codes: Iterable[str]) -> List[int]:
+        lookup = {c: i for i, c in enumerate(self.courts)}
+        return [lookup[c] for c in (COURT_CODES.get(x.lower(), x.lower()) for x in codes) if c in lookup]
+
+    def mask(self, courts: Optional[Iterable[str]] = None, year_from: Optional[int] = None,
+             year_to: Optional[int] = None, topics: Optional[Iterable[str]] = None,
+             rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Boolean mask over `rows` (default: all rows) for the given court
+        codes/names, year range and topics (any of them).
+        """
+        idx = np.arange(len(self)) if rows is None else np.asarray(rows, dtype="int64")
+        keep = np.ones(len(idx), dtype=bool)
+        if courts:
+            keep &= np.isin(self.columns["court"][idx], self.court_ids(courts))
+        year = self.columns["year"][idx]
+        if year_from is not None:
+            keep &= year >= year_from
+        if year_to is not None:
+            keep &= (year <= year_to) & (year > 0)
+        if topics:
+            lookup = {t.lower(): i for i, t in enumerate(self.topics)}
+            cols = [lookup[t.lower()] for t in topics if t.lower() in lookup]
+            keep &= self.columns["topics"][idx][:, cols].any(axis=1) if cols else False
+        return keep
+
+    def first_per_case(self, rows: np.ndarray) -> np.ndarray:
+        """`rows` with only the first (best-ranked) row of each case, order kept."""
+        rows = np.asarray(rows, dtype="int64")
+        _, first = np.unique(self.columns["case"][rows], return_index=True)
+        return rows[np.sort(first)]
+
+    def histograms(self, rows: np.ndarray, year_bucket: int = 1) -> Dict[str, List[Dict[str, Any]]]:
+        """Counts of `rows` per court, topic and year bucket (unknown values last), largest/earliest first."""
+        rows = np.asarray(rows, dtype="int64")
+        court = self.columns["court"][rows]
+        counts = np.bincount(court[court >= 0], minlength=len(self.courts))
+        by_court = [{"value": self.courts[i], "count": int(counts[i])}
+                    for i in np.argsort(-counts, kind="stable") if counts[i]]
+        if (court < 0).any():
+            by_court.append({"value": None, "count": int((court < 0).sum())})
+
+        year = self.columns["year"][rows].astype("int32")
+        known = year[year > 0]
+        by_year: List[Dict[str, Any]] = []
+        if len(known):
+            bucket = max(1, year_bucket)
+            starts, n = np.unique(known - known % bucket, return_counts=True)
+            by_year = [{"from": int(y), "to": int(y) + bucket - 1, "count": int(c)} for y, c in zip(starts, n)]
+        if (year <= 0).any():
+            by_year.append({"from": None, "to": None, "count": int((year <= 0).sum())})
+        tagged = self.columns["topics"][rows].sum(axis=0)
+        by_topic = [{"value": self.topics[i], "count": int(tagged[i])}
+                    for i in np.argsort(-tagged, kind="stable") if tagged[i]]
+        return {"court": by_court, "year": by_year, "topic": by_topic}
+
+    def is_aligned(self, vs) -> bool:
+        n = vs.index.ntotal
+        if len(self) != n:
+            return False
+        # Spot-check the ends and a stride through the middle
+        probe = np.unique(np.linspace(0, n - 1, num=min(n, 64), dtype="int64")) if n else []
+        return all(self.columns["doc_id"][i] == vs.index_to_docstore_id[int(i)] for i in probe)
+
+# ---------- Index folder helpers ----------
+def write_columns(vs, folder: Path) -> ColumnTable:
+    """Build and save the side-table for `vs`; call after vs.save_local(folder)."""
+    table = ColumnTable.from_vectorstore(vs)
+    table.save(folder)
+    return table
+
+def columns_for(vs) -> ColumnTable:
+    """
+    Column table of a loaded vector store: the saved columns.npz when it is
+    still aligned with the index, else parsed from the docstore (and kept).
+    """
+    table = getattr(vs, "columns", None)
+    if table is None or not table.is_aligned(vs):
+        table = ColumnTable.from_vectorstore(vs)
+        vs.columns = table
+    return table
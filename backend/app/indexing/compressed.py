@@ -0,0 +1,299 @@
+# ==========================================================
+# LexChain — Compressed FAISS Storage with Exact Re-rank
+# ==========================================================
+# text-embedding-3-large vectors are 3072 float32 (12 KB per
+# chunk), all of it held in RAM by a flat index. Builds can
+# instead keep a compressed copy in the FAISS index:
+#   - Matryoshka truncation to the first LEXCHAIN_INDEX_DIM
+#     dimensions (re-normalized; text-embedding-3 is trained
+#     for this), and/or
+#   - scalar quantization: sq8 (1 byte/dim) or fp16 (2 bytes).
+# The full-precision vectors go to vectors.f32 next to the
+# index, row-aligned with it and memory-mapped at query
+# time: the top candidates of the compressed search are
+# re-scored exactly against them, so only the few rows read
+# per query are paged in.
+# ==========================================================
+import json, os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from .columns import ColumnTable
+
+# ---------- Config ----------
+STORAGE = os.getenv("LEXCHAIN_INDEX_STORAGE", "flat").lower()   # flat | sq8 | fp16
+INDEX_DIM = int(os.getenv("LEXCHAIN_INDEX_DIM", "0"))            # 0 = keep the model's full dimension
+RERANK_OVERSAMPLE = int(os.getenv("LEXCHAIN_RERANK_OVERSAMPLE", "4"))
+
+FULL_VECTORS_FILE = "vectors.f32"
+COMPRESSION_FILE = "compression.json"
+_BLOCK_ROWS = 4096
+
+def make_index(dim: int, storage: str):
+    import faiss
+    if storage == "flat":
+        return faiss.IndexFlatL2(dim)
+    qtypes = {"sq8": faiss.ScalarQuantizer.QT_8bit, "fp16": faiss.ScalarQuantizer.QT_fp16}
+    if storage not in qtypes:
+        raise ValueError(f"Unknown LEXCHAIN_INDEX_STORAGE: {storage} (expected flat, sq8 or fp16)")
+    return faiss.IndexScalarQuantizer(dim, qtypes[storage], faiss.METRIC_L2)
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """First `dim` dimensions of each row, re-normalized to unit length."""
+    out = np.ascontiguousarray(vectors[:, :dim], dtype="float32")
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return out / norms
+
+class CompressedFAISS(FAISS):
+    """
+    FAISS vector store whose index holds compressed vectors. Searches
+    over-fetch from the index and re-rank exactly against the full
+    vectors; add/delete keep the side file row-aligned (written on save).
+    """
+
+    def __init__(self, *args, dim: int, full_dim: int, storage: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dim = dim
+        self.full_dim = full_dim
+        self.storage = storage
+        self.oversample = max(1, RERANK_OVERSAMPLE)
+        self._base: Optional[np.ndarray] = None     # memmap of vectors.f32 as last saved
+        self._added: List[np.ndarray] = []          # full vectors added since
+        self._rows = np.zeros(0, dtype="int64")     # index row → row in base (or base+added)
+
+    # ----- full-precision side file -----
+    def _open_full(self, folder: Path):
+        path = Path(folder) / FULL_VECTORS_FILE
+        n = path.stat().st_size // (4 * self.full_dim) if path.exists() else 0
+        self._base = np.memmap(path, dtype="float32", mode="r", shape=(n, self.full_dim)) if n else None
+        self._added = []
+        self._rows = np.arange(n, dtype="int64")
+
+    def full_vectors(self, positions: Sequence[int]) -> np.ndarray:
+        """Full-precision vectors for index rows `positions`."""
+        src = self._rows[np.asarray(positions, dtype="int64")]
+        n_base = 0 if self._base is None else self._base.shape[0]
+        out = np.empty((len(src), self.full_dim), dtype="float32")
+        in_base = src < n_base
+        if in_base.any():
+            out[in_base] = self._base[src[in_base]]
+        if (~in_base).any():
+            added = np.vstack(self._added) if len(self._added) > 1 else self._added[0]
+            self._added = [added]
+            out[~in_base] = added[src[~in_base] - n_base]
+        return out
+
+    def _compress(self, vectors: np.ndarray) -> np.ndarray:
+        if self.dim < self.full_dim:
+            return truncate(vectors, self.dim)
+        return np.ascontiguousarray(vectors, dtype="float32")
+
+    # ----- writes -----
+    def add_embeddings(self, text_embeddings: Iterable[Tuple[str, List[float]]],
+                       metadatas: Optional[Iterable[dict]] = None,
+                       ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts, vectors = zip(*text_embeddings)
+        full = np.asarray(vectors, dtype="float32")
+        n_before = (0 if self._base is None else self._base.shape[0]) + sum(a.shape[0] for a in self._added)
+        ids = super().add_embeddings(zip(texts, self._compress(full)), metadatas=metadatas, ids=ids, **kwargs)
+        self._added.append(full)
+        self._rows = np.concatenate([self._rows, np.arange(n_before, n_before + len(full), dtype="int64")])
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(zip(texts, self._embed_documents(texts)), metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        reversed_index = {id_: idx for idx, id_ in self.index_to_docstore_id.items()}
+        positions = sorted(reversed_index[i] for i in (ids or []) if i in reversed_index)
+        ok = super().delete(ids, **kwargs)
+        self._rows = np.delete(self._rows, positions)
+        return ok
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        super().save_local(folder_path, index_name)
+        folder = Path(folder_path)
+        tmp = folder / (FULL_VECTORS_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            for start in range(0, len(self._rows), _BLOCK_ROWS):
+                f.write(self.full_vectors(range(start, min(start + _BLOCK_ROWS, len(self._rows)))).tobytes())
+        os.replace(tmp, folder / FULL_VECTORS_FILE)
+        info = read_compression(folder) or {}
+        info.update({"storage": self.storage, "dim": self.dim, "full_dim": self.full_dim, "rows": len(self._rows)})
+        write_compression(folder, info)
+        self._open_full(folder)
+
+    # ----- reads -----
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Compressed search for k×oversample candidates, then exact L2 re-rank on the full vectors."""
+        query = np.asarray([embedding], dtype="float32")
+        wanted = k if filter is None else fetch_k
+        _, indices = self.index.search(self._compress(query), wanted * self.oversample)
+        cand = indices[0][indices[0] != -1]
+        if not len(cand):
+            return []
+        exact = ((self.full_vectors(cand) - query) ** 2).sum(axis=1)
+        order = np.argsort(exact)[:wanted]
+
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+        score_threshold = kwargs.get("score_threshold")
+        docs: List[Tuple[Document, float]] = []
+        for j in order:
+            _id = self.index_to_docstore_id[int(cand[j])]
+            doc = self.docstore.search(_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {_id}, got {doc}")
+            if filter_func is not None and not filter_func(doc.metadata):
+                continue
+            if score_threshold is not None and exact[j] > score_threshold:
+                continue
+            docs.append((doc, float(exact[j])))
+        return docs[:k]
+
+    def max_marginal_relevance_search_with_score_by_vector(self, embedding: List[float], **kwargs: Any):
+        # MMR works on reconstructed index vectors, so it runs in the compressed space
+        query = self._compress(np.asarray([embedding], dtype="float32"))[0]
+        return super().max_marginal_relevance_search_with_score_by_vector(query.tolist(), **kwargs)
+
+    # ----- construction -----
+    @classmethod
+    def from_vectors(cls, texts: Sequence[str], vectors: np.ndarray, embedding, metadatas=None, ids=None,
+                     storage: str = STORAGE, dim: int = INDEX_DIM) -> "CompressedFAISS":
+        full = np.asarray(vectors, dtype="float32")
+        full_dim = full.shape[1]
+        dim = dim if 0 < dim < full_dim else full_dim
+        index = make_index(dim, storage)
+        if not index.is_trained:
+            index.train(truncate(full, dim) if dim < full_dim else full)
+        vs = cls(embedding, index, InMemoryDocstore(), {}, dim=dim, full_dim=full_dim, storage=storage)
+        vs.add_embeddings(zip(texts, full), metadatas=metadatas, ids=ids)
+        return vs
+
+    @classmethod
+    def load(cls, folder_path: str, embeddings) -> "CompressedFAISS":
+        info = read_compression(Path(folder_path))
+        vs = cls.load_local(folder_path, embeddings, allow_dangerous_deserialization=True,
+                            dim=info["dim"], full_dim=info["full_dim"], storage=info["storage"])
+        vs._open_full(Path(folder_path))
+        return vs
+
+# ---------- Index folder helpers ----------
+def read_compression(folder: Path) -> Optional[Dict[str, Any]]:
+    p = Path(folder) / COMPRESSION_FILE
+    if not p.exists():
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_compression(folder: Path, info: Dict[str, Any]):
+    p = Path(folder) / COMPRESSION_FILE
+    tmp = p.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp, p)
+
+def compression_enabled(storage: str = STORAGE, dim: int = INDEX_DIM) -> bool:
+    return storage != "flat" or dim > 0
+
+def load_vectorstore(folder_path: str, embeddings) -> FAISS:
+    """Load an index folder, compressed or plain, with its column table (None if not written)."""
+    if read_compression(Path(folder_path)) is not None:
+        vs = CompressedFAISS.load(folder_path, embeddings)
+    else:
+        vs = FAISS.load_local(folder_path, embeddings, allow_dangerous_deserialization=True)
+    vs.columns = ColumnTable.load(Path(folder_path))
+    return vs
+
+def build_vectorstore(texts: Sequence[str], vectors: np.ndarray, embeddings, metadatas=None, ids=None,
+                      storage: str = STORAGE, dim: int = INDEX_DIM) -> FAISS:
+    """New index from precomputed vectors, compressed when LEXCHAIN_INDEX_STORAGE/DIM ask for it."""
+    if compression_enabled(storage, dim):
+        return CompressedFAISS.from_vectors(texts, vectors, embeddings, metadatas, ids, storage, dim)
+    return FAISS.from_embeddings(zip(texts, np.asarray(vectors).tolist()), embeddings, metadatas=metadatas, ids=ids)
+
+def row_vectors(vs: FAISS, rows: Sequence[int]) -> np.ndarray:
+    """Full-precision vectors of FAISS rows (side file if compressed, else reconstructed)."""
+    if isinstance(vs, CompressedFAISS):
+        return vs.full_vectors(rows)
+    return np.vstack([vs.index.reconstruct(int(r)) for r in rows]) if len(rows) else np.zeros((0, vs.index.d), "float32")
+
+def search_rows(vs: FAISS, embedding: Sequence[float], k: int,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    FAISS rows and L2 distances of the k nearest chunks, nearest first. With
+    `mask` (one bool per row, e.g. from the column table) FAISS only scores
+    rows where it is True, so filters never cost extra results.
+    """
+    import faiss
+    query = np.asarray([embedding], dtype="float32")
+    params = None
+    if mask is not None:
+        bits = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits)))
+    if isinstance(vs, CompressedFAISS):
+        _, rows = vs.index.search(vs._compress(query), k * vs.oversample, params=params)
+        rows = rows[0][rows[0] != -1]
+        exact = ((vs.full_vectors(rows) - query) ** 2).sum(axis=1)
+        order = np.argsort(exact)[:k]
+        return rows[order], exact[order]
+    dist, rows = vs.index.search(query, k, params=params)
+    keep = rows[0] != -1
+    return rows[0][keep], dist[0][keep]
+
+# ---------- Build report ----------
+def evaluate(vs: FAISS, vectors: np.ndarray, n_queries: int = 200, k: int = 10, seed: int = 0) -> Dict[str, Any]:
+    """
+    Memory per million chunks and recall@k of the compressed index against
+    exact search over the full vectors, using sampled chunks as queries.
+    """
+    import faiss
+    full = np.asarray(vectors, dtype="float32")
+    n, full_dim = full.shape
+    code_size = vs.index.sa_code_size()
+    report: Dict[str, Any] = {
+        "chunks": n,
+        "index_mb_per_million": round(code_size * 1e6 / 2**20, 1),
+        "float32_mb_per_million": round(4 * full_dim * 1e6 / 2**20, 1),
+    }
+    if not isinstance(vs, CompressedFAISS) or n < 2:
+        return report
+    report["side_file_mb_per_million"] = report["float32_mb_per_million"]  # on disk, mmap'd
+
+    exact = faiss.IndexFlatL2(full_dim)
+    exact.add(full)
+    rng = np.random.default_rng(seed)
+    q_rows = rng.choice(n, size=min(n_queries, n), replace=False)
+    queries = full[q_rows]
+    kk = min(k + 1, n)  # +1: every query finds itself first
+    _, truth = exact.search(queries, kk)
+    _, approx = vs.index.search(vs._compress(queries), kk)
+    _, cand = vs.index.search(vs._compress(queries), min(kk * vs.oversample, n))
+
+    hits_raw = hits_rerank = total = 0
+    for qi, row in enumerate(q_rows):
+        want = set(truth[qi].tolist()) - {row}
+        c = cand[qi][cand[qi] != -1]
+        d = ((full[c] - queries[qi]) ** 2).sum(axis=1)
+        reranked = set(c[np.argsort(d)[:kk]].tolist()) - {row}
+        hits_raw += len(want & (set(approx[qi].tolist()) - {row}))
+        hits_rerank += len(want & reranked)
+        total += len(want)
+    report[f"recall@{k}_compressed"] = round(hits_raw / max(total, 1), 4)
+    report[f"recall@{k}_reranked"] = round(hits_rerank / max(total, 1), 4)
+    report[f"recall@{k}_delta"] = round(hits_rerank / max(total, 1) - 1.0, 4)
+    return report
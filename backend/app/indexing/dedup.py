@@ -0,0 +1,154 @@
+# ==========================================================
+# LexChain — Near-Duplicate Judgment Detection (MinHash/LSH)
+# ==========================================================
+# The same judgment can reach the corpus under more than one
+# case key (mirrors, re-numbered reports, slightly different
+# page chrome). Each normalized case text gets a MinHash
+# signature over word 5-gram shingles; signatures are banded
+# into an LSH table, and a case whose estimated Jaccard
+# similarity to an indexed case is ≥ DEDUP_THRESHOLD becomes
+# an alias of it: only the canonical copy is chunked and
+# embedded, and its chunks list the aliases in metadata.
+# Text similarity alone is not enough — HKLII publishes
+# companion judgments (same reasons, different parties or
+# actions) whose texts match at ≥ 0.97 — so a near match is
+# only aliased when it is also the same case by identity:
+# neutral citation, action number, title or source URL.
+# Signatures and identities are kept per build (minhash.npz)
+# so delta ingest can match new cases against the corpus.
+# ==========================================================
+import json, os, re, zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# ---------- Config ----------
+DEDUP_VERSION = 2
+DEDUP_THRESHOLD = float(os.getenv("LEXCHAIN_DEDUP_THRESHOLD", "0.9"))   # 1 disables aliasing of near matches
+NUM_PERM = 128
+BANDS = 16                      # 16 bands × 8 rows: candidate pairs from ≈0.7 similarity up
+SHINGLE_WORDS = 5
+MINHASH_FILE = "minhash.npz"
+_BLOCK = 8192
+
+_rng = np.random.default_rng(0x1E8C4A1)  # fixed, so signatures are comparable across runs
+_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """crc32 of every k-word shingle of the lowercased text."""
+    words = _WORD.findall((text or "").lower())
+    if len(words) < k:
+        words = words + [""] * (k - len(words))
+    grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value MinHash signature (uint32) of a case text."""
+    x = shingles(text)
+    sig = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for s in range(0, len(x), _BLOCK):
+        h = (_A[:, None] * x[None, s:s + _BLOCK] + _B[:, None]) >> np.uint64(32)  # multiply-shift, mod 2^64
+        np.minimum(sig, h.min(axis=1), out=sig)
+    return sig.astype(np.uint32)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float((np.asarray(a) == np.asarray(b)).mean())
+
+# ---------- Case identity ----------
+_PLACEHOLDER_TITLES = {"", "undefined", "hklii"}
+
+def case_identity(meta: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Normalized identity fields of a case from its chunk metadata: neutral
+    citation, action number, title (parties only, without the
+    " | [2014] HKCFI 1427 | HKLII" suffix) and source URL.
+    """
+    title = " ".join(str(meta.get("title") or "").split(" | ")[0].lower().split())
+    ident = {
+        "neutral_cit": " ".join(str(meta.get("neutral_cit") or "").upper().split()),
+        "action_no": re.sub(r"\s+", "", str(meta.get("action_no") or "")).upper(),
+        "title": "" if title in _PLACEHOLDER_TITLES else title,
+        "url": str(meta.get("source") or "").rstrip("/").lower(),
+    }
+    return {k: v for k, v in ident.items() if v}
+
+def same_case(a: Optional[Dict[str, str]], b: Optional[Dict[str, str]]) -> bool:
+    """True when two identities share a citation, action number, title or URL."""
+    if not a or not b:
+        return False
+    return any(a.get(k) and a.get(k) == b.get(k) for k in ("neutral_cit", "action_no", "title", "url"))
+
+class MinHashLSH:
+    """Banded LSH table of canonical cases' signatures and identities."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.tables: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self.sigs: Dict[str, np.ndarray] = {}
+        self.idents: Dict[str, Dict[str, str]] = {}
+
+    def _keys(self, sig: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for b in range(self.bands):
+            yield b, sig[b * self.rows:(b + 1) * self.rows].tobytes()
+
+    def add(self, key: str, sig: np.ndarray, ident: Optional[Dict[str, str]] = None):
+        self.sigs[key] = sig
+        self.idents[key] = ident or {}
+        for b, k in self._keys(sig):
+            self.tables[b].setdefault(k, []).append(key)
+
+    def find(self, sig: np.ndarray, ident: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Most similar indexed case at or above the threshold that is the same case by identity, if any."""
+        seen = {c for b, k in self._keys(sig) for c in self.tables[b].get(k, ())}
+        best, best_sim = None, self.threshold
+        for c in sorted(seen):
+            if not same_case(ident, self.idents[c]):
+                continue
+            sim = similarity(sig, self.sigs[c])
+            if sim >= best_sim:
+                best, best_sim = c, sim
+        return best
+
+def cluster(signatures: Dict[str, np.ndarray], identities: Dict[str, Dict[str, str]],
+            order: Iterable[str]) -> Dict[str, str]:
+    """
+    Alias map {duplicate key: canonical key}. Cases are considered in `order`;
+    the first of each group of near-duplicates becomes its canonical copy.
+    """
+    lsh = MinHashLSH()
+    aliases: Dict[str, str] = {}
+    for key in order:
+        canon = lsh.find(signatures[key], identities.get(key))
+        if canon is None:
+            lsh.add(key, signatures[key], identities.get(key))
+        else:
+            aliases[key] = canon
+    return aliases
+
+# ---------- Persistence ----------
+def save_signatures(signatures: Dict[str, np.ndarray], identities: Dict[str, Dict[str, str]], folder: Path):
+    keys = sorted(signatures)
+    matrix = np.vstack([signatures[k] for k in keys]) if keys else np.zeros((0, NUM_PERM), np.uint32)
+    idents = [json.dumps(identities.get(k) or {}, sort_keys=True, ensure_ascii=False) for k in keys]
+    tmp = Path(folder) / (MINHASH_FILE + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, version=np.array(DEDUP_VERSION), keys=np.array(keys, dtype=str), sigs=matrix,
+                 idents=np.array(idents, dtype=str))
+    os.replace(tmp, Path(folder) / MINHASH_FILE)
+
+def load_signatures(folder: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, str]]]:
+    """(signatures, identities) by case key; empty for a missing or older file."""
+    p = Path(folder) / MINHASH_FILE
+    if not p.exists():
+        return {}, {}
+    with np.load(p, allow_pickle=False) as z:
+        if int(z["version"]) != DEDUP_VERSION:
+            return {}, {}
+        keys = z["keys"].tolist()
+        return dict(zip(keys, z["sigs"])), {k: json.loads(i) for k, i in zip(keys, z["idents"].tolist())}
@@ -0,0 +1,109 @@
+# ==========================================================
+# LexChain — Content-Addressed Embedding Cache
+# ==========================================================
+# Persistent vector cache keyed by (embedding model, sha256
+# of chunk text), shared by every index builder. Re-chunking
+# or switching index type only embeds text the cache has
+# never seen; identical chunks (HKLII boilerplate, repeated
+# headnotes) are embedded once per batch.
+# ==========================================================
+import hashlib, os, sqlite3, threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / "data" / "embed_cache.sqlite3"
+CACHE_PATH = Path(os.getenv("LEXCHAIN_EMBED_CACHE", str(DEFAULT_CACHE_PATH)))
+
+_SQLITE_MAX_VARS = 900  # stay under SQLite's bound-parameter limit
+
+def text_sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """SQLite table of float32 vectors, safe to share across worker threads."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS vectors (
+                   model TEXT NOT NULL,
+                   sha   TEXT NOT NULL,
+                   dim   INTEGER NOT NULL,
+                   vec   BLOB NOT NULL,
+                   PRIMARY KEY (model, sha)
+               ) WITHOUT ROWID"""
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, shas: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        shas = list(dict.fromkeys(shas))
+        with self._lock:
+            for start in range(0, len(shas), _SQLITE_MAX_VARS):
+                part = shas[start:start + _SQLITE_MAX_VARS]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT sha, vec FROM vectors WHERE model = ? AND sha IN ({marks})", [model, *part]
+                ).fetchall()
+                for sha, blob in rows:
+                    found[sha] = np.frombuffer(blob, dtype="float32")
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, np.ndarray]]):
+        rows = [
+            (model, sha, int(v.shape[0]), np.asarray(v, dtype="float32").tobytes())
+            for sha, v in items
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def count(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            if model:
+                return self._conn.execute("SELECT COUNT(*) FROM vectors WHERE model = ?", (model,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap any LangChain `Embeddings` so embed_documents() consults the cache first.
+    Queries are passed straight through (they are rarely repeated verbatim).
+    """
+
+    def __init__(self, inner: Embeddings, model: str, cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.model = model
+        self.cache = cache or EmbeddingCache()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        shas = [text_sha(t) for t in texts]
+        found = self.cache.get_many(self.model, shas)
+        missing: Dict[str, str] = {}
+        for sha, t in zip(shas, texts):
+            if sha not in found and sha not in missing:
+                missing[sha] = t  # dedupe identical chunks within the batch
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = self.inner.embed_documents(list(missing.values()))
+            fresh = {sha: np.asarray(v, dtype="float32") for sha, v in zip(missing.keys(), vectors)}
+            self.cache.put_many(self.model, fresh.items())
+            found.update(fresh)
+        return [found[sha].tolist() for sha in shas]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
@@ -0,0 +1,167 @@
+# ==========================================================
+# LexChain — Parallel Batch Embedding Engine
+# ==========================================================
+# Packs chunks into batches by token count (just under the
+# per-request API limit), runs several batches concurrently
+# under a shared tokens/requests-per-minute limiter and
+# retries failures with exponential backoff. Only texts the
+# embedding cache has never seen are sent; each finished
+# batch is written to the cache straight away, so a crashed
+# run picks up where it stopped instead of starting over.
+# ==========================================================
+import os, random, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .embed_cache import EmbeddingCache, text_sha
+from .tokens import count_tokens
+
+# ---------- Config ----------
+MAX_BATCH_TOKENS = int(os.getenv("LEXCHAIN_EMBED_BATCH_TOKENS", "250000"))  # API limit is 300k/request
+MAX_BATCH_ITEMS = int(os.getenv("LEXCHAIN_EMBED_BATCH_ITEMS", "1000"))      # API limit is 2048/request
+CONCURRENCY = int(os.getenv("LEXCHAIN_EMBED_CONCURRENCY", "4"))
+TOKENS_PER_MIN = int(os.getenv("LEXCHAIN_EMBED_TPM", "1000000"))
+REQUESTS_PER_MIN = int(os.getenv("LEXCHAIN_EMBED_RPM", "3000"))
+MAX_RETRIES = int(os.getenv("LEXCHAIN_EMBED_MAX_RETRIES", "8"))
+
+# Client errors that will not succeed on retry
+_FATAL_STATUS = {400, 401, 403, 404, 422}
+
+# ---------- Rate limiting ----------
+class RateLimiter:
+    """Thread-safe token bucket over tokens/min and requests/min."""
+
+    def __init__(self, tokens_per_min: int = TOKENS_PER_MIN, requests_per_min: int = REQUESTS_PER_MIN):
+        self.tpm = float(tokens_per_min)
+        self.rpm = float(requests_per_min)
+        self._tokens = self.tpm
+        self._requests = self.rpm
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._stamp
+        self._stamp = now
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+
+    def acquire(self, tokens: int):
+        tokens = min(tokens, self.tpm)  # a single oversized batch must still be able to run
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens and self._requests >= 1:
+                    self._tokens -= tokens
+                    self._requests -= 1
+                    return
+                wait = max(
+                    (tokens - self._tokens) * 60.0 / self.tpm,
+                    (1 - self._requests) * 60.0 / self.rpm,
+                )
+            time.sleep(min(max(wait, 0.05), 5.0))
+
+# ---------- Batch packing ----------
+def pack_batches(token_counts: Sequence[int], max_tokens: int = MAX_BATCH_TOKENS,
+                 max_items: int = MAX_BATCH_ITEMS) -> List[List[int]]:
+    """Greedily group indices (in order) so each batch stays under max_tokens/max_items."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, n in enumerate(token_counts):
+        if current and (current_tokens + n > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+# ---------- Engine ----------
+class EmbedEngine:
+    """
+    Embed a large list of texts with any LangChain `Embeddings` object.
+    Returns a float32 matrix aligned with the input order.
+    Pass cache=None to disable the embedding cache (and resumability).
+    Providers with `rate_limited = False` (local models) skip the API
+    limiter and run one batch at a time; they parallelize internally.
+    """
+
+    def __init__(self, embeddings, model: str, concurrency: int = CONCURRENCY,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS, max_batch_items: int = MAX_BATCH_ITEMS,
+                 limiter: Optional[RateLimiter] = None, max_retries: int = MAX_RETRIES,
+                 cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.model = model
+        remote = getattr(embeddings, "rate_limited", True)
+        self.concurrency = max(1, concurrency) if remote else 1
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.limiter = limiter or (RateLimiter() if remote else None)
+        self.max_retries = max_retries
+        self.cache = cache
+        self.cache_hits = 0
+
+    def _call_with_retry(self, texts: List[str], tokens: int) -> np.ndarray:
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire(tokens)
+            try:
+                return np.asarray(self.embeddings.embed_documents(texts), dtype="float32")
+            except Exception as e:
+                status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+                if status in _FATAL_STATUS or attempt == self.max_retries:
+                    raise
+                delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"[!] Embedding batch failed ({type(e).__name__}: {e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def _embed_batch(self, shas: List[str], texts: List[str], tokens: int) -> np.ndarray:
+        vectors = self._call_with_retry(texts, tokens)
+        if self.cache is not None:
+            self.cache.put_many(self.model, zip(shas, vectors))
+        return vectors
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        shas = [text_sha(t) for t in texts]
+        found: Dict[str, np.ndarray] = self.cache.get_many(self.model, shas) if self.cache is not None else {}
+
+        # Unique texts the cache doesn't have yet, in first-seen order
+        todo: Dict[str, str] = {}
+        for sha, t in zip(shas, texts):
+            if sha not in found and sha not in todo:
+                todo[sha] = t
+        todo_shas = list(todo.keys())
+        self.cache_hits += len(texts) - len(todo_shas)
+
+        token_counts = [count_tokens(todo[sha], self.model) for sha in todo_shas]
+        batches = pack_batches(token_counts, self.max_batch_tokens, self.max_batch_items)
+        print(f"[i] Embedding {len(todo_shas)} unique uncached chunks of {len(texts)} "
+              f"({sum(token_counts)} tokens) in {len(batches)} batches × {self.concurrency} workers")
+
+        done_chunks = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {}
+            for b, idx in enumerate(batches):
+                batch_shas = [todo_shas[i] for i in idx]
+                fut = pool.submit(self._embed_batch, batch_shas, [todo[sha] for sha in batch_shas],
+                                  sum(token_counts[i] for i in idx))
+                futures[fut] = batch_shas
+            try:
+                for fut in as_completed(futures):
+                    batch_shas = futures[fut]
+                    found.update(zip(batch_shas, fut.result()))
+                    done_chunks += len(batch_shas)
+                    print(f"    ↳ embedded {done_chunks}/{len(todo_shas)} chunks")
+            except BaseException:
+                # Finished batches are already in the cache; don't start new ones
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        return np.vstack([found[sha] for sha in shas])
@@ -0,0 +1,180 @@
+# ==========================================================
+# LexChain — Judgment Normalization (before chunking)
+# ==========================================================
+# Cached HKLII content is the flattened page text, so every
+# judgment starts with the site banner and info panel
+# ("HKLII Databases … Judgment Information Date … Download MS
+# Word … Case History") and ends with "Look up this case on
+# Lawcite Noteup". This stage:
+#   - strips site chrome, learned as word n-grams that recur
+#     near the start/end of a large share of the corpus,
+#   - pulls header fields (date, action no., citations,
+#     coram) out into metadata,
+#   - re-breaks the text on numbered paragraphs so the
+#     splitter keeps each paragraph whole where it can.
+# ==========================================================
+import json, os, re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dateutil import parser as dtparser
+
+# ---------- Config ----------
+NORMALIZE_VERSION = 1          # bump when output changes, so delta ingest re-chunks everything
+CHROME_NGRAM = 4
+CHROME_MIN_DF = float(os.getenv("LEXCHAIN_CHROME_MIN_DF", "0.3"))  # share of cases an n-gram must appear in
+CHROME_MIN_DOCS = 20           # too few cases to tell chrome from coincidence
+HEAD_TOKENS = 150              # chrome is only looked for in the first/last few words
+TAIL_TOKENS = 60
+HEADER_MAX_GAP = 40            # banner text sandwiched between leading chrome runs is dropped too
+
+_RULE = re.compile(r"\s*_{3,}\s*")
+
+_FIELD_PATTERNS = {
+    "judgment_date": re.compile(r"\bDate (\d{1,2} [A-Z][a-z]{2,8},? \d{4})"),
+    "action_no": re.compile(r"\bAction No\. (\S+)"),
+    "neutral_cit": re.compile(r"\bNeutral Cit\. (\[\d{4}\] [A-Z]+ \d+)"),
+    "parallel_cit": re.compile(r"\bParallel Cit\. (.+?)(?= Download\b| Neutral Cit\.|$)"),
+}
+_FIELDS_SPAN = 2000            # the info panel sits within the first ~2k characters
+_CORAM = re.compile(
+    r"\b(?:Coram|Before)\s*:\s*(.{3,300}?)"
+    r"(?=\s+(?:Dates? of |Judgment|JUDGMENT|J U D|DECISION|D E C|RULING|R U L|REASONS|_{3,})|$)"
+)
+
+# "12. The applicant…" — a paragraph number followed by the start of a sentence
+_PARA_NUM = re.compile(r"(?:(?<=\s)|^)(\d{1,3})\.\s+(?=[A-Z(“\"‘'])")
+
+# ---------- Chrome model ----------
+class ChromeModel:
+    """Set of word n-grams that mark site chrome, learned from document frequency."""
+
+    def __init__(self, ngrams: Optional[Set[Tuple[str, ...]]] = None, n: int = CHROME_NGRAM):
+        self.ngrams = ngrams or set()
+        self.n = n
+
+    @staticmethod
+    def _edge_ngrams(tokens: List[str], n: int) -> Set[Tuple[str, ...]]:
+        seen = set()
+        for part in (tokens[:HEAD_TOKENS], tokens[-TAIL_TOKENS:]):
+            for i in range(len(part) - n + 1):
+                seen.add(tuple(part[i:i + n]))
+        return seen
+
+    @classmethod
+    def learn(cls, texts: Iterable[str], n: int = CHROME_NGRAM, min_df: float = CHROME_MIN_DF,
+              min_docs: int = CHROME_MIN_DOCS) -> "ChromeModel":
+        df: Counter = Counter()
+        docs = 0
+        for text in texts:
+            docs += 1
+            df.update(cls._edge_ngrams(_RULE.sub(" ", text).split(), n))
+        if docs < min_docs:
+            return cls(set(), n)
+        cutoff = max(2, min_df * docs)
+        return cls({g for g, c in df.items() if c >= cutoff}, n)
+
+    def runs(self, tokens: List[str], start: int, end: int) -> List[Tuple[int, int]]:
+        """Merged [s, e) token spans inside [start, end) covered by chrome n-grams."""
+        spans: List[Tuple[int, int]] = []
+        n = self.n
+        for i in range(max(0, start), min(len(tokens), end) - n + 1):
+            if tuple(tokens[i:i + n]) in self.ngrams:
+                if spans and i <= spans[-1][1]:
+                    spans[-1] = (spans[-1][0], i + n)
+                else:
+                    spans.append((i, i + n))
+        return spans
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"n": self.n, "version": NORMALIZE_VERSION,
+                       "ngrams": sorted(" ".join(g) for g in self.ngrams)}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ChromeModel":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls({tuple(g.split(" ")) for g in data.get("ngrams", [])}, data.get("n", CHROME_NGRAM))
+
+def strip_chrome(text: str, chrome: ChromeModel) -> str:
+    tokens = _RULE.sub(" ", text).split()
+    if not chrome.ngrams or len(tokens) < chrome.n:
+        return " ".join(tokens)
+    head = chrome.runs(tokens, 0, HEAD_TOKENS)
+    tail = chrome.runs(tokens, max(HEAD_TOKENS, len(tokens) - TAIL_TOKENS), len(tokens))
+    drop = [False] * len(tokens)
+
+    # Leading banner: chrome from the first word on, plus short gaps between chrome runs
+    header_end = 0
+    if head and head[0][0] <= 2:
+        header_end = head[0][1]
+        for s, e in head[1:]:
+            if s - header_end > HEADER_MAX_GAP:
+                break
+            header_end = e
+    for i in range(header_end):
+        drop[i] = True
+    for s, e in head + tail:
+        for i in range(s, e):
+            drop[i] = True
+    return " ".join(t for t, d in zip(tokens, drop) if not d)
+
+# ---------- Header fields ----------
+def extract_fields(text: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Pull the HKLII info-panel fields and coram out of the head of the text.
+    Returns (fields, text without the panel fields).
+    """
+    fields: Dict[str, Any] = {}
+    head, rest = text[:_FIELDS_SPAN], text[_FIELDS_SPAN:]
+    for name, pat in _FIELD_PATTERNS.items():
+        m = pat.search(head)
+        if m:
+            fields[name] = m.group(1).strip()
+            head = head[:m.start()] + head[m.end():]
+    if "judgment_date" in fields:
+        try:
+            fields["judgment_date"] = dtparser.parse(fields["judgment_date"]).date().isoformat()
+        except (ValueError, OverflowError):
+            fields.pop("judgment_date")
+    text = head + rest
+    m = _CORAM.search(text[:_FIELDS_SPAN * 3])
+    if m:
+        fields["coram"] = _RULE.sub(" ", m.group(1)).strip(" ,;")
+    return fields, text
+
+# ---------- Paragraphs ----------
+def split_paragraphs(text: str) -> List[str]:
+    """
+    Break flattened text before each numbered paragraph. Only an
+    unbroken 1, 2, 3… sequence counts, so section references
+    ("s. 8") and years ending a sentence don't split anything.
+    """
+    cuts: List[int] = []
+    expected = 1
+    for m in _PARA_NUM.finditer(text):
+        if int(m.group(1)) == expected:
+            cuts.append(m.start())
+            expected += 1
+    if not cuts:
+        return [text] if text else []
+    bounds = [0] + cuts + [len(text)]
+    return [p for p in (text[a:b].strip() for a, b in zip(bounds, bounds[1:])) if p]
+
+# ---------- Pipeline ----------
+def normalize_case(text: str, chrome: Optional[ChromeModel] = None) -> Dict[str, Any]:
+    """
+    Returns {"text": paragraphs joined by blank lines, "fields": header
+    metadata, "paragraphs": number of numbered paragraphs found}.
+    """
+    fields, text = extract_fields(text or "")
+    text = strip_chrome(text, chrome or ChromeModel())
+    paras = split_paragraphs(text)
+    numbered = sum(1 for p in paras if _PARA_NUM.match(p))
+    return {"text": "\n\n".join(paras), "fields": fields, "paragraphs": numbered}
@@ -0,0 +1,103 @@
+# ==========================================================
+# LexChain — Embedding Providers
+# ==========================================================
+# One place that turns LEXCHAIN_EMBED_MODEL into a LangChain
+# `Embeddings` object:
+#   text-embedding-3-large      → OpenAI (network)
+#   local:/models/bge-small-en  → sentence-transformers model
+#                                 loaded from a local path, run
+#                                 on CPU (torch, or ONNX with
+#                                 LEXCHAIN_LOCAL_BACKEND=onnx)
+# A local model makes both the index build and query-time
+# embedding fully offline; queries take milliseconds instead
+# of a network round trip. Providers are created once per
+# process and model.
+#
+# Local models need: pip install sentence-transformers
+# (plus onnxruntime / optimum for the ONNX backend).
+# ==========================================================
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# ---------- Config ----------
+DEFAULT_EMBED_MODEL = "text-embedding-3-small"
+LOCAL_PREFIX = "local:"
+LOCAL_BACKEND = os.getenv("LEXCHAIN_LOCAL_BACKEND", "torch")          # torch | onnx
+LOCAL_BATCH = int(os.getenv("LEXCHAIN_LOCAL_BATCH", "64"))
+LOCAL_WORKERS = int(os.getenv("LEXCHAIN_LOCAL_WORKERS", "2"))         # batches run concurrently
+LOCAL_THREADS = int(os.getenv("LEXCHAIN_LOCAL_THREADS", "0"))         # intra-op threads; 0 = library default
+
+def embed_model_name(model: Optional[str] = None) -> str:
+    return model or os.getenv("LEXCHAIN_EMBED_MODEL", DEFAULT_EMBED_MODEL)
+
+def is_local(model: Optional[str] = None) -> bool:
+    return embed_model_name(model).startswith(LOCAL_PREFIX)
+
+# ---------- Local CPU backend ----------
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers model from a local path. Documents are encoded in
+    fixed-size batches spread over a small thread pool (torch and onnxruntime
+    release the GIL while they compute); vectors are L2-normalized.
+    """
+
+    rate_limited = False  # EmbedEngine: no API quota to respect
+
+    def __init__(self, path: str, backend: str = LOCAL_BACKEND, batch_size: int = LOCAL_BATCH,
+                 workers: int = LOCAL_WORKERS, threads: int = LOCAL_THREADS):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                f"LEXCHAIN_EMBED_MODEL={LOCAL_PREFIX}{path} needs sentence-transformers "
+                "(pip install sentence-transformers)"
+            ) from e
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Local embedding model not found: {path}")
+        if threads and backend == "torch":
+            import torch
+            torch.set_num_threads(threads)
+        kwargs = {"backend": backend} if backend != "torch" else {}
+        self.model = SentenceTransformer(path, device="cpu", **kwargs)
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if len(texts) <= self.batch_size or self.workers == 1:
+            return self._encode(texts)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        out: List[List[float]] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for vectors in pool.map(self._encode, batches):
+                out.extend(vectors)
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+# ---------- Factory ----------
+@lru_cache(maxsize=4)
+def get_embeddings(model: Optional[str] = None) -> Embeddings:
+    """Embeddings for `model` (default: LEXCHAIN_EMBED_MODEL), shared within the process."""
+    name = embed_model_name(model)
+    if name.startswith(LOCAL_PREFIX):
+        return LocalEmbeddings(name[len(LOCAL_PREFIX):])
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(model=name)
+
+def index_embeddings(index_dir: str, default: Optional[str] = None) -> Embeddings:
+    """Query embeddings matching the model an index build was made with (from build.json)."""
+    from .versions import read_manifest
+    manifest = read_manifest(Path(index_dir)) or {}
+    return get_embeddings(manifest.get("embed_model") or embed_model_name(default))
@@ -0,0 +1,53 @@
+# ==========================================================
+# Token counting for embedding requests
+# ==========================================================
+# OpenAI models are counted with tiktoken; local: sentence-
+# transformers models with their own (wordpiece) tokenizer,
+# whose max_seq_length also caps the chunk budget.
+# ==========================================================
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ships with langchain-openai; fall back to a rough estimate
+    tiktoken = None
+
+from .providers import LOCAL_PREFIX, get_embeddings
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None  # BPE file not cached and no network → estimate instead
+
+def _local_model(model: str):
+    """The SentenceTransformer behind a local: model (shared with the embedder)."""
+    return get_embeddings(model).model
+
+def count_tokens(text: str, model: str = "text-embedding-3-small") -> int:
+    """Number of tokens `text` costs for `model` (≈ chars/4 if no tokenizer is available)."""
+    if model.startswith(LOCAL_PREFIX):
+        return len(_local_model(model).tokenizer.encode(text, add_special_tokens=False))
+    enc = _encoding(model)
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+def max_input_tokens(model: str) -> Optional[int]:
+    """
+    Longest text (in count_tokens units) `model` embeds without truncating:
+    a local model's max_seq_length less its [CLS]/[SEP] tokens; None for
+    OpenAI models, whose 8k limit is far above any chunk size.
+    """
+    if not model.startswith(LOCAL_PREFIX):
+        return None
+    st = _local_model(model)
+    special = st.tokenizer.num_special_tokens_to_add(pair=False)
+    return max(1, st.max_seq_length - special)
@@ -0,0 +1,111 @@
+# ==========================================================
+# LexChain — Topic Tagging
+# ==========================================================
+# Tags every case with canonical legal topics from
+# tools/topics.txt (the list that also drives crawling):
+#   1. the topic names are embedded once (through the
+#      embedding cache, so re-runs cost nothing),
+#   2. all chunk vectors are scored against the topic matrix
+#      with one matrix multiply,
+#   3. chunk scores are pooled per case (mean of the case's
+#      best TOPIC_POOL chunks for each topic), and a case takes
+#      up to TOPIC_MAX topics scoring ≥ TOPIC_MIN_SCORE and
+#      within TOPIC_MARGIN of its best topic.
+# Tags go into every chunk's metadata ("topics") and into the
+# ingest manifest, so delta ingest only tags changed cases.
+# ==========================================================
+import hashlib, json, os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# ---------- Config ----------
+TOPICS_FILE = Path(os.getenv("LEXCHAIN_TOPICS_FILE", Path(__file__).resolve().parents[2] / "tools" / "topics.txt"))
+TOPIC_MAX = int(os.getenv("LEXCHAIN_TOPIC_MAX", "3"))
+TOPIC_MIN_SCORE = float(os.getenv("LEXCHAIN_TOPIC_MIN_SCORE", "0.25"))   # cosine similarity
+TOPIC_MARGIN = float(os.getenv("LEXCHAIN_TOPIC_MARGIN", "0.05"))
+TOPIC_POOL = 2
+
+def load_topics(path: Path = TOPICS_FILE) -> List[str]:
+    """Topic names, one per line; blank lines and # comments/section headers skipped."""
+    topics: List[str] = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        s = line.strip()
+        if s and not s.startswith("#") and s not in topics:
+            topics.append(s)
+    return topics
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype="float32")
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+class TopicTagger:
+    """Topic names and their unit-length embedding matrix (topics × dim)."""
+
+    def __init__(self, topics: Sequence[str], matrix: np.ndarray):
+        self.topics = list(topics)
+        self.matrix = _unit(matrix)
+
+    @classmethod
+    def from_engine(cls, engine, topics: Optional[Sequence[str]] = None) -> "TopicTagger":
+        """Embed the topic list with an EmbedEngine (cached like any other text)."""
+        topics = list(topics) if topics is not None else load_topics()
+        return cls(topics, engine.embed(topics))
+
+    def signature(self, model: str) -> str:
+        """Changes whenever tags could: topic list, model or thresholds."""
+        blob = json.dumps([model, self.topics, TOPIC_MAX, TOPIC_MIN_SCORE, TOPIC_MARGIN, TOPIC_POOL])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+    def scores(self, vectors: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every chunk vector to every topic (rows × topics)."""
+        return _unit(vectors) @ self.matrix.T
+
+    def tag(self, vectors: np.ndarray, groups: np.ndarray) -> Dict[int, List[str]]:
+        """
+        Case-level tags for chunk `vectors` (rows × dim), where groups[i] is
+        the case number of row i. Returns {case number: [topic, ...]}, best first.
+        """
+        return self.tag_scores(self.scores(vectors), groups)
+
+    def tag_scores(self, scores: np.ndarray, groups: np.ndarray) -> Dict[int, List[str]]:
+        groups = np.asarray(groups)
+        if not len(groups):
+            return {}
+        order = np.argsort(groups, kind="stable")
+        g = groups[order]
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        ends = np.r_[starts[1:], len(g)]
+        out: Dict[int, List[str]] = {}
+        for s, e in zip(starts, ends):
+            block = np.sort(scores[order[s:e]], axis=0)[::-1][:TOPIC_POOL]
+            pooled = block.mean(axis=0)
+            best = pooled.max()
+            keep = np.flatnonzero((pooled >= TOPIC_MIN_SCORE) & (pooled >= best - TOPIC_MARGIN))
+            keep = keep[np.argsort(-pooled[keep])][:TOPIC_MAX]
+            out[int(g[s])] = [self.topics[i] for i in keep]
+        return out
+
+def retag_vectorstore(vs, tagger: TopicTagger, block_rows: int = 4096) -> Dict[str, List[str]]:
+    """
+    Re-tag every case in an index from its stored vectors (no re-embedding),
+    e.g. after topics.txt changed. Updates chunk metadata in place and
+    returns {case_key: topics}.
+    """
+    from .compressed import row_vectors
+    n = vs.index.ntotal
+    docs = [vs.docstore.search(vs.index_to_docstore_id[i]) for i in range(n)]
+    keys = [(getattr(d, "metadata", None) or {}).get("case_key") or vs.index_to_docstore_id[i]
+            for i, d in enumerate(docs)]
+    numbers: Dict[str, int] = {}
+    groups = np.array([numbers.setdefault(k, len(numbers)) for k in keys], dtype="int64")
+    scores = np.vstack([tagger.scores(row_vectors(vs, range(s, min(s + block_rows, n))))
+                        for s in range(0, n, block_rows)]) if n else np.zeros((0, len(tagger.topics)))
+    tags = tagger.tag_scores(scores, groups)
+    for d, g in zip(docs, groups):
+        if hasattr(d, "metadata"):
+            d.metadata["topics"] = tags.get(int(g), [])
+    return {k: tags.get(g, []) for k, g in numbers.items()}
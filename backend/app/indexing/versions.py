@@ -0,0 +1,198 @@
+# ==========================================================
+# LexChain — Versioned Index Builds & Atomic Publishing
+# ==========================================================
+# Layout under LEXCHAIN_INDEX_PATH (e.g. data/indexes/faiss_v1):
+#   builds/<timestamp>/   one complete index per build, with
+#                         build.json (embed model, dimension,
+#                         chunk count, file checksums)
+#   current → builds/<timestamp>   symlink, swapped atomically
+#   CURRENT                        pointer file, used instead
+#                                  where symlinks aren't allowed
+# Builders write a fresh build directory and publish() it;
+# readers resolve_index_path() once per load, so they never
+# see a half-written index.faiss/index.pkl pair. The last
+# LEXCHAIN_INDEX_KEEP builds are kept for rollback.
+#
+# Usage (from backend/):
+#   python -m app.indexing.versions list
+#   python -m app.indexing.versions rollback [<version>]
+# ==========================================================
+import argparse, hashlib, json, os, shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# ---------- Config ----------
+DEFAULT_INDEX_PATH = "./data/indexes/faiss_v1"
+KEEP_BUILDS = int(os.getenv("LEXCHAIN_INDEX_KEEP", "5"))
+
+BUILDS_DIR = "builds"
+CURRENT_LINK = "current"
+CURRENT_POINTER = "CURRENT"
+BUILD_MANIFEST = "build.json"
+
+def index_root() -> Path:
+    return Path(os.getenv("LEXCHAIN_INDEX_PATH", DEFAULT_INDEX_PATH))
+
+# ---------- Resolution ----------
+def resolve_index_path(root: Optional[Path] = None) -> Path:
+    """
+    Directory holding the live index: the `current` build, else the build
+    named in CURRENT, else `root` itself (indexes saved before versioning).
+    """
+    root = Path(root or index_root())
+    link = root / CURRENT_LINK
+    if link.is_dir():
+        return link.resolve()
+    pointer = root / CURRENT_POINTER
+    if pointer.exists():
+        name = pointer.read_text(encoding="utf-8").strip()
+        if name and (root / BUILDS_DIR / name).is_dir():
+            return root / BUILDS_DIR / name
+    return root
+
+def read_manifest(build_dir: Path) -> Optional[Dict[str, Any]]:
+    p = Path(build_dir) / BUILD_MANIFEST
+    if not p.exists():
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def active_version(root: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Manifest of the published build (None for an unversioned or missing index)."""
+    return read_manifest(resolve_index_path(root))
+
+def list_builds(root: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Finished builds (those with a manifest), oldest first (names start with a UTC timestamp)."""
+    root = Path(root or index_root())
+    builds = []
+    for d in sorted((root / BUILDS_DIR).glob("*")) if (root / BUILDS_DIR).is_dir() else []:
+        m = read_manifest(d)
+        if m:
+            builds.append(m)
+    return builds
+
+# ---------- Building ----------
+def new_build_dir(root: Optional[Path] = None, suffix: str = "") -> Path:
+    """Fresh builds/<UTC timestamp>[-suffix] directory (created)."""
+    root = Path(root or index_root())
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    d = root / BUILDS_DIR / (f"{stamp}-{suffix}" if suffix else stamp)
+    d.mkdir(parents=True, exist_ok=False)
+    return d
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def write_manifest(build_dir: Path, vs, embed_model: str, **extra: Any) -> Dict[str, Any]:
+    """Record what a finished build contains; call after vs.save_local(build_dir)."""
+    build_dir = Path(build_dir)
+    files = {
+        p.name: {"sha256": _sha256(p), "bytes": p.stat().st_size}
+        for p in sorted(build_dir.iterdir())
+        if p.is_file() and p.name != BUILD_MANIFEST and not p.name.endswith(".tmp")
+    }
+    manifest = {
+        "version": build_dir.name,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "embed_model": embed_model,
+        "dim": int(vs.index.d),
+        "chunks": int(vs.index.ntotal),
+        "full_dim": getattr(vs, "full_dim", int(vs.index.d)),
+        "storage": getattr(vs, "storage", "flat"),
+        **extra,
+        "files": files,
+    }
+    tmp = build_dir / (BUILD_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, build_dir / BUILD_MANIFEST)
+    return manifest
+
+def verify_build(build_dir: Path) -> Dict[str, Any]:
+    """Manifest of a build whose files all match their checksums; raises otherwise."""
+    manifest = read_manifest(build_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No {BUILD_MANIFEST} in {build_dir}")
+    for name, info in manifest.get("files", {}).items():
+        p = Path(build_dir) / name
+        if not p.exists() or p.stat().st_size != info["bytes"] or _sha256(p) != info["sha256"]:
+            raise ValueError(f"Build {manifest['version']} is corrupt: {name} does not match its checksum")
+    return manifest
+
+# ---------- Publishing ----------
+def _point_current(root: Path, build_dir: Path):
+    link = root / CURRENT_LINK
+    target = Path(BUILDS_DIR) / build_dir.name
+    tmp = root / f"{CURRENT_LINK}.tmp-{os.getpid()}"
+    try:
+        if tmp.is_symlink():
+            tmp.unlink()
+        os.symlink(target, tmp, target_is_directory=True)
+        os.replace(tmp, link)  # rename(2) swaps the link in one step
+        (root / CURRENT_POINTER).unlink(missing_ok=True)
+    except (OSError, NotImplementedError):
+        # No symlinks (e.g. Windows without developer mode): atomic pointer file
+        ptmp = root / f"{CURRENT_POINTER}.tmp"
+        ptmp.write_text(build_dir.name, encoding="utf-8")
+        os.replace(ptmp, root / CURRENT_POINTER)
+        if link.is_symlink():
+            link.unlink()
+
+def prune(root: Optional[Path] = None, keep: int = KEEP_BUILDS) -> List[str]:
+    """Delete finished builds beyond the newest `keep` (never the live one)."""
+    root = Path(root or index_root())
+    live = resolve_index_path(root).name
+    builds = list_builds(root)
+    removed = []
+    for m in builds[:max(0, len(builds) - keep)]:
+        if m["version"] != live:
+            shutil.rmtree(root / BUILDS_DIR / m["version"], ignore_errors=True)
+            removed.append(m["version"])
+    return removed
+
+def publish(build_dir: Path, root: Optional[Path] = None, keep: int = KEEP_BUILDS) -> Dict[str, Any]:
+    """Verify a finished build, make it current and prune old builds."""
+    root = Path(root or index_root())
+    build_dir = Path(build_dir)
+    manifest = verify_build(build_dir)
+    _point_current(root, build_dir)
+    prune(root, keep)
+    return manifest
+
+def rollback(version: Optional[str] = None, root: Optional[Path] = None) -> Dict[str, Any]:
+    """Re-publish `version`, or the build before the live one."""
+    root = Path(root or index_root())
+    builds = [m["version"] for m in list_builds(root)]
+    live = resolve_index_path(root).name
+    if version is None:
+        if live not in builds or builds.index(live) == 0:
+            raise ValueError("No earlier build to roll back to.")
+        version = builds[builds.index(live) - 1]
+    if version not in builds:
+        raise ValueError(f"Unknown build: {version}")
+    build_dir = root / BUILDS_DIR / version
+    manifest = verify_build(build_dir)
+    _point_current(root, build_dir)
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LexChain index versions")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="List builds (* = live)")
+    rb = sub.add_parser("rollback", help="Publish an earlier build")
+    rb.add_argument("version", nargs="?", help="Build to publish (default: the one before the live build)")
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        live = resolve_index_path().name
+        for m in list_builds():
+            mark = "*" if m["version"] == live else " "
+            print(f"{mark} {m['version']}  {m['embed_model']}  dim={m['dim']}  chunks={m['chunks']}  {m['created_at']}")
+    else:
+        m = rollback(args.version)
+        print(f"[✓] Rolled back → {m['version']} ({m['chunks']} chunks, {m['embed_model']})")
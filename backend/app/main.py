@@ -11,6 +11,8 @@ from .routers.cases import router as cases_router
 from .routers import memory
 from .routers.hklii import router as hklii_router  # ✅ HKLII adapter router
 from .routers.hklii_gcse import router as hklii_gcse_router  # ✅ NEW: HKLII GCSE extension router
+from .routers.ingest import router as ingest_router  # ✅ Background FAISS ingest jobs
+from .indexing.versions import active_version
 
 # ----------------------------------------------------------
 # 🌐 Bilingual Tag Metadata / 中英文标签说明
@@ -28,6 +30,10 @@ TAGS_METADATA = [
         "name": "hklii",
         "description": "🔎 HKLII 适配器 | HKLII adapter：与 HKLII 搜索/数据对接。",
     },
+    {
+        "name": "Ingest",
+        "description": "🗂️ 索引构建 | Ingest：后台构建 FAISS 索引并查询进度。",
+    },
     {
         "name": "hklii_gcse",
         "description": "📖 HKLII GCSE 扩展接口 | HKLII GCSE extension interface。",
@@ -81,8 +87,12 @@ def health():
 
 @app.get("/version", summary="版本信息 | Version Info")
 def version():
-    """版本信息 (Version Info)：显示当前 API 名称与版本"""
-    return {"name": "LexChain API / 法律链接口", "version": "0.0.1"}
+    """版本信息 (Version Info)：显示当前 API 名称、版本与在线索引版本 (active index build)"""
+    build = active_version()
+    index = None
+    if build:
+        index = {k: build.get(k) for k in ("version", "created_at", "embed_model", "dim", "chunks", "storage")}
+    return {"name": "LexChain API / 法律链接口", "version": "0.0.1", "index": index}
 
 # ----------------------------------------------------------
 # Mount Routers
@@ -91,6 +101,7 @@ app.include_router(cases_router)
 app.include_router(memory.router)
 app.include_router(hklii_router)        # ✅ HKLII Search Proxy
 app.include_router(hklii_gcse_router)   # ✅ HKLII GCSE Integration
+app.include_router(ingest_router)       # ✅ POST /ingest + GET /ingest/{job_id}
 
 # ----------------------------------------------------------
 # Swagger 中文界面增强脚本 / Chinese UI Patch
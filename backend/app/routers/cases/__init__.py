@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import semantic, compare, summarize, analyze, synthesize, citations, graph
+from . import semantic, compare, summarize, analyze, synthesize, citations, graph, facets
 
 router = APIRouter(prefix="/cases", tags=["Cases"])
 
@@ -11,3 +11,4 @@ router.include_router(analyze.router)
 router.include_router(synthesize.router)
 router.include_router(citations.router)
 router.include_router(graph.router)
+router.include_router(facets.router)
@@ -0,0 +1,92 @@
+# ==========================================================
+# 案件分面统计接口 (Case Facets Endpoint)
+# ==========================================================
+import time
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Query
+
+from ...indexing.columns import columns_for
+from ...indexing.compressed import search_rows
+from .shared import _get_retriever
+
+router = APIRouter()
+
+@router.get(
+    "/facets",
+    tags=["cases"],
+    summary="案件分面统计 | Case Facets",
+    description=(
+        "统计查询命中案件按法院、年份、法律主题分布的数量（每个案件只计一次）。\n\n"
+        "Count the cases matching a query (or filters only) by court, year bucket and topic; "
+        "each case is counted once."
+    ),
+)
+def case_facets(
+    query: Optional[str] = Query(
+        None,
+        description="查询关键词或主题；留空则只按筛选条件统计 | Search phrase; omit to count by filters alone"
+    ),
+    k: int = Query(
+        500, ge=10, le=5000,
+        description="参与统计的候选段落块数 | Candidate chunks to aggregate over (query mode)"
+    ),
+    court: Optional[List[str]] = Query(
+        None,
+        description="法院代码或名称，可多选（如 hkca、hkcfi） | Court codes or names to restrict to (e.g. hkca, hkcfi)"
+    ),
+    year_from: Optional[int] = Query(None, description="起始年份 | Earliest judgment year"),
+    year_to: Optional[int] = Query(None, description="截止年份 | Latest judgment year"),
+    topic: Optional[List[str]] = Query(
+        None,
+        description="法律主题，可多选（见 tools/topics.txt） | Topics to restrict to, any of (see tools/topics.txt)"
+    ),
+    year_bucket: int = Query(5, ge=1, le=50, description="年份分组跨度 | Years per year bucket"),
+):
+    """
+    案件分面统计接口 / Case Facets Endpoint
+
+    📘 功能 (Function):
+    对查询的前 k 个候选段落（或仅按筛选条件匹配的全部段落）按案件去重，
+    并返回按法院、年份区间与法律主题的案件数量分布。
+
+    ⚙️ 返回值 (Return):
+    - query: 查询字符串（可为空）
+    - matched_chunks / matched_cases: 命中的段落块数与案件数
+    - facets.court: [{value: 法院代码, count}]
+    - facets.year: [{from, to, count}]（年份未知者 from/to 为 null）
+    - facets.topic: [{value: 主题, count}]（一个案件可有多个主题）
+    - took_ms: 耗时（毫秒）
+
+    English Summary:
+    One vector search for the top-k chunks (or, without a query, every chunk
+    passing the filters), then array reductions over the index's column
+    table: chunks are collapsed to cases and counted per court, per year
+    bucket and per topic tag (a case may carry several topics). Unknown
+    courts/years are reported with a null value.
+    """
+    t0 = time.perf_counter()
+    vectorstore = _get_retriever().vectorstore
+    table = columns_for(vectorstore)
+    mask = None
+    if court or topic or year_from is not None or year_to is not None:
+        mask = table.mask(courts=court, year_from=year_from, year_to=year_to, topics=topic)
+
+    if query:
+        if mask is not None and not mask.any():
+            rows = np.zeros(0, dtype="int64")
+        else:
+            emb = vectorstore.embedding_function.embed_query(query)
+            rows, _ = search_rows(vectorstore, emb, min(k, len(table)), mask)
+    else:
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(table))
+
+    cases = table.first_per_case(rows)
+    return {
+        "query": query,
+        "matched_chunks": int(len(rows)),
+        "matched_cases": int(len(cases)),
+        "facets": table.histograms(cases, year_bucket),
+        "took_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
@@ -1,8 +1,10 @@
 # ==========================================================
 # 案件语义搜索接口 (Case Semantic Search Endpoint)
 # ==========================================================
+from typing import List, Optional
+
 from fastapi import APIRouter, Query
-from .shared import _get_retriever, _extract_id_title
+from .shared import _get_retriever, _extract_id_title, _filtered_docs, _neighbour_chunks
 
 router = APIRouter()
 
@@ -20,7 +22,21 @@ def semantic_search(
     query: str = Query(
         ...,
         description="查询关键词或主题（可输入中文或英文） | Search phrase or topic (in Chinese or English)"
-    )
+    ),
+    window: int = Query(
+        0, ge=0, le=3,
+        description="每个结果前后附带的相邻段落块数 | Neighbouring chunks to add on each side of a hit as context"
+    ),
+    court: Optional[List[str]] = Query(
+        None,
+        description="法院代码或名称，可多选（如 hkca、hkcfi） | Court codes or names to restrict to (e.g. hkca, hkcfi)"
+    ),
+    year_from: Optional[int] = Query(None, description="起始年份 | Earliest judgment year"),
+    year_to: Optional[int] = Query(None, description="截止年份 | Latest judgment year"),
+    topic: Optional[List[str]] = Query(
+        None,
+        description="法律主题，可多选（见 tools/topics.txt） | Topics to restrict to, any of (see tools/topics.txt)"
+    ),
 ):
     """
     案件语义搜索接口 / Case Semantic Search Endpoint
@@ -34,22 +50,35 @@ def semantic_search(
         - id: 案件编号
         - title: 案件标题
         - snippet: 案件内容前300字
+        - context: 命中段落及其前后相邻段落（仅当 window > 0）
 
     English Summary:
     Performs semantic retrieval from the case database using vector embeddings.
     Returns the most relevant case IDs, titles, and snippets (first 300 chars).
+    court / year_from / year_to / topic restrict the search to matching chunks (via the
+    index's column table, before scoring). With window > 0, each result also carries `context`: the hit plus its
+    neighbouring chunks, fetched by ID rather than by further searches.
     """
     retriever = _get_retriever()
-    docs = retriever.get_relevant_documents(query)
+    if court or topic or year_from is not None or year_to is not None:
+        docs = _filtered_docs(retriever.vectorstore, query, retriever.search_kwargs.get("k", 3),
+                              court, year_from, year_to, topic)
+    else:
+        docs = retriever.get_relevant_documents(query)
     if not docs:
         return {"query": query, "results": []}
 
     results = []
     for doc in docs:
         cid, title = _extract_id_title(doc)
-        results.append({
+        item = {
             "id": cid,
             "title": title,
             "snippet": doc.page_content[:300]
-        })
+        }
+        if window:
+            item["context"] = "\n\n".join(
+                d.page_content for d in _neighbour_chunks(retriever.vectorstore, doc, window)
+            )
+        results.append(item)
     return {"query": query, "results": results}
@@ -2,22 +2,29 @@
 # ==========================================================
 # LexChain – Shared utilities for /cases module
 # ==========================================================
-from typing import Tuple, Dict, Any
+from functools import lru_cache
+from typing import Tuple, Dict, Any, List, Optional
 import os
 
 from fastapi import HTTPException
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from langchain_openai import ChatOpenAI
+
+from ...indexing.columns import columns_for
+from ...indexing.compressed import load_vectorstore, search_rows
+from ...indexing.providers import index_embeddings
+from ...indexing.versions import resolve_index_path
 
 def _get_index_path() -> str:
-    return os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")
+    # Live build directory; the path names the build, so it doubles as a cache key
+    return str(resolve_index_path())
 
 def _faiss_files_exist(p: str) -> bool:
     return os.path.exists(os.path.join(p, "index.faiss")) and os.path.exists(os.path.join(p, "index.pkl"))
 
+@lru_cache(maxsize=2)
 def _load_vectorstore(idx_path: str, embed_model: str):
-    embeddings = OpenAIEmbeddings(model=embed_model)
-    return FAISS.load_local(idx_path, embeddings, allow_dangerous_deserialization=True)
+    # Queries must use the model the build was made with (build.json), else embed_model
+    return load_vectorstore(idx_path, index_embeddings(idx_path, embed_model))
 
 def _get_retriever(k: int = 3):
     idx_path = _get_index_path()
@@ -52,3 +59,33 @@ def _find_doc_by_id(retriever, case_id: str, fallback_k: int = 5):
         return candidates[0]
     broad = retriever.get_relevant_documents("case law " + case_id)[:fallback_k]
     return broad[0] if broad else None
+
+def _filtered_docs(vectorstore, query: str, k: int, courts: Optional[List[str]] = None,
+                   year_from: Optional[int] = None, year_to: Optional[int] = None,
+                   topics: Optional[List[str]] = None) -> List[Any]:
+    """Top-k chunks for `query` among rows passing the court/year/topic filters (column-table mask)."""
+    mask = columns_for(vectorstore).mask(courts=courts, year_from=year_from, year_to=year_to, topics=topics)
+    if not mask.any():
+        return []
+    rows, _ = search_rows(vectorstore, vectorstore.embedding_function.embed_query(query), k, mask)
+    return [vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(r)]) for r in rows]
+
+def _neighbour_chunks(vectorstore, doc, window: int = 1) -> List[Any]:
+    """
+    The chunk plus up to `window` chunks either side of it, in case order,
+    by following prev_id/next_id links in the docstore (no extra search).
+    """
+    chain = [doc]
+    for key, at_front in (("prev_id", True), ("next_id", False)):
+        cur = doc
+        for _ in range(window):
+            nid = _get_meta(cur).get(key)
+            found = vectorstore.docstore.search(nid) if nid else None
+            if found is None or isinstance(found, str):  # InMemoryDocstore returns a message when missing
+                break
+            if at_front:
+                chain.insert(0, found)
+            else:
+                chain.append(found)
+            cur = found
+    return chain
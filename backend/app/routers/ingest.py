@@ -1,79 +1,271 @@
 # ==========================================================
 # /ingest — build FAISS index from normalized JSONL
 # ==========================================================
-from fastapi import APIRouter, HTTPException
+# Runs as a background job:
+#   POST /ingest            → start (or resume) a job, returns job_id
+#   GET  /ingest/{job_id}   → progress, records/sec and ETA
+# Records are streamed from disk and embedded in fixed-size
+# batches into a new build directory under LEXCHAIN_INDEX_PATH
+# (builds/<timestamp>-<job_id>). The build is checkpointed as
+# it grows and only published (current → build) once the
+# whole file has succeeded.
+# ==========================================================
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 from pydantic import BaseModel
-from typing import Dict, Any, List
-import os, json
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import os, json, threading, time, uuid
 
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
+from ..indexing.columns import write_columns
+from ..indexing.embed_cache import CachedEmbeddings
+from ..indexing.providers import get_embeddings
+from ..indexing.versions import BUILDS_DIR, new_build_dir, publish, write_manifest
+
 router = APIRouter(prefix="/ingest", tags=["Ingest"])
 
 DATA_ROOT = os.getenv("LEXCHAIN_DATA_PATH", "./data")
 NORMALIZED_FILE = os.path.join(DATA_ROOT, "normalized", "cases_normalized.jsonl")
 INDEX_PATH = os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")
+BATCH_SIZE = int(os.getenv("LEXCHAIN_INGEST_BATCH", "256"))
+EMBED_MODEL = os.getenv("LEXCHAIN_EMBED_MODEL", "text-embedding-3-small")
+CHECKPOINT_EVERY = int(os.getenv("LEXCHAIN_INGEST_CHECKPOINT_EVERY", "10"))  # batches
+
+_JOBS: Dict[str, "IngestJob"] = {}
+_JOBS_LOCK = threading.Lock()
+
+# ---------- Models ----------
+class IngestJob(BaseModel):
+    job_id: str
+    status: str = "queued"          # queued | running | succeeded | failed
+    records_total: int = 0
+    records_done: int = 0           # lines of the JSONL consumed so far
+    records_skipped: int = 0        # of those, lines that were not valid JSON
+    indexed: int = 0                # texts actually embedded
+    lines_done: int = 0
+    resumed_from: int = 0           # records_done when the current run started
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    index_path: str = INDEX_PATH
+    version: Optional[str] = None   # build directory name, published on success
+    error: Optional[str] = None
+
+class IngestStatus(IngestJob):
+    elapsed_sec: float = 0.0
+    records_per_sec: float = 0.0
+    eta_sec: Optional[float] = None
+    note: str = ""
+
+# ---------- Paths ----------
+def _staging_path(job: IngestJob) -> str:
+    """The job's build directory, created on first use."""
+    if job.version is None:
+        job.version = new_build_dir(INDEX_PATH, suffix=job.job_id).name
+    return os.path.join(INDEX_PATH, BUILDS_DIR, job.version)
+
+def _job_file(job_id: str) -> Optional[str]:
+    builds = os.path.join(INDEX_PATH, BUILDS_DIR)
+    if os.path.isdir(builds):
+        for name in os.listdir(builds):
+            if name.endswith(f"-{job_id}"):
+                return os.path.join(builds, name, "job.json")
+    return None
 
-class IngestResult(BaseModel):
-    ok: bool
-    count: int
-    index_path: str
-    note: str
+def _save_job(job: IngestJob):
+    path = os.path.join(_staging_path(job), "job.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job.dict(), f, indent=2)
+    os.replace(tmp, path)
 
-def _load_records() -> List[Dict[str, Any]]:
+def _load_job(job_id: str) -> Optional[IngestJob]:
+    with _JOBS_LOCK:
+        if job_id in _JOBS:
+            return _JOBS[job_id]
+    p = _job_file(job_id)
+    if p is None or not os.path.exists(p):
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        return IngestJob(**json.load(f))
+
+# ---------- Streaming ----------
+def _count_records() -> int:
+    if not os.path.exists(NORMALIZED_FILE):
+        return 0
+    with open(NORMALIZED_FILE, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+def _iter_records(skip_lines: int = 0) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """Yield (line_no, record) one line at a time, starting after `skip_lines` (record None: invalid JSON)."""
     if not os.path.exists(NORMALIZED_FILE):
-        return []
-    out: List[Dict[str, Any]] = []
+        return
     with open(NORMALIZED_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
+        for line_no, line in enumerate(f, 1):
+            if line_no <= skip_lines or not line.strip():
                 continue
             try:
-                out.append(json.loads(line))
+                record = json.loads(line)
             except Exception:
-                continue
-    return out
+                record = None
+            yield line_no, record
 
-@router.post("", response_model=IngestResult)
-def build_index():
+def _iter_batches(skip_lines: int, size: int) -> Iterator[Tuple[int, int, int, List[str], List[Dict[str, Any]]]]:
     """
-    Build/update FAISS index at LEXCHAIN_INDEX_PATH.
-    Uses OpenAI text-embedding-3-small for title+summary fields.
+    Group streamed records into (last_line, n_records, n_skipped, texts,
+    metadatas) batches; n_records counts every consumed line, n_skipped the
+    invalid ones among them, so records_done reaches records_total.
     """
-    records = _load_records()
-    if not records:
-        raise HTTPException(status_code=400, detail="No normalized records found to ingest.")
-
-    # Prepare texts + metadatas
-    texts = []
-    metadatas = []
-    for r in records:
-        text = f"{r.get('title','')}\n\n{r.get('summary','')}".strip()
-        if not text:
-            # Skip empty rows
+    texts: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    n_records, n_skipped, last_line = 0, 0, skip_lines
+    for line_no, r in _iter_records(skip_lines):
+        n_records += 1
+        last_line = line_no
+        if r is None:
+            n_skipped += 1
             continue
-        texts.append(text)
-        metadatas.append({
-            "id": r.get("id"),
-            "title": r.get("title"),
-            "url": r.get("url"),
-            "court": r.get("court"),
-            "date": r.get("date"),
-        })
-
-    if not texts:
-        raise HTTPException(status_code=400, detail="No valid texts to index.")
-
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vectorstore = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
-
-    os.makedirs(INDEX_PATH, exist_ok=True)
-    vectorstore.save_local(INDEX_PATH)
-
-    return IngestResult(
-        ok=True,
-        count=len(texts),
-        index_path=INDEX_PATH,
-        note="FAISS updated successfully."
+        text = f"{r.get('title','')}\n\n{r.get('summary','')}".strip()
+        if text:
+            texts.append(text)
+            metadatas.append({
+                "id": r.get("id"),
+                "title": r.get("title"),
+                "url": r.get("url"),
+                "court": r.get("court"),
+                "date": r.get("date"),
+            })
+        if len(texts) >= size:
+            yield last_line, n_records, n_skipped, texts, metadatas
+            texts, metadatas, n_records, n_skipped = [], [], 0, 0
+    if n_records:
+        yield last_line, n_records, n_skipped, texts, metadatas
+
+# ---------- Publish ----------
+def _publish(staging: str, vectorstore, job: IngestJob):
+    """
+    Seal the finished build with its manifest and make it the live index.
+    The job's final record (job.json, status succeeded) is written first and
+    sealed with the build, so GET /ingest/{job_id} still answers after a restart.
+    """
+    job.status, job.finished_at = "succeeded", time.time()
+    _save_job(job)
+    write_columns(vectorstore, staging)
+    write_manifest(staging, vectorstore, EMBED_MODEL, source="ingest", records=job.records_done)
+    publish(staging, INDEX_PATH)
+
+# ---------- Worker ----------
+def _run_job(job: IngestJob):
+    staging = _staging_path(job)
+    job.status = "running"
+    job.started_at = time.time()
+    job.resumed_from = job.records_done
+    _save_job(job)
+    vectorstore = None
+    try:
+        embeddings = CachedEmbeddings(get_embeddings(EMBED_MODEL), EMBED_MODEL)
+        if job.lines_done and os.path.exists(os.path.join(staging, "index.faiss")):
+            vectorstore = FAISS.load_local(staging, embeddings, allow_dangerous_deserialization=True)
+
+        batches_since_checkpoint = 0
+        for last_line, n_records, n_skipped, texts, metadatas in _iter_batches(job.lines_done, BATCH_SIZE):
+            if texts:
+                if vectorstore is None:
+                    vectorstore = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
+                else:
+                    vectorstore.add_texts(texts=texts, metadatas=metadatas)
+            job.lines_done = last_line
+            job.records_done += n_records
+            job.records_skipped += n_skipped
+            job.indexed += len(texts)
+            batches_since_checkpoint += 1
+            if vectorstore is not None and batches_since_checkpoint >= CHECKPOINT_EVERY:
+                vectorstore.save_local(staging)
+                _save_job(job)
+                batches_since_checkpoint = 0
+
+        if vectorstore is None:
+            raise RuntimeError("No valid texts to index.")
+        vectorstore.save_local(staging)
+        _publish(staging, vectorstore, job)
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        # Keep the staging index in step with lines_done so a resume neither skips nor repeats rows
+        if vectorstore is not None:
+            try:
+                vectorstore.save_local(staging)
+            except Exception:
+                for name in ("index.faiss", "index.pkl"):
+                    p = os.path.join(staging, name)
+                    if os.path.exists(p):
+                        os.remove(p)
+                job.lines_done, job.records_done, job.records_skipped, job.indexed = 0, 0, 0, 0
+    finally:
+        if job.status == "failed":
+            job.finished_at = time.time()
+            _save_job(job)
+
+def _status(job: IngestJob) -> IngestStatus:
+    end = job.finished_at or time.time()
+    elapsed = max(0.0, end - job.started_at) if job.started_at else 0.0
+    rate = (job.records_done - job.resumed_from) / elapsed if elapsed > 0 else 0.0
+    remaining = max(0, job.records_total - job.records_done)
+    eta = None
+    if job.status == "running" and rate > 0:
+        eta = round(remaining / rate, 1)
+    elif job.status == "succeeded":
+        eta = 0.0
+    notes = {
+        "queued": "Job queued.",
+        "running": "Embedding in progress; live index unchanged until success.",
+        "succeeded": "FAISS updated successfully.",
+        "failed": "Job failed; live index unchanged. POST /ingest?resume=<job_id> to continue.",
+    }
+    return IngestStatus(
+        **job.dict(),
+        elapsed_sec=round(elapsed, 1),
+        records_per_sec=round(rate, 2),
+        eta_sec=eta,
+        note=notes.get(job.status, ""),
     )
+
+# ---------- Endpoints ----------
+@router.post("", response_model=IngestStatus, status_code=202)
+def build_index(
+    background_tasks: BackgroundTasks,
+    resume: Optional[str] = Query(None, description="job_id of a failed job to resume from its last checkpoint"),
+):
+    """
+    Start a background job that builds the FAISS index at LEXCHAIN_INDEX_PATH.
+    Embeds title+summary fields with LEXCHAIN_EMBED_MODEL (default OpenAI
+    text-embedding-3-small; `local:<path>` for a local CPU model).
+    """
+    if resume:
+        job = _load_job(resume)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Ingest job not found: {resume}")
+        if job.status == "succeeded":
+            raise HTTPException(status_code=400, detail="Job already succeeded; nothing to resume.")
+    else:
+        total = _count_records()
+        if not total:
+            raise HTTPException(status_code=400, detail="No normalized records found to ingest.")
+        job = IngestJob(job_id=uuid.uuid4().hex[:12], records_total=total)
+
+    # Check and register in one critical section so concurrent POSTs can't both start a job
+    with _JOBS_LOCK:
+        if any(j.status in ("queued", "running") for j in _JOBS.values()):
+            raise HTTPException(status_code=409, detail="An ingest job is already running.")
+        job.status, job.error, job.finished_at = "queued", None, None
+        _JOBS[job.job_id] = job
+    _save_job(job)
+    background_tasks.add_task(_run_job, job)
+    return _status(job)
+
+@router.get("/{job_id}", response_model=IngestStatus)
+def ingest_status(job_id: str):
+    """Report progress of an ingest job (records/sec and ETA)."""
+    job = _load_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job not found: {job_id}")
+    return _status(job)
@@ -1,14 +1,20 @@
-import os
+import json, os
 from datetime import datetime
 from typing import Optional
 
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import FAISS
 
+from ...indexing.providers import get_embeddings as _provider_embeddings
+
 MEM_ENV_PATH = "LEXCHAIN_MEMORY_PATH"
 MEM_DEFAULT_PATH = "./data/memory/faiss_memory_v1"
-EMB_ENV_MODEL = "LEXCHAIN_EMBED_MODEL"
+# The memory index is not a versioned case-index build, so it does not follow
+# LEXCHAIN_EMBED_MODEL: it has its own setting, and the model it was created
+# with is recorded next to it (memory.json) and used from then on.
+EMB_ENV_MODEL = "LEXCHAIN_MEMORY_EMBED_MODEL"
 EMB_DEFAULT_MODEL = "text-embedding-3-small"
+MEM_MANIFEST = "memory.json"
 
 # Constant marker to identify the bootstrap doc we keep in the index
 _PLACEHOLDER_TEXT = "__lexchain_memory_bootstrap__"
@@ -17,11 +23,26 @@ _PLACEHOLDER_META = {"_placeholder": True, "_created": "bootstrap"}
 def get_memory_path() -> str:
     return os.getenv(MEM_ENV_PATH, MEM_DEFAULT_PATH)
 
-def get_embed_model_name() -> str:
-    return os.getenv(EMB_ENV_MODEL, EMB_DEFAULT_MODEL)
+def _read_manifest(path: str) -> dict:
+    try:
+        with open(os.path.join(path, MEM_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(path: str, embed_model: str):
+    tmp = os.path.join(path, MEM_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"embed_model": embed_model, "created_at": datetime.utcnow().isoformat() + "Z"}, f, indent=2)
+    os.replace(tmp, os.path.join(path, MEM_MANIFEST))
+
+def get_embed_model_name(path: Optional[str] = None) -> str:
+    """The model the memory index at `path` was built with, else LEXCHAIN_MEMORY_EMBED_MODEL."""
+    recorded = _read_manifest(path or get_memory_path()).get("embed_model")
+    return recorded or os.getenv(EMB_ENV_MODEL, EMB_DEFAULT_MODEL)
 
-def get_embeddings() -> OpenAIEmbeddings:
-    return OpenAIEmbeddings(model=get_embed_model_name())
+def get_embeddings(path: Optional[str] = None) -> Embeddings:
+    return _provider_embeddings(get_embed_model_name(path))
 
 def _faiss_files_exist(path: str) -> bool:
     return (
@@ -37,7 +58,8 @@ def load_or_create_vectorstore(path: Optional[str] = None) -> FAISS:
     path = path or get_memory_path()
     os.makedirs(path, exist_ok=True)
 
-    embeddings = get_embeddings()
+    embed_model = get_embed_model_name(path)
+    embeddings = _provider_embeddings(embed_model)
     if _faiss_files_exist(path):
         return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
     else:
@@ -47,12 +69,16 @@ def load_or_create_vectorstore(path: Optional[str] = None) -> FAISS:
             metadatas=[_PLACEHOLDER_META],
         )
         vs.save_local(path)
+        _write_manifest(path, embed_model)
         return vs
 
 def save_vectorstore(vs: FAISS, path: Optional[str] = None) -> str:
     path = path or get_memory_path()
     os.makedirs(path, exist_ok=True)
     vs.save_local(path)
+    if not _read_manifest(path):
+        # memory index from before memory.json: pin the model it was loaded with
+        _write_manifest(path, get_embed_model_name(path))
     return path
 
 def is_placeholder(meta: dict) -> bool:
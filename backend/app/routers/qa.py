@@ -3,13 +3,17 @@
 # ==========================================================
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 import os
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 
+from ..indexing.compressed import load_vectorstore
+from ..indexing.providers import index_embeddings
+from ..indexing.versions import resolve_index_path
+
 router = APIRouter(prefix="/qa", tags=["QA"])
 
 INDEX_PATH = os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")
@@ -32,11 +36,16 @@ class AskBody(BaseModel):
     query: str
 
 def _load_faiss():
-    # Return (vectorstore | None)
-    if not os.path.exists(os.path.join(INDEX_PATH, "index.faiss")):
+    # Return (vectorstore | None) for the live build
+    path = str(resolve_index_path(INDEX_PATH))
+    if not os.path.exists(os.path.join(path, "index.faiss")):
         return None
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    return FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+    return _load_build(path)
+
+@lru_cache(maxsize=2)
+def _load_build(path: str):
+    # Keyed by build directory: publishing a new build changes the key
+    return load_vectorstore(path, index_embeddings(path))
 
 def _run_retrieval(query: str, k: int = 8):
     vs = _load_faiss()
@@ -1,8 +1,10 @@
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 from langchain.docstore.document import Document
 import os, json
 
+from app.indexing.embed_cache import CachedEmbeddings
+from app.indexing.providers import get_embeddings
+
 INDEX_PATH = "./data/indexes/faiss_v1"
 os.makedirs(INDEX_PATH, exist_ok=True)
 
@@ -14,7 +16,9 @@ with open("./data/normalized/cases_normalized.jsonl", "r", encoding="utf-8") as
         text = f"{row.get('title','')}\n{row.get('summary','')}"
         docs.append(Document(page_content=text, metadata={"id": row.get("id","")}))
 
-emb = OpenAIEmbeddings(model="text-embedding-3-small")
+EMBED_MODEL = os.getenv("LEXCHAIN_EMBED_MODEL", "text-embedding-3-small")
+emb = CachedEmbeddings(get_embeddings(EMBED_MODEL), EMBED_MODEL)
 db = FAISS.from_documents(docs, emb)
 db.save_local(INDEX_PATH)
 print("✅ FAISS saved to", INDEX_PATH)
+print(f"   embedding cache: {emb.hits} hits, {emb.misses} embedded")
@@ -0,0 +1,188 @@
+# ==========================================================
+# LexChain — Hybrid Case-Page Fetcher
+# ==========================================================
+# HKLII case pages (/en/cases/<court>/<year>/<n>) carry the
+# judgment in the served HTML, so they are fetched with one
+# pooled async HTTP client (httpx, keep-alive) — no browser
+# tab, no rendering. Only when a 200 response lacks a
+# judgment body (JS shell, block page) is the page handed to
+# the Playwright fallback. Any other status — throttled
+# (429/503), missing (404/410) or failing — raises, so the
+# frontier retries with backoff instead of hitting the host
+# again with a much heavier browser. Rendering stays
+# reserved for the JS-driven search UI.
+#
+# HTML parsing (extract_case_body, parse_result_links) is
+# CPU-bound; given a process pool it runs there, so the event
+# loop keeps driving downloads and the browser while earlier
+# pages are parsed, and throughput scales with cores.
+# ==========================================================
+import asyncio, os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from hklii_parse import extract_case_body
+from rate_limit import CRAWL_CONCURRENCY, THROTTLE_STATUSES, HostLimiter, retry_after_seconds
+
+# ---------- Config ----------
+HTTP_TIMEOUT = float(os.getenv("LEXCHAIN_HTTP_TIMEOUT", "20"))
+RENDER_TIMEOUT_MS = 30000
+MIN_BODY_CHARS = 800          # same bar as a record's "ok" flag
+EXTRACT_WORKERS = int(os.getenv("LEXCHAIN_EXTRACT_WORKERS", str(os.cpu_count() or 1)))  # 0 parses inline
+USER_AGENT = os.getenv(
+    "LEXCHAIN_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36 LexChain/1.0",
+)
+
+def make_client(concurrency: int = CRAWL_CONCURRENCY) -> httpx.AsyncClient:
+    """One keep-alive connection pool shared by every request of a crawl."""
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+        limits=httpx.Limits(max_connections=max(1, concurrency), max_keepalive_connections=max(1, concurrency)),
+    )
+
+def make_extract_pool(workers: int = EXTRACT_WORKERS) -> Optional[ProcessPoolExecutor]:
+    """Process pool for HTML parsing; None (workers=0) parses on the event loop."""
+    return ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+async def run_cpu(executor: Optional[Executor], fn: Callable, *args):
+    """fn(*args) in `executor` without blocking the event loop (inline if None)."""
+    if executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+def has_judgment_body(case: Dict[str, Any]) -> bool:
+    return case.get("length", 0) > MIN_BODY_CHARS
+
+def conditional_headers(validators: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since from stored validators (frontier rows, listings)."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def response_validators(r: httpx.Response) -> Dict[str, Optional[str]]:
+    return {"etag": r.headers.get("etag"), "last_modified": r.headers.get("last-modified")}
+
+def error_status(e: BaseException) -> Optional[int]:
+    """HTTP status behind a failed fetch (None for transport errors), for Frontier.fail."""
+    response = getattr(e, "response", None) if isinstance(e, httpx.HTTPStatusError) else None
+    return response.status_code if response is not None else None
+
+class BrowserRenderer:
+    """
+    A browser_fetch for tools that have no browser of their own: headless
+    Chromium launched on the first render only (Playwright is imported then,
+    so it is needed only if a page actually has to be rendered), one tab
+    per limiter slot, every navigation paced by the limiter.
+
+        async with BrowserRenderer(limiter) as renderer:
+            fetcher = CaseFetcher(limiter, browser_fetch=renderer.render)
+    """
+
+    def __init__(self, limiter: HostLimiter):
+        self.limiter = limiter
+        self._pw = self._browser = self._tabs = None
+        self._start: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "BrowserRenderer":
+        self._start = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._pw is not None:
+            await self._pw.stop()
+        self._pw = self._browser = self._tabs = None
+
+    async def _pool(self) -> asyncio.Queue:
+        async with self._start:
+            if self._tabs is None:
+                try:
+                    from playwright.async_api import async_playwright
+                except ImportError as e:
+                    raise RuntimeError("rendering a page needs playwright (pip install playwright)") from e
+                self._pw = await async_playwright().start()
+                self._browser = await self._pw.chromium.launch(headless=True)
+                context = await self._browser.new_context(user_agent=USER_AGENT)
+                tabs = asyncio.Queue()
+                for _ in range(max(1, self.limiter.concurrency)):
+                    tab = await context.new_page()
+                    tab.set_default_timeout(RENDER_TIMEOUT_MS)
+                    tabs.put_nowait(tab)
+                self._tabs = tabs
+        return self._tabs
+
+    async def render(self, url: str) -> str:
+        tabs = await self._pool()
+        tab = await tabs.get()
+        try:
+            async with self.limiter.slot(url) as t:
+                resp = await tab.goto(url, wait_until="domcontentloaded")
+                t.status = resp.status if resp is not None else None
+            return await tab.content()
+        finally:
+            tabs.put_nowait(tab)
+
+class CaseFetcher:
+    """
+    fetch(url) → (case record, via, validators) with via "http" or "browser".
+    Given stored validators the HTTP request is conditional, and a 304
+    returns (None, "http", validators); any other non-200 status raises
+    httpx.HTTPStatusError. The browser fallback is any coroutine
+    url → HTML (e.g. a pooled tab), used only for a 200 without a
+    judgment body. Both paths are paced by the same per-host limiter.
+    """
+
+    def __init__(self, limiter: HostLimiter, client: Optional[httpx.AsyncClient] = None,
+                 browser_fetch: Optional[Callable[[str], Awaitable[str]]] = None,
+                 executor: Optional[Executor] = None):
+        self.limiter = limiter
+        self.client = client or make_client(limiter.concurrency)
+        self.browser_fetch = browser_fetch
+        self.executor = executor
+        self.stats = {"http": 0, "browser": 0, "not_modified": 0}
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def extract(self, html: str) -> Dict[str, Any]:
+        return await run_cpu(self.executor, extract_case_body, html)
+
+    async def fetch_http(self, url: str, validators: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        async with self.limiter.slot(url) as t:
+            r = await self.client.get(url, headers=conditional_headers(validators))
+            t.status = r.status_code
+            if r.status_code in THROTTLE_STATUSES:
+                t.retry_after = retry_after_seconds(r.headers.get("retry-after"))
+        return r
+
+    async def fetch(self, url: str, validators: Optional[Dict[str, Any]] = None
+                    ) -> Tuple[Optional[Dict[str, Any]], str, Dict[str, Optional[str]]]:
+        r = await self.fetch_http(url, validators)
+        if r.status_code == 304:
+            self.stats["not_modified"] += 1
+            return None, "http", response_validators(r)
+        if r.status_code != 200:
+            raise httpx.HTTPStatusError(f"HTTP {r.status_code}: {url}", request=r.request, response=r)
+        case = await self.extract(r.text)
+        if has_judgment_body(case) or self.browser_fetch is None:
+            self.stats["http"] += 1
+            return case, "http", response_validators(r)
+        print(f"    ↳ no judgment body ({case.get('length', 0)} chars); rendering {url}")
+        return await self.render(url), "browser", {"etag": None, "last_modified": None}
+
+    async def render(self, url: str) -> Dict[str, Any]:
+        """The page rendered by the browser fallback, extracted."""
+        html = await self.browser_fetch(url)
+        self.stats["browser"] += 1
+        return await self.extract(html)
@@ -0,0 +1,238 @@
+# ==========================================================
+# LexChain — HKLII Corpus Store
+# ==========================================================
+# Purpose:
+#   One SQLite file holding every cached judgment, replacing
+#   one pretty-printed case_*.json per case. Metadata lives in
+#   typed columns (year/length as INTEGER, ok as 0/1) and the
+#   judgment text as a zlib-compressed blob, so full-corpus
+#   scans are a sequential read of a single file.
+#
+# Usage:
+#   python tools/corpus_store.py migrate [--src DIR] [--delete]
+#   python tools/corpus_store.py stats
+# ==========================================================
+import argparse, hashlib, json, os, sqlite3, time, zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from hklii_parse import case_key_from_url, extract_case_body
+
+# ---------- Config ----------
+BASE_DIR = Path(__file__).resolve().parent              # .../backend/tools
+PROJECT_ROOT = BASE_DIR.parent                          # .../backend
+CACHE_DIR = (PROJECT_ROOT / "data" / "hklii_cache").resolve()
+CORPUS_PATH = Path(os.getenv("LEXCHAIN_CORPUS_PATH", str(CACHE_DIR / "corpus.sqlite3")))
+ZLIB_LEVEL = 6
+
+_COLUMNS = (
+    "case_key", "url", "title", "court", "year", "date", "length", "ok",
+    "source", "query", "ts", "headers_seen", "content", "content_hash", "updated_at",
+)
+
+# ---------- Coercion (legacy cache stored everything as strings) ----------
+def _to_int(v) -> Optional[int]:
+    if v is None or v == "" or v == "None":
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+def _to_bool(v) -> Optional[bool]:
+    if isinstance(v, bool) or v is None:
+        return v
+    return str(v).strip().lower() in ("true", "1", "yes")
+
+def _to_str(v) -> Optional[str]:
+    if v is None or v == "None":
+        return None
+    return str(v)
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+# ---------- Store ----------
+class CorpusStore:
+    """Typed, compressed case store. Use as a context manager or call close()."""
+
+    def __init__(self, path: Optional[Path] = None, readonly: bool = False):
+        self.path = Path(path or CORPUS_PATH)
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS cases (
+                       case_key     TEXT PRIMARY KEY,
+                       url          TEXT,
+                       title        TEXT,
+                       court        TEXT,
+                       year         INTEGER,
+                       date         TEXT,
+                       length       INTEGER,
+                       ok           INTEGER,
+                       source       TEXT,
+                       query        TEXT,
+                       ts           TEXT,
+                       headers_seen TEXT,
+                       content      BLOB,
+                       content_hash TEXT,
+                       updated_at   REAL
+                   )"""
+            )
+            self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    # ----- writes -----
+    def put(self, case: Dict[str, Any], commit: bool = True) -> str:
+        """Insert or replace one case record (as produced by extract_case_body + crawl fields)."""
+        url = case.get("url") or ""
+        key = case.get("case_key") or case_key_from_url(url)
+        text = case.get("content") or ""
+        length = _to_int(case.get("length"))
+        row = (
+            key,
+            url,
+            _to_str(case.get("title")),
+            _to_str(case.get("court")),
+            _to_int(case.get("year")),
+            _to_str(case.get("date")),
+            length if length is not None else len(text),
+            None if case.get("ok") is None else int(_to_bool(case.get("ok"))),
+            _to_str(case.get("source")),
+            _to_str(case.get("query")),
+            _to_str(case.get("ts")),
+            json.dumps(case.get("headers_seen") or [], ensure_ascii=False),
+            zlib.compress(text.encode("utf-8"), ZLIB_LEVEL),
+            content_hash(text),
+            time.time(),
+        )
+        self._conn.execute(f"INSERT OR REPLACE INTO cases ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", row)
+        if commit:
+            self._conn.commit()
+        return key
+
+    def commit(self):
+        self._conn.commit()
+
+    def delete(self, case_key: str):
+        self._conn.execute("DELETE FROM cases WHERE case_key = ?", (case_key,))
+        self._conn.commit()
+
+    # ----- reads -----
+    @staticmethod
+    def _row_to_case(row: sqlite3.Row, with_content: bool = True) -> Dict[str, Any]:
+        case = dict(row)
+        if "content" in case:
+            case["content"] = zlib.decompress(case["content"]).decode("utf-8") if with_content and case["content"] else ""
+        if "ok" in case and case["ok"] is not None:
+            case["ok"] = bool(case["ok"])
+        if "headers_seen" in case:
+            case["headers_seen"] = json.loads(case["headers_seen"] or "[]")
+        return case
+
+    def has(self, case_key: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM cases WHERE case_key = ?", (case_key,)).fetchone() is not None
+
+    def get(self, case_key: str) -> Optional[Dict[str, Any]]:
+        self._conn.row_factory = sqlite3.Row
+        row = self._conn.execute("SELECT * FROM cases WHERE case_key = ?", (case_key,)).fetchone()
+        self._conn.row_factory = None
+        return self._row_to_case(row) if row else None
+
+    def iter_cases(self, min_length: int = 0, keys: Optional[list] = None) -> Iterator[Dict[str, Any]]:
+        """Stream cases in storage order (sequential scan), optionally limited to `keys`."""
+        cur = self._conn.cursor()
+        cur.row_factory = sqlite3.Row
+        if keys is None:
+            cur.execute("SELECT * FROM cases WHERE COALESCE(length, 0) >= ? ORDER BY rowid", (min_length,))
+            for row in cur:
+                yield self._row_to_case(row)
+        else:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                cur.execute(
+                    f"SELECT * FROM cases WHERE case_key IN ({','.join('?' * len(part))}) AND COALESCE(length, 0) >= ?",
+                    [*part, min_length],
+                )
+                for row in cur.fetchall():
+                    yield self._row_to_case(row)
+
+    def content_hashes(self, min_length: int = 0) -> Dict[str, str]:
+        """case_key → content_hash, without touching the content blobs."""
+        rows = self._conn.execute(
+            "SELECT case_key, content_hash FROM cases WHERE COALESCE(length, 0) >= ?", (min_length,)
+        )
+        return dict(rows.fetchall())
+
+    def fingerprints(self) -> Dict[str, tuple]:
+        """case_key → (content_hash, date), for revisit scheduling."""
+        return {k: (h, d) for k, h, d in self._conn.execute("SELECT case_key, content_hash, date FROM cases")}
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+# ---------- Migration ----------
+def migrate(src: Path, dest: Path, delete: bool = False) -> int:
+    """Import legacy case_*.json files (string-typed, some with raw html) into the store."""
+    files = sorted(src.glob("case_*.json"))
+    print(f"[i] Migrating {len(files)} case files from {src} → {dest}")
+    migrated = []
+    with CorpusStore(dest) as store:
+        for fp in files:
+            try:
+                with open(fp, "r", encoding="utf-8") as f:
+                    j = json.load(f)
+                if not j.get("content") and j.get("html"):
+                    # index_walk used to save raw HTML only — extract it now
+                    extracted = extract_case_body(j.pop("html"))
+                    extracted.update({k: v for k, v in j.items() if k not in extracted})
+                    extracted["source"] = extracted.get("source") or "HKLII"
+                    extracted["ok"] = extracted.get("length", 0) > 800
+                    j = extracted
+                if not j.get("url"):
+                    j["case_key"] = fp.stem[len("case_"):].replace("_", "/")
+                store.put(j, commit=False)
+                migrated.append(fp)
+                if len(migrated) % 500 == 0:
+                    store.commit()
+                    print(f"    ↳ {len(migrated)}/{len(files)}")
+            except Exception as e:
+                print(f"[x] Failed to migrate {fp.name}: {e}")
+        store.commit()
+    if delete:
+        for fp in migrated:
+            fp.unlink()
+        print(f"[i] Removed {len(migrated)} legacy case files.")
+    print(f"[✓] Migrated {len(migrated)} cases → {dest}")
+    return len(migrated)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LexChain HKLII corpus store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="Import legacy case_*.json files")
+    m.add_argument("--src", type=Path, default=CACHE_DIR, help="Folder holding case_*.json")
+    m.add_argument("--dest", type=Path, default=CORPUS_PATH, help="Corpus SQLite file")
+    m.add_argument("--delete", action="store_true", help="Delete the JSON files after migrating")
+    s = sub.add_parser("stats", help="Show corpus size")
+    s.add_argument("--dest", type=Path, default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        migrate(args.src, args.dest, delete=args.delete)
+    else:
+        with CorpusStore(args.dest, readonly=True) as store:
+            size = args.dest.stat().st_size
+            print(f"[i] {store.count()} cases, {size / 1e6:.1f} MB → {args.dest}")
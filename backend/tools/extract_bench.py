@@ -0,0 +1,321 @@
+# ==========================================================
+# LexChain — Judgment Extractor Benchmark
+# ==========================================================
+# Purpose:
+#   Compare the two judgment extractors in hklii_parse.py
+#   (reference: BeautifulSoup + fuzzy date; fast: lxml +
+#   HKLII selectors + strict date regexes) on saved HKLII
+#   case pages.
+#
+#   build  — sample stored case keys per court × year, save
+#            each raw page as pages/<stem>.html.gz and write
+#            golden.jsonl: the reference extractor's output
+#            plus the expected fields — court and citation year
+#            from the case key, judgment date from the info
+#            panel (app.indexing.normalize). Pages come from
+#            HKLII (through the rate limiter) or from a folder
+#            of saved .html files. --reconstruct (offline)
+#            instead rebuilds synthetic pages from corpus store
+#            records inside the site chrome of a saved HKLII
+#            page (rendered_search.html).
+#   run    — time both extractors over the saved pages
+#            (pages/sec) and report field accuracy: agreement
+#            with the golden output (title, court, year, date,
+#            content overlap) and correctness against the
+#            expected fields.
+#            --check exits 1 when the fast extractor is less
+#            accurate than the reference on any key-checked
+#            field or its content drifts from golden.
+#
+# The committed corpus under data/extract_bench is synthetic
+# (--reconstruct): its breadcrumb and info panel are laid out
+# by reconstruct_page and the expected date is read from that
+# same panel, so tests/test_extract_smoke.py is a smoke test
+# of both extractors, not evidence of real-page parity. That
+# takes a corpus built from real fetched pages.
+#
+# Usage:
+#   python tools/extract_bench.py build [--per-bucket 3] [--from-dir DIR | --reconstruct]
+#   python tools/extract_bench.py run [--repeat 3] [--check]
+# ==========================================================
+import argparse, asyncio, gzip, html as htmllib, json, os, random, re, sys, time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # backend/ → app.indexing
+from app.indexing.normalize import extract_fields
+from corpus_store import CORPUS_PATH, CorpusStore
+from hklii_parse import case_file_stem, case_key_from_url, extract_case_body_fast, extract_case_body_reference
+
+# ---------- Config ----------
+BASE_DIR = Path(__file__).resolve().parent
+BENCH_DIR = Path(os.getenv("LEXCHAIN_BENCH_DIR", str(BASE_DIR.parent / "data" / "extract_bench")))
+CACHE_DIR = (BASE_DIR.parent / "data" / "hklii_cache").resolve()
+CHROME_PAGE = CACHE_DIR / "rendered_search.html"   # a saved HKLII page, for --reconstruct
+RECONSTRUCT_BODY_CHARS = 6000                      # judgment text kept per reconstructed page
+BASE_URL = "https://www.hklii.hk"
+COURT_NAMES = {
+    "hkcfa": "Court of Final Appeal",
+    "hkca": "Court of Appeal",
+    "hkcfi": "Court of First Instance",
+    "hkdc": "District Court",
+    "hkmagc": "Magistrates’ Court",
+}
+MIN_CONTENT_OVERLAP = 0.98     # token Jaccard vs golden below this counts as a content miss
+FIELDS = ("title", "court", "year", "date")
+
+_KEY_RE = re.compile(r"^en/cases/([a-z]+)/(\d{4})/\d+$")
+
+def key_truth(case_key: str, text: str = "") -> Dict[str, Any]:
+    """
+    Expected fields: court and citation year as encoded in
+    en/cases/<court>/<year>/<n>, and the judgment date from the info panel
+    at the head of `text` (the normalizer's parser, independent of both
+    extractors).
+    """
+    m = _KEY_RE.match(case_key)
+    fields, _ = extract_fields(text or "")
+    return {
+        "court": COURT_NAMES.get(m.group(1)) if m else None,
+        "year": int(m.group(2)) if m else None,
+        "date": fields.get("judgment_date"),
+    }
+
+def token_overlap(a: str, b: str) -> float:
+    ta, tb = set(a.split()), set(b.split())
+    if not ta and not tb:
+        return 1.0
+    return len(ta & tb) / len(ta | tb)
+
+# ---------- Corpus ----------
+def page_path(case_key: str) -> Path:
+    return BENCH_DIR / "pages" / f"{case_file_stem(case_key)}.html.gz"
+
+def save_page(case_key: str, html: str):
+    path = page_path(case_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(html)
+
+def load_golden() -> List[Dict[str, Any]]:
+    path = BENCH_DIR / "golden.jsonl"
+    if not path.exists():
+        raise FileNotFoundError(f"No benchmark corpus at {path} — run `extract_bench.py build` first")
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def sample_keys(per_bucket: int, seed: int) -> List[str]:
+    """Up to `per_bucket` stored case keys per (court, year), so old and new layouts are both covered."""
+    buckets = defaultdict(list)
+    with CorpusStore(CORPUS_PATH, readonly=True) as store:
+        for key in sorted(store.fingerprints()):
+            m = _KEY_RE.match(key)
+            if m:
+                buckets[m.groups()].append(key)
+    rng = random.Random(seed)
+    keys = []
+    for bucket in sorted(buckets):
+        keys.extend(rng.sample(buckets[bucket], min(per_bucket, len(buckets[bucket]))))
+    return keys
+
+async def download(keys: List[str]) -> Dict[str, str]:
+    from case_fetcher import CaseFetcher
+    from rate_limit import HostLimiter
+
+    fetcher = CaseFetcher(HostLimiter(adaptive=True))
+    pages = {}
+
+    async def one(key: str):
+        try:
+            r = await fetcher.fetch_http(f"{BASE_URL}/{key}")
+            if r.status_code == 200:
+                pages[key] = r.text
+            else:
+                print(f"[!] HTTP {r.status_code}: {key}")
+        except Exception as e:
+            print(f"[x] {key}: {type(e).__name__}: {e}")
+
+    try:
+        await asyncio.gather(*(one(k) for k in keys))
+    finally:
+        await fetcher.aclose()
+    return pages
+
+def read_dir(src: Path) -> Dict[str, str]:
+    """Saved pages named <stem>.html(.gz); the case key is read back from the stem."""
+    pages = {}
+    for path in sorted(src.iterdir()):
+        name = path.name
+        if not (name.endswith(".html") or name.endswith(".html.gz")):
+            continue
+        stem = name.split(".html")[0]
+        key = case_key_from_url(f"{BASE_URL}/{stem.removeprefix('case_').replace('_', '/')}")
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            pages[key] = f.read()
+    return pages
+
+_PAGE_HEAD_RE = re.compile(r"^HKLII Databases (.+?) (\[\d{4}\] [A-Za-z]+ \d+) (.+?) (Judgment Information .+? Toggle Highlight) ")
+
+def reconstruct_page(case: Dict[str, Any], chrome: str) -> str:
+    """
+    A synthetic case page rebuilt from a stored record: the saved page's site chrome
+    around a <main> holding the breadcrumb, citation, title and info panel
+    split off the stored text, then the judgment (first
+    RECONSTRUCT_BODY_CHARS characters) with the record's headings as <h2>.
+    """
+    esc = htmllib.escape
+    text = case.get("content") or ""
+    m = _PAGE_HEAD_RE.match(text)
+    if m:
+        court, cit, title, panel = m.groups()
+        head = (f'<ul class="v-breadcrumbs breadcrumbbar"><li><a href="/">HKLII</a></li>'
+                f'<li><a href="/en/databases">Databases</a></li><li><span>{esc(court)}</span></li></ul>'
+                f'<div class="casehead"><span class="citation">{esc(cit)}</span>'
+                f'<div class="casename">{esc(title)}</div></div>'
+                f'<div class="caseinfo">{esc(panel)}</div>')
+        text = text[m.end():]
+    else:
+        head = ""
+    body = text[:RECONSTRUCT_BODY_CHARS].rsplit(" ", 1)[0]
+    parts = [esc(body)]
+    for heading in case.get("headers_seen") or []:
+        parts = [p for part in parts for p in _split_heading(part, esc(heading))]
+    judgment = "".join(p if p.startswith("<h2>") else f"<p>{p.strip()}</p>" for p in parts if p.strip())
+    start, end = chrome.index("<main"), chrome.index("</main>") + len("</main>")
+    page = (f'{chrome[:start]}<main class="v-main"><div class="v-main__wrap">{head}'
+            f'<div class="judgment-body">{judgment}</div></div></main>{chrome[end:]}')
+    return re.sub(r"<title>.*?</title>", f"<title>{esc(case.get('title') or '')}</title>", page, count=1, flags=re.S)
+
+def _split_heading(part: str, heading: str) -> List[str]:
+    if part.startswith("<h2>") or heading not in part:
+        return [part]
+    before, after = part.split(heading, 1)
+    return [before, f"<h2>{heading}</h2>", after]
+
+def read_stored(per_court: int) -> Dict[str, str]:
+    """Synthetic pages for up to `per_court` stored cases per court, spread over the years."""
+    with open(CHROME_PAGE, "r", encoding="utf-8") as f:
+        chrome = f.read()
+    by_court = defaultdict(list)
+    with CorpusStore(CORPUS_PATH, readonly=True) as store:
+        for key in store.content_hashes():
+            m = _KEY_RE.match(key)
+            if m:
+                by_court[m.group(1)].append((int(m.group(2)), key))
+        keys = []
+        for court in sorted(by_court):
+            cases = sorted(by_court[court])
+            step = max(1, len(cases) // per_court)
+            keys.extend(key for _, key in cases[::step][:per_court])
+        return {case["case_key"]: reconstruct_page(case, chrome) for case in store.iter_cases(keys=keys)}
+
+def build(per_bucket: int, seed: int, src: Optional[Path], reconstruct: bool = False):
+    if reconstruct:
+        pages = read_stored(per_bucket)
+        print(f"[i] Reconstructed {len(pages)} synthetic page(s) from {CORPUS_PATH}")
+    elif src:
+        pages = read_dir(src)
+        print(f"[i] Read {len(pages)} saved page(s) from {src}")
+    else:
+        keys = sample_keys(per_bucket, seed)
+        print(f"[i] Downloading {len(keys)} sampled case page(s) from {BASE_URL}")
+        pages = asyncio.run(download(keys))
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_DIR / "golden.jsonl", "w", encoding="utf-8") as out:
+        for key in sorted(pages):
+            save_page(key, pages[key])
+            ref = extract_case_body_reference(pages[key])
+            ref.pop("headers_seen", None)
+            out.write(json.dumps({"case_key": key, "truth": key_truth(key, ref["content"]), "reference": ref},
+                                 ensure_ascii=False) + "\n")
+    print(f"[✓] {len(pages)} page(s) + golden output → {BENCH_DIR}")
+
+# ---------- Run ----------
+def time_extractor(fn: Callable, pages: List[str], repeat: int) -> float:
+    """Best-of-`repeat` pages/sec over the whole corpus."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        for html in pages:
+            fn(html)
+        best = min(best, time.perf_counter() - t0)
+    return len(pages) / best if best > 0 else float("inf")
+
+def score(outputs: List[Dict[str, Any]], golden: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Share of pages right per field; key.* only over pages with a known
+    expected value (key.date: the panel date, else any date in the citation year).
+    """
+    hits, seen = defaultdict(float), defaultdict(int)
+
+    def tally(field: str, ok: bool):
+        hits[field] += ok
+        seen[field] += 1
+
+    for out, g in zip(outputs, golden):
+        ref, truth = g["reference"], g["truth"]
+        for field in FIELDS:
+            tally(f"golden.{field}", out.get(field) == ref.get(field))
+        tally("golden.content", token_overlap(out.get("content", ""), ref.get("content", "")) >= MIN_CONTENT_OVERLAP)
+        if truth["court"] is not None:
+            tally("key.court", out.get("court") == truth["court"])
+        if truth["year"] is not None:
+            tally("key.year", out.get("year") == truth["year"])
+        if truth.get("date"):
+            tally("key.date", out.get("date") == truth["date"])
+        elif truth["year"] is not None:
+            tally("key.date", (out.get("date") or "")[:4] == str(truth["year"]))
+    return {k: hits[k] / seen[k] for k in seen}
+
+def run(repeat: int, check: bool) -> int:
+    golden = load_golden()
+    pages = []
+    for g in golden:
+        with gzip.open(page_path(g["case_key"]), "rt", encoding="utf-8") as f:
+            pages.append(f.read())
+    print(f"[i] {len(pages)} page(s), {sum(map(len, pages)) / 1e6:.1f} MB of HTML")
+
+    results = {}
+    for name, fn in (("reference", extract_case_body_reference), ("fast", extract_case_body_fast)):
+        rate = time_extractor(fn, pages, repeat)
+        results[name] = score([fn(html) for html in pages], golden)
+        print(f"[i] {name:9s} {rate:8.1f} pages/sec")
+
+    print(f"    {'field':16s} {'reference':>9s} {'fast':>9s}")
+    for field in sorted(results["fast"]):
+        print(f"    {field:16s} {results['reference'][field]:9.1%} {results['fast'][field]:9.1%}")
+
+    if not check:
+        return 0
+    regressions = [f for f in results["fast"] if f.startswith("key.") and results["fast"][f] < results["reference"][f]]
+    if results["fast"]["golden.content"] < 1.0:
+        regressions.append("golden.content")
+    if regressions:
+        print(f"[x] Fast extractor regressed on: {', '.join(regressions)}")
+        return 1
+    print("[✓] Fast extractor is at least as accurate as the reference")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LexChain judgment extractor benchmark")
+    parser.add_argument("--dir", type=Path, default=None, help=f"Benchmark folder (default {BENCH_DIR})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Save case pages and the reference extractor's golden output")
+    b.add_argument("--per-bucket", type=int, default=3, help="Pages per court × year (per court with --reconstruct)")
+    b.add_argument("--seed", type=int, default=0)
+    b.add_argument("--from-dir", type=Path, default=None, help="Use saved <stem>.html(.gz) pages instead of downloading")
+    b.add_argument("--reconstruct", action="store_true", help="Rebuild synthetic pages from the corpus store (offline)")
+    r = sub.add_parser("run", help="Benchmark both extractors against the golden output")
+    r.add_argument("--repeat", type=int, default=3, help="Timing passes (best is reported)")
+    r.add_argument("--check", action="store_true", help="Exit 1 if the fast extractor regresses")
+    args = parser.parse_args()
+
+    if args.dir:
+        BENCH_DIR = args.dir
+    if args.cmd == "build":
+        build(args.per_bucket, args.seed, args.from_dir, args.reconstruct)
+    else:
+        sys.exit(run(args.repeat, args.check))
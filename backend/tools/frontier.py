@@ -0,0 +1,465 @@
+# ==========================================================
+# LexChain — Shared Crawl Frontier
+# ==========================================================
+# Purpose:
+#   One SQLite table of case URLs, keyed by canonical case
+#   key (hklii_parse.case_key_from_url), shared by
+#   index_walk, historical_sweep and nightly_crawl
+#   (CrawlerSession). A URL is fetched only by the process
+#   holding its lease, and a fetched case stays "done" until
+#   it is explicitly requeued — so no case is fetched twice
+#   in a night, whichever tool found it first.
+#
+#   pending → leased → done
+#                    ↘ failed (retry after backoff) → … → dead
+#
+#   A crashed run's leases expire after LEASE_SECONDS and its
+#   URLs are claimed again in discovery order, so a walk
+#   resumes at the exact URL it stopped on. Failures back off
+#   exponentially; after MAX_ATTEMPTS a URL moves to the
+#   dead-letter queue until `retry-dead` puts it back.
+#
+#   The frontier also keeps HTTP validators (ETag /
+#   Last-Modified) for case pages and for listing pages, each
+#   court's high-water mark (newest case number seen, used by
+#   index_walk's freshness mode), and
+#   each case's revisit history — content hash, checks,
+#   changes, last change — from which revisit.py schedules
+#   re-fetches (requeue_due).
+#
+# Usage:
+#   python tools/frontier.py stats
+#   python tools/frontier.py dead [--limit N]
+#   python tools/frontier.py retry-dead [KEY ...]
+# ==========================================================
+import argparse, json, os, random, socket, sqlite3, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import revisit
+from hklii_parse import canonicalize_url, case_key_from_url
+
+# ---------- Config ----------
+BASE_DIR = Path(__file__).resolve().parent              # .../backend/tools
+PROJECT_ROOT = BASE_DIR.parent                          # .../backend
+CACHE_DIR = (PROJECT_ROOT / "data" / "hklii_cache").resolve()
+FRONTIER_PATH = Path(os.getenv("LEXCHAIN_FRONTIER_PATH", str(CACHE_DIR / "frontier.sqlite3")))
+SITE_URL = "https://www.hklii.hk"
+LEASE_SECONDS = int(os.getenv("LEXCHAIN_FRONTIER_LEASE", "120"))
+MAX_ATTEMPTS = int(os.getenv("LEXCHAIN_FRONTIER_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = 600          # 10 min, 20 min, 40 min, … between attempts
+RETRY_MAX_SECONDS = 24 * 3600
+REFETCH_MIN_AGE = float(os.getenv("LEXCHAIN_REFETCH_MIN_AGE_H", "20")) * 3600  # "once a night"
+
+STATUSES = ("pending", "leased", "done", "failed", "dead")
+_REVISIT_COLUMNS = (
+    ("content_hash", "TEXT"), ("decided", "TEXT"),
+    ("checks", "INTEGER NOT NULL DEFAULT 0"), ("changes", "INTEGER NOT NULL DEFAULT 0"),
+    ("last_changed", "REAL"), ("revisit_interval", "REAL"), ("next_revisit", "REAL"),
+)
+
+def _owner(tool: str) -> str:
+    return f"{tool}@{socket.gethostname()}:{os.getpid()}"
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before attempt `attempts + 1`, with ±20% jitter."""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+# ---------- Frontier ----------
+class Frontier:
+    """Lease-based URL frontier. Use as a context manager or call close()."""
+
+    def __init__(self, path: Optional[Path] = None, tool: str = "crawl", lease_seconds: int = LEASE_SECONDS):
+        self.path = Path(path or FRONTIER_PATH)
+        self.owner = _owner(tool)
+        self.lease_seconds = lease_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS frontier (
+                   case_key      TEXT PRIMARY KEY,
+                   url           TEXT NOT NULL,
+                   court         TEXT,
+                   year          INTEGER,
+                   source        TEXT,
+                   status        TEXT NOT NULL DEFAULT 'pending',
+                   attempts      INTEGER NOT NULL DEFAULT 0,
+                   lease_owner   TEXT,
+                   lease_until   REAL,
+                   next_attempt  REAL NOT NULL DEFAULT 0,
+                   last_fetch    REAL,
+                   http_status   INTEGER,
+                   etag          TEXT,
+                   last_modified TEXT,
+                   last_error    TEXT,
+                   added_at      REAL
+               )"""
+        )
+        have = {r[1] for r in self._conn.execute("PRAGMA table_info(frontier)")}
+        for name, decl in _REVISIT_COLUMNS:
+            if name not in have:
+                self._conn.execute(f"ALTER TABLE frontier ADD COLUMN {name} {decl}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status, next_attempt)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_revisit ON frontier (status, next_revisit)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS listings (
+                   url           TEXT PRIMARY KEY,
+                   etag          TEXT,
+                   last_modified TEXT,
+                   links         TEXT,
+                   checked_at    REAL,
+                   closed        INTEGER NOT NULL DEFAULT 0
+               )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS high_water (
+                   court      TEXT PRIMARY KEY,
+                   year       INTEGER NOT NULL,
+                   number     INTEGER NOT NULL,
+                   decided    TEXT,
+                   updated_at REAL
+               )"""
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            self.release_all()
+        finally:
+            self._conn.close()
+
+    # ----- discovery -----
+    def add(self, urls: Iterable[str], source: str, court: Optional[str] = None,
+            year: Optional[int] = None) -> List[str]:
+        """Register case URLs (already known ones are left as they are); returns their keys in order."""
+        keys, rows, now = [], [], time.time()
+        for url in urls:
+            url = canonicalize_url(url)
+            key = case_key_from_url(url)
+            keys.append(key)
+            rows.append((key, url, court, year, source, now))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO frontier (case_key, url, court, year, source, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return keys
+
+    def seed(self, fingerprints: Dict[str, Tuple[Optional[str], Optional[str]]], source: str = "corpus") -> int:
+        """
+        Mark cases already in the corpus ({case_key: (content_hash, date)}) as done,
+        so no tool fetches them again before their first revisit falls due.
+        """
+        before, now = self.count(), time.time()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO frontier (case_key, url, source, status, added_at, content_hash, decided, next_revisit) "
+            "VALUES (?, ?, ?, 'done', ?, ?, ?, ?)",
+            ((k, f"{SITE_URL}/{k}", source, now, h, d, revisit.initial_due(revisit.age_days(k, d, now), now))
+             for k, (h, d) in fingerprints.items()),
+        )
+        self._conn.executemany(  # rows from before revisit tracking
+            "UPDATE frontier SET content_hash = ?, decided = COALESCE(decided, ?) "
+            "WHERE case_key = ? AND content_hash IS NULL AND status = 'done'",
+            ((h, d, k) for k, (h, d) in fingerprints.items()),
+        )
+        return self.count() - before
+
+    # ----- leasing -----
+    def claim(self, limit: int, prefixes: Optional[Iterable[str]] = None,
+              keys: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` fetchable URLs — pending, failed with their backoff
+        elapsed, or leased by a run whose lease expired — oldest discovery first.
+        Restrict to key `prefixes` (e.g. "en/cases/hkca/") or to explicit `keys`.
+        """
+        if limit <= 0:
+            return []
+        now = time.time()
+        where = ["((status IN ('pending', 'failed') AND next_attempt <= ?) OR (status = 'leased' AND lease_until < ?))"]
+        args: List[Any] = [now, now]
+        if prefixes is not None:
+            prefixes = list(prefixes)
+            where.append("(" + " OR ".join("case_key LIKE ?" for _ in prefixes) + ")")
+            args += [p.replace("%", "") + "%" for p in prefixes]
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return []
+            where.append(f"case_key IN ({','.join('?' * len(keys))})")
+            args += keys
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self._conn.execute(
+                "SELECT case_key, url, court, year, attempts, etag, last_modified, last_fetch, content_hash FROM frontier "
+                f"WHERE {' AND '.join(where)} ORDER BY rowid LIMIT ?",
+                [*args, limit],
+            )
+            cols = [d[0] for d in cur.description]
+            rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+            self._conn.executemany(
+                "UPDATE frontier SET status = 'leased', lease_owner = ?, lease_until = ? WHERE case_key = ?",
+                ((self.owner, now + self.lease_seconds, r["case_key"]) for r in rows),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def complete(self, key: str, http_status: int = 200, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, content_hash: Optional[str] = None,
+                 decided: Optional[str] = None) -> bool:
+        """
+        Fetched and stored (or confirmed unchanged by a 304, which keeps the old
+        validators). Updates the revisit history and schedules the next check;
+        returns True if the text changed since the previous fetch.
+        """
+        row = self._conn.execute(
+            "SELECT content_hash, decided, checks, changes, last_changed, revisit_interval FROM frontier WHERE case_key = ?",
+            (key,),
+        ).fetchone()
+        old_hash, old_decided, checks, changes, last_changed, interval = row or (None, None, 0, 0, None, None)
+        now = time.time()
+        first = old_hash is None and content_hash is not None
+        changed = not first and content_hash is not None and content_hash != old_hash
+        if not first:
+            checks = (checks or 0) + 1
+        if changed:
+            changes = (changes or 0) + 1
+        if first or changed:
+            last_changed = now
+        decided = decided or old_decided
+        interval = revisit.next_interval(interval, changed, revisit.age_days(key, decided, now), first)
+        self._conn.execute(
+            """UPDATE frontier SET status = 'done', attempts = 0, lease_owner = NULL, lease_until = NULL,
+                   last_fetch = ?, http_status = ?, last_error = NULL,
+                   etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),
+                   content_hash = COALESCE(?, content_hash), decided = ?, checks = ?, changes = ?,
+                   last_changed = ?, revisit_interval = ?, next_revisit = ?
+               WHERE case_key = ?""",
+            (now, http_status, etag, last_modified, content_hash, decided, checks, changes,
+             last_changed, interval, now + interval, key),
+        )
+        return changed
+
+    def fail(self, key: str, error: str, http_status: Optional[int] = None) -> str:
+        """Count a failed attempt; schedules a retry or dead-letters the URL. Returns the new status."""
+        row = self._conn.execute("SELECT attempts FROM frontier WHERE case_key = ?", (key,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        status = "dead" if attempts >= MAX_ATTEMPTS else "failed"
+        now = time.time()
+        self._conn.execute(
+            """UPDATE frontier SET status = ?, attempts = ?, lease_owner = NULL, lease_until = NULL,
+                   next_attempt = ?, last_fetch = ?, http_status = ?, last_error = ?
+               WHERE case_key = ?""",
+            (status, attempts, now + backoff_seconds(attempts), now, http_status, str(error)[:500], key),
+        )
+        return status
+
+    def release(self, keys: Iterable[str]):
+        """Hand leased URLs back untouched (e.g. the run's quota was reached first)."""
+        self._conn.executemany(
+            "UPDATE frontier SET status = CASE WHEN attempts > 0 THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, lease_until = NULL WHERE case_key = ? AND status = 'leased' AND lease_owner = ?",
+            ((k, self.owner) for k in keys),
+        )
+
+    def release_all(self):
+        self._conn.execute(
+            "UPDATE frontier SET status = CASE WHEN attempts > 0 THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, lease_until = NULL WHERE status = 'leased' AND lease_owner = ?",
+            (self.owner,),
+        )
+
+    def requeue(self, keys: Iterable[str], min_age: float = REFETCH_MIN_AGE) -> int:
+        """Make done URLs fetchable again, unless fetched within the last `min_age` seconds."""
+        cutoff = time.time() - min_age
+        cur = self._conn.executemany(
+            "UPDATE frontier SET status = 'pending', next_attempt = 0 "
+            "WHERE case_key = ? AND status = 'done' AND COALESCE(last_fetch, 0) < ?",
+            ((k, cutoff) for k in keys),
+        )
+        return cur.rowcount
+
+    def requeue_due(self, limit: int, prefixes: Optional[Iterable[str]] = None,
+                    keys: Optional[Iterable[str]] = None, min_age: float = REFETCH_MIN_AGE) -> List[str]:
+        """
+        Requeue up to `limit` done cases whose revisit is due, most likely to
+        have changed first (revisit.change_probability). Returns their keys.
+        """
+        if limit <= 0:
+            return []
+        now = time.time()
+        where = ["status = 'done'", "next_revisit <= ?", "COALESCE(last_fetch, 0) < ?"]
+        args: List[Any] = [now, now - min_age]
+        if prefixes is not None:
+            prefixes = list(prefixes)
+            where.append("(" + " OR ".join("case_key LIKE ?" for _ in prefixes) + ")")
+            args += [p.replace("%", "") + "%" for p in prefixes]
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return []
+            where.append(f"case_key IN ({','.join('?' * len(keys))})")
+            args += keys
+        self._backfill_revisits()
+        cur = self._conn.execute(
+            f"SELECT case_key, decided, changes, last_fetch, added_at FROM frontier WHERE {' AND '.join(where)}", args)
+        cols = [d[0] for d in cur.description]
+        due = [dict(zip(cols, r)) for r in cur.fetchall()]
+        due.sort(key=lambda r: revisit.change_probability(r, now), reverse=True)
+        chosen = [r["case_key"] for r in due[:limit]]
+        self.requeue(chosen, min_age)
+        return chosen
+
+    def _backfill_revisits(self):
+        """Give done rows that predate revisit tracking a first (spread-out) due time."""
+        rows = self._conn.execute(
+            "SELECT case_key, decided, COALESCE(last_fetch, added_at) FROM frontier "
+            "WHERE status = 'done' AND next_revisit IS NULL").fetchall()
+        if rows:
+            self._conn.executemany(
+                "UPDATE frontier SET next_revisit = ? WHERE case_key = ?",
+                ((revisit.initial_due(revisit.age_days(k, d), t), k) for k, d, t in rows),
+            )
+
+    def revisits_due(self) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE status = 'done' AND next_revisit <= ?", (time.time(),)
+        ).fetchone()[0]
+
+    # ----- dead letters -----
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        cur = self._conn.execute(
+            "SELECT case_key, url, attempts, http_status, last_error, last_fetch FROM frontier "
+            "WHERE status = 'dead' ORDER BY last_fetch DESC LIMIT ?", (limit,)
+        )
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def retry_dead(self, keys: Optional[Iterable[str]] = None) -> int:
+        if keys is None:
+            cur = self._conn.execute(
+                "UPDATE frontier SET status = 'pending', attempts = 0, next_attempt = 0 WHERE status = 'dead'")
+        else:
+            cur = self._conn.executemany(
+                "UPDATE frontier SET status = 'pending', attempts = 0, next_attempt = 0 "
+                "WHERE case_key = ? AND status = 'dead'", ((k,) for k in keys))
+        return cur.rowcount
+
+    # ----- listings -----
+    def listing(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT etag, last_modified, links, checked_at, closed FROM listings WHERE url = ?", (url,)
+        ).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "links": json.loads(row[2]) if row[2] else None,
+                "checked_at": row[3], "closed": bool(row[4])}
+
+    def set_listing(self, url: str, etag: Optional[str], last_modified: Optional[str], links: List[str]):
+        self._conn.execute(
+            """INSERT INTO listings (url, etag, last_modified, links, checked_at) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified,
+                   links = excluded.links, checked_at = excluded.checked_at""",
+            (url, etag, last_modified, json.dumps(links), time.time()),
+        )
+
+    def touch_listing(self, url: str):
+        self._conn.execute("UPDATE listings SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def close_listing(self, url: str):
+        """A listing that will not change again (a past year) whose every case is done."""
+        self._conn.execute("UPDATE listings SET closed = 1 WHERE url = ?", (url,))
+
+    def closed_listings(self) -> set:
+        return {r[0] for r in self._conn.execute("SELECT url FROM listings WHERE closed = 1")}
+
+    # ----- high-water marks -----
+    def high_water(self, court: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT year, number, decided, updated_at FROM high_water WHERE court = ?",
+                                 (court,)).fetchone()
+        return dict(zip(("year", "number", "decided", "updated_at"), row)) if row else None
+
+    def raise_high_water(self, court: str, year: int, number: int, decided: Optional[str] = None):
+        """Move a court's mark forward to (year, number); never backwards."""
+        self._conn.execute(
+            """INSERT INTO high_water (court, year, number, decided, updated_at) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(court) DO UPDATE SET year = excluded.year, number = excluded.number,
+                   decided = COALESCE(excluded.decided, decided), updated_at = excluded.updated_at
+               WHERE (excluded.year, excluded.number) > (high_water.year, high_water.number)""",
+            (court, year, number, decided, time.time()),
+        )
+
+    # ----- counts -----
+    def status(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT status FROM frontier WHERE case_key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def open_count(self, prefix: str) -> int:
+        """URLs under `prefix` not yet done (dead letters excluded)."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE case_key LIKE ? AND status IN ('pending', 'leased', 'failed')",
+            (prefix.replace("%", "") + "%",),
+        ).fetchone()[0]
+
+    def done_fraction(self, keys: Iterable[str]) -> float:
+        """Share of `keys` already fetched (0.0 for none)."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0.0
+        done = 0
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            done += self._conn.execute(
+                f"SELECT COUNT(*) FROM frontier WHERE status = 'done' AND case_key IN ({','.join('?' * len(part))})", part
+            ).fetchone()[0]
+        return done / len(keys)
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status").fetchall())
+        return {s: counts.get(s, 0) for s in STATUSES}
+
+def open_frontier(tool: str, store=None) -> Frontier:
+    """Frontier for `tool`, with every case already in `store` (a CorpusStore) marked done."""
+    frontier = Frontier(tool=tool)
+    if store is not None:
+        added = frontier.seed(store.fingerprints())
+        if added:
+            print(f"[i] Frontier: marked {added} stored case(s) as done")
+    return frontier
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LexChain shared crawl frontier")
+    parser.add_argument("--path", type=Path, default=FRONTIER_PATH, help="Frontier SQLite file")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="URLs per status")
+    d = sub.add_parser("dead", help="List dead-lettered URLs")
+    d.add_argument("--limit", type=int, default=50)
+    r = sub.add_parser("retry-dead", help="Put dead-lettered URLs back in the queue")
+    r.add_argument("keys", nargs="*", help="Case keys (default: all dead letters)")
+    args = parser.parse_args()
+
+    with Frontier(args.path, tool="cli") as frontier:
+        if args.cmd == "stats":
+            stats = frontier.stats()
+            print(f"[i] {sum(stats.values())} URLs → {args.path}")
+            for status, n in stats.items():
+                print(f"    ↳ {status:8s} {n}")
+            print(f"[i] {frontier.revisits_due()} revisit(s) due")
+        elif args.cmd == "dead":
+            for row in frontier.dead_letters(args.limit):
+                print(f"[x] {row['case_key']}  attempts={row['attempts']} http={row['http_status']}  {row['last_error']}")
+        else:
+            n = frontier.retry_dead(args.keys or None)
+            print(f"[✓] Requeued {n} dead-lettered URL(s)")
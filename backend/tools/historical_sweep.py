@@ -4,85 +4,112 @@
 # Purpose:
 #   Collect HKLII cases by topic × year × court.
 #   Designed for deep precedent gathering (CFI, CA, CFA).
+#   All queries share one Playwright CrawlerSession (one
+#   browser launch for the whole sweep); case URLs are
+#   leased from the shared frontier (frontier.py), so a case
+#   found by several topic/year/court queries — or already
+#   fetched by another tool — is fetched once.
+#
+# Scheduling:
+#   One worker per court, up to SWEEP_PARALLEL at a time,
+#   each on its own search tab. There are no fixed sleeps:
+#   every request goes through one adaptive limiter
+#   (rate_limit.py, AIMD) that speeds up while HKLII answers
+#   quickly and backs off on slow responses, errors and 429s
+#   — that shared rate is the sweep's global budget.
+#   A combination whose first results page is already
+#   ≥ SWEEP_MAX_OVERLAP crawled is not paginated further.
 # ==========================================================
 
-import subprocess, time, datetime, os
+import asyncio, datetime, os, sys
 from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent))
+from hklii_playwright_extract import START_URL, CrawlerSession
+from rate_limit import HostLimiter
 
 # ---------- Config ----------
 TOPIC_FILE = Path(__file__).parent / "topics.txt"
 YEARS_FILE = Path(__file__).parent / "years.txt"
 COURTS_FILE = Path(__file__).parent / "courts.txt"
-LOG_DIR = Path("../data/hklii_cache/logs").resolve()
+LOG_DIR = (Path(__file__).resolve().parent.parent / "data" / "hklii_cache" / "logs").resolve()
 PROGRESS_FILE = LOG_DIR / "sweep_progress.log"
 
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_PER_QUERY = 50          # results per combination
-DELAY_BETWEEN_QUERIES = 90  # seconds delay between queries
-PYTHON_CMD = r"C:\Users\user\Desktop\LexChain\.venv\Scripts\python.exe"
+SWEEP_PARALLEL = int(os.getenv("LEXCHAIN_SWEEP_PARALLEL", "3"))           # courts swept at once
+SWEEP_MAX_OVERLAP = float(os.getenv("LEXCHAIN_SWEEP_MAX_OVERLAP", "0.8"))  # 1.0 always paginates
+SWEEP_MAX_QUERIES = int(os.getenv("LEXCHAIN_SWEEP_MAX_QUERIES", "0"))     # per run; 0 = no limit
 
-# ---------- Timestamp ----------
-ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 log_path = LOG_DIR / f"historical_sweep_log_{datetime.date.today().isoformat()}.txt"
 
-with open(log_path, "a", encoding="utf-8") as log:
-    log.write(f"\n=== Historical Sweep Started: {ts} ===\n")
+def log(line: str):
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
 
 # ---------- Load Inputs ----------
-def load_list(path: Path):
+def load_list(path: Path) -> List[str]:
     if not path.exists():
         raise FileNotFoundError(f"Required file missing: {path}")
     with open(path, "r", encoding="utf-8") as f:
         return [line.strip() for line in f if line.strip()]
 
-topics = load_list(TOPIC_FILE)
-years = load_list(YEARS_FILE)
-courts = load_list(COURTS_FILE)
-
 # ---------- Progress Tracking ----------
-completed = set()
-if PROGRESS_FILE.exists():
+def read_completed() -> set:
+    if not PROGRESS_FILE.exists():
+        return set()
     with open(PROGRESS_FILE, "r", encoding="utf-8") as f:
-        completed = {line.strip() for line in f if line.strip()}
-
-# ---------- Sweep Loop ----------
-for court in courts:
-    for year in years:
-        for topic in topics:
-            key = f"{court}_{year}_{topic}"
-            if key in completed:
-                continue
-
-            query = f"{topic} {year} {court}"
-            cmd = [
-                PYTHON_CMD,
-                "tools/hklii_playwright_extract.py",
-                "--query", query,
-                "--max", str(MAX_PER_QUERY)
-            ]
-
-            start = datetime.datetime.now()
-            with open(log_path, "a", encoding="utf-8") as log:
-                log.write(f"[{start:%H:%M:%S}] Starting: {query}\n")
-
-            try:
-                subprocess.run(cmd, check=True)
-                with open(PROGRESS_FILE, "a", encoding="utf-8") as prog:
-                    prog.write(key + "\n")
-                status = "✓"
-            except subprocess.CalledProcessError as e:
-                status = f"x ({e})"
-
-            # Delay
-            time.sleep(DELAY_BETWEEN_QUERIES)
-
-            end = datetime.datetime.now()
-            with open(log_path, "a", encoding="utf-8") as log:
-                log.write(f"[{end:%H:%M:%S}] {status} Finished: {query}\n")
-
-# ---------- Completion ----------
-with open(log_path, "a", encoding="utf-8") as log:
-    log.write(f"=== Historical Sweep Completed at {datetime.datetime.now():%H:%M:%S} ===\n")
-
-print(f"[✓] Historical sweep finished. Log saved → {log_path}")
+        return {line.strip() for line in f if line.strip()}
+
+def mark_completed(key: str):
+    with open(PROGRESS_FILE, "a", encoding="utf-8") as prog:
+        prog.write(key + "\n")
+
+# ---------- Sweep ----------
+async def sweep(topics: List[str], years: List[str], courts: List[str]):
+    completed = read_completed()
+    limiter = HostLimiter(adaptive=True)
+    budget = {"queries": 0}
+    parallel = max(1, min(SWEEP_PARALLEL, len(courts)))
+    gate = asyncio.Semaphore(parallel)
+
+    async def court_worker(session: CrawlerSession, court: str):
+        async with gate:
+            for year in years:
+                for topic in topics:
+                    key = f"{court}_{year}_{topic}"
+                    if key in completed:
+                        continue
+                    if SWEEP_MAX_QUERIES and budget["queries"] >= SWEEP_MAX_QUERIES:
+                        return
+                    budget["queries"] += 1
+
+                    query = f"{topic} {year} {court}"
+                    log(f"[{datetime.datetime.now():%H:%M:%S}] Starting: {query}")
+                    summary = (await session.run_queries([query], MAX_PER_QUERY, SWEEP_MAX_OVERLAP))[0]
+                    if "error" in summary:
+                        status = f"x ({summary['error']})"
+                    else:
+                        mark_completed(key)
+                        status = "✓ (overlap, not paginated)" if summary.get("truncated") else "✓"
+                    log(f"[{datetime.datetime.now():%H:%M:%S}] {status} Finished: {query} "
+                        f"@ {limiter.current_rate(START_URL):.2f} req/s")
+
+    print(f"[i] Sweeping {len(courts)} court(s) × {len(years)} year(s) × {len(topics)} topic(s), "
+          f"{parallel} court(s) at a time ({len(completed)} combinations already done)")
+    async with CrawlerSession(tool="historical_sweep", limiter=limiter, search_tabs=parallel) as session:
+        await asyncio.gather(*(court_worker(session, court) for court in courts))
+
+    for host, ctl in limiter.controllers.items():
+        print(f"[i] {host}: {ctl.rate:.2f} req/s at the end | {ctl.counts}")
+
+def main():
+    log(f"\n=== Historical Sweep Started: {datetime.datetime.now():%Y-%m-%d %H:%M:%S} ===")
+    asyncio.run(sweep(load_list(TOPIC_FILE), load_list(YEARS_FILE), load_list(COURTS_FILE)))
+    log(f"=== Historical Sweep Completed at {datetime.datetime.now():%H:%M:%S} ===")
+    print(f"[✓] Historical sweep finished. Log saved → {log_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# ==========================================================
+# LexChain — HKLII page parsing helpers
+# ==========================================================
+# Pure HTML/URL helpers shared by the Playwright extractor,
+# the index-walk collector and the corpus store. No browser
+# or network dependencies, so they can run anywhere.
+#
+# Two judgment extractors return the same record shape:
+#   • extract_case_body_reference — BeautifulSoup, generic
+#     selectors, fuzzy date parse of the headings (original);
+#   • extract_case_body_fast — one lxml parse, compiled
+#     XPaths, HKLII's "Judgment Information" panel and
+#     breadcrumb for date and court, strict date regexes
+#     before any fuzzy parse.
+# extract_case_body is the one picked by LEXCHAIN_EXTRACTOR
+# (reference | fast). The default stays reference until the
+# fast path is shown to match it on real saved judgment
+# pages; tools/extract_bench.py compares them.
+# ==========================================================
+import os, re
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+from dateutil import parser as dtparser
+from lxml import etree, html as lxml_html
+
+EXTRACTOR = os.getenv("LEXCHAIN_EXTRACTOR", "reference")
+MIN_BODY_CHARS = 800
+
+def clean_text(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip())
+
+def guess_year(text: str) -> Optional[int]:
+    m = re.search(r"(19|20)\d{2}", text)
+    return int(m.group(0)) if m else None
+
+def normalize_url(href: str) -> str:
+    href = (href or "").strip()
+    if not href:
+        return ""
+    if href.startswith("http"):
+        return href
+    if href.startswith("/"):
+        return f"https://www.hklii.hk{href}"
+    return f"https://www.hklii.hk/{href.lstrip('./')}"
+
+def canonicalize_url(url: str) -> str:
+    s = urlsplit(url)
+    path = s.path.rstrip("/")
+    return urlunsplit((s.scheme, s.netloc, path, "", ""))
+
+def case_key_from_url(url: str) -> str:
+    s = urlsplit(canonicalize_url(url))
+    return s.path.lower().lstrip("/")
+
+def extract_case_body_reference(html: str) -> Dict[str, Any]:
+    soup = BeautifulSoup(html, "lxml")
+    title = clean_text(soup.title.get_text()) if soup.title else ""
+    selectors = [
+        "article", "#content", "main", ".judgment", ".content",
+        "#main", ".casebody", ".judgment-content"
+    ]
+    body_text = ""
+    for sel in selectors:
+        el = soup.select_one(sel)
+        if el:
+            body_text = clean_text(el.get_text(" "))
+            if len(body_text) > 800:
+                break
+    if len(body_text) < 800:
+        body_text = clean_text(soup.get_text(" "))
+
+    header_candidates = []
+    for sel in ["h1", "h2", ".header", ".title", ".heading"]:
+        for el in soup.select(sel):
+            txt = clean_text(el.get_text(" "))
+            if txt:
+                header_candidates.append(txt)
+
+    header_blob = " | ".join(header_candidates[:5])
+    year = guess_year(header_blob) or guess_year(title) or guess_year(body_text)
+    court = None
+    for key in [
+        "Court of Final Appeal", "Court of Appeal",
+        "Court of First Instance", "District Court",
+        "Magistrates’ Court",
+    ]:
+        if re.search(re.escape(key), header_blob, re.IGNORECASE) or re.search(
+            re.escape(key), title, re.IGNORECASE
+        ):
+            court = key
+            break
+
+    date_iso = None
+    try:
+        dt = dtparser.parse(header_blob, fuzzy=True)
+        if dt:
+            date_iso = dt.date().isoformat()
+    except Exception:
+        pass
+
+    return {
+        "title": title,
+        "court": court,
+        "year": year,
+        "date": date_iso,
+        "content": body_text,
+        "length": len(body_text),
+        "headers_seen": header_candidates[:8],
+    }
+
+# ---------- Fast extractor ----------
+def _by_id(name: str) -> str:
+    return f"//*[@id='{name}']"
+
+def _by_class(name: str) -> str:
+    return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+# Same selectors, in the same order, as the reference extractor
+_BODY_XPATHS = [etree.XPath(x) for x in (
+    "//article", _by_id("content"), "//main", _by_class("judgment"), _by_class("content"),
+    _by_id("main"), _by_class("casebody"), _by_class("judgment-content"),
+)]
+_HEADER_XPATHS = [etree.XPath(x) for x in (
+    "//h1", "//h2", _by_class("header"), _by_class("title"), _by_class("heading"),
+)]
+_COURTS = ("Court of Final Appeal", "Court of Appeal", "Court of First Instance", "District Court", "Magistrates’ Court")
+_COURT_RE = re.compile("|".join(re.escape(c) for c in _COURTS), re.I)
+_CRUMB_RE = re.compile(r"\bDatabases\s+(" + "|".join(re.escape(c) for c in _COURTS) + ")", re.I)
+_CITATION_COURTS = dict(zip(("hkcfa", "hkca", "hkcfi", "hkdc", "hkmagc"), _COURTS))
+_CITATION_RE = re.compile(r"\[((?:19|20)\d{2})\]\s+(HKCFA|HKCA|HKCFI|HKDC|HKMagC)\s+\d+", re.I)
+_MONTHS = {m[:3].lower(): i for i, m in enumerate(
+    ("January", "February", "March", "April", "May", "June", "July",
+     "August", "September", "October", "November", "December"), 1)}
+_DMY = r"(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\.?,?\s+((?:19|20)\d{2})"
+_INFO_DATE_RE = re.compile(r"Judgment Information\s+Date\s*:?\s*" + _DMY)        # HKLII metadata panel
+_LABELLED_DATE_RE = re.compile(
+    r"Date of (?:Judgment|Decision|Delivery|Handing[- ]down(?: of)?(?: (?:the )?Reasons(?: for (?:Judgment|Decision))?)?"
+    r"|Reasons for (?:Judgment|Decision))\s*:?\s*" + _DMY, re.I)
+_HEAD_CHARS = 5000     # dates and court are looked for in the opening text only
+
+def _node_text(el, sep: str = " ") -> str:
+    return clean_text(sep.join(el.itertext()))
+
+def _dmy(m: "re.Match") -> Optional[str]:
+    month = _MONTHS.get(m.group(2)[:3].lower())
+    if not month:
+        return None
+    try:
+        return datetime(int(m.group(3)), month, int(m.group(1))).date().isoformat()
+    except ValueError:
+        return None
+
+def _strict_fuzzy_date(text: str) -> Optional[str]:
+    """Fuzzy parse, kept only if day, month and year all came from the text."""
+    try:
+        a = dtparser.parse(text, fuzzy=True, default=datetime(1904, 1, 1))
+        b = dtparser.parse(text, fuzzy=True, default=datetime(1908, 2, 2))
+    except (ValueError, OverflowError):
+        return None
+    return a.date().isoformat() if a == b else None
+
+def judgment_date(header_blob: str, head: str) -> Optional[str]:
+    """Panel date, else a labelled judgment/decision date, else a fully specified date in the headings."""
+    for rx, text in ((_INFO_DATE_RE, head), (_LABELLED_DATE_RE, head), (_LABELLED_DATE_RE, header_blob)):
+        for m in rx.finditer(text):
+            d = _dmy(m)
+            if d:
+                return d
+    return _strict_fuzzy_date(header_blob) if header_blob else None
+
+def _empty_case() -> Dict[str, Any]:
+    return {"title": "", "court": None, "year": None, "date": None, "content": "",
+            "length": 0, "headers_seen": []}
+
+def extract_case_body_fast(html: str) -> Dict[str, Any]:
+    if not html or not html.strip():
+        return _empty_case()
+    try:
+        try:
+            root = lxml_html.fromstring(html)
+        except ValueError:  # str carrying an <?xml encoding=...?> declaration
+            root = lxml_html.fromstring(html.encode("utf-8"))
+    except etree.ParserError:  # no elements at all, e.g. only a doctype or a comment
+        return _empty_case()
+    etree.strip_elements(root, "script", "style", etree.Comment, with_tail=False)
+    t = root.find(".//title")
+    title = _node_text(t, "") if t is not None else ""
+
+    body_text = ""
+    for xp in _BODY_XPATHS:
+        found = xp(root)
+        if found:
+            body_text = _node_text(found[0])
+            if len(body_text) > MIN_BODY_CHARS:
+                break
+    if len(body_text) < MIN_BODY_CHARS:
+        body_text = _node_text(root)
+
+    header_candidates = []
+    for xp in _HEADER_XPATHS:
+        for el in xp(root):
+            txt = _node_text(el)
+            if txt:
+                header_candidates.append(txt)
+    header_blob = " | ".join(header_candidates[:5])
+    head = body_text[:_HEAD_CHARS]
+
+    # The neutral citation ("[2015] HKCFI 228") names both year and court
+    cit = _CITATION_RE.search(title) or _CITATION_RE.search(header_blob) or _CITATION_RE.search(head[:400])
+    year = int(cit.group(1)) if cit else guess_year(header_blob) or guess_year(title) or guess_year(body_text)
+    if cit:
+        court = _CITATION_COURTS[cit.group(2).lower()]
+    else:
+        m = _COURT_RE.search(header_blob) or _COURT_RE.search(title) or _CRUMB_RE.search(head[:400])
+        name = (m.group(1) if m.re is _CRUMB_RE else m.group(0)) if m else None
+        court = next((c for c in _COURTS if c.lower() == name.lower()), None) if name else None
+
+    return {
+        "title": title,
+        "court": court,
+        "year": year,
+        "date": judgment_date(header_blob, head),
+        "content": body_text,
+        "length": len(body_text),
+        "headers_seen": header_candidates[:8],
+    }
+
+extract_case_body = extract_case_body_fast if EXTRACTOR == "fast" else extract_case_body_reference
+
+def case_file_stem(case_key: str) -> str:
+    """Legacy cache file stem for a case key, e.g. en/cases/hkca/1972/248 → case_en_cases_hkca_1972_248."""
+    return "case_" + re.sub(r"[^a-z0-9]+", "_", case_key).strip("_")[:120]
+
+def parse_result_links(html: str, max_items: int) -> List[Dict[str, str]]:
+    soup = BeautifulSoup(html, "lxml")
+    results: List[Dict[str, str]] = []
+    seen_keys = set()
+    ALLOW = re.compile(r"/(eng/hk|en)/cases/.+(\.html?)?($|\?)", re.I)
+    DENY  = re.compile(r"/en/legis/|/en/reg/|/databases|/about|/news|/donors|hklii2023|/feedback|/operators", re.I)
+    anchors = soup.select(".v-data-table__wrapper a[href], a.routing[href], a[href]")
+    for a in anchors:
+        href = (a.get("href") or "").strip()
+        text = clean_text(a.get_text(" "))
+        if not href or not text:
+            continue
+        url = normalize_url(href)
+        if not url or DENY.search(url) or not ALLOW.search(url):
+            continue
+        key = case_key_from_url(url)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        results.append({"title": text, "url": canonicalize_url(url)})
+        if len(results) >= max_items:
+            break
+    return results
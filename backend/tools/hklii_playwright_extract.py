@@ -1,11 +1,14 @@
 import asyncio, json, os, re, time, argparse
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from urllib.parse import urlsplit, urlunsplit
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
-from bs4 import BeautifulSoup
-from dateutil import parser as dtparser
+from playwright.async_api import async_playwright
+
+from case_fetcher import CaseFetcher, error_status, make_extract_pool, run_cpu
+from corpus_store import CorpusStore, CORPUS_PATH, content_hash
+from frontier import Frontier, open_frontier
+from rate_limit import CRAWL_CONCURRENCY, HostLimiter
+from hklii_parse import case_key_from_url, parse_result_links
 
 # ==========================================================
 # CONFIG — robust, project-root-based paths
@@ -19,6 +22,9 @@ CACHE_DIR.mkdir(parents=True, exist_ok=True)
 RESULTS_PER_RUN_DEFAULT = 3
 NAV_TIMEOUT_MS = 30000  # 30s
 HUMAN_DELAY_SEC = (1.2, 2.2)
+STORAGE_STATE_FILE = CACHE_DIR / "storage_state.json"   # cookies/localStorage reused across sessions
+BLOCKED_RESOURCES = {"image", "font", "media"}          # never needed to read a judgment
+SCREENSHOTS = os.getenv("LEXCHAIN_CRAWL_SCREENSHOTS", "0") == "1"  # debug artefacts of results pages
 
 # ==========================================================
 # HELPERS
@@ -31,88 +37,6 @@ def save_json(p: Path, obj: Any):
 def now_iso():
     return time.strftime("%Y-%m-%dT%H:%M:%S")
 
-def clean_text(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
-
-def guess_year(text: str) -> Optional[int]:
-    m = re.search(r"(19|20)\d{2}", text)
-    return int(m.group(0)) if m else None
-
-def normalize_url(href: str) -> str:
-    href = (href or "").strip()
-    if not href:
-        return ""
-    if href.startswith("http"):
-        return href
-    if href.startswith("/"):
-        return f"https://www.hklii.hk{href}"
-    return f"https://www.hklii.hk/{href.lstrip('./')}"
-
-def canonicalize_url(url: str) -> str:
-    s = urlsplit(url)
-    path = s.path.rstrip("/")
-    return urlunsplit((s.scheme, s.netloc, path, "", ""))
-
-def case_key_from_url(url: str) -> str:
-    s = urlsplit(canonicalize_url(url))
-    return s.path.lower().lstrip("/")
-
-def extract_case_body(html: str) -> Dict[str, Any]:
-    soup = BeautifulSoup(html, "lxml")
-    title = clean_text(soup.title.get_text()) if soup.title else ""
-    selectors = [
-        "article", "#content", "main", ".judgment", ".content",
-        "#main", ".casebody", ".judgment-content"
-    ]
-    body_text = ""
-    for sel in selectors:
-        el = soup.select_one(sel)
-        if el:
-            body_text = clean_text(el.get_text(" "))
-            if len(body_text) > 800:
-                break
-    if len(body_text) < 800:
-        body_text = clean_text(soup.get_text(" "))
-
-    header_candidates = []
-    for sel in ["h1", "h2", ".header", ".title", ".heading"]:
-        for el in soup.select(sel):
-            txt = clean_text(el.get_text(" "))
-            if txt:
-                header_candidates.append(txt)
-
-    header_blob = " | ".join(header_candidates[:5])
-    year = guess_year(header_blob) or guess_year(title) or guess_year(body_text)
-    court = None
-    for key in [
-        "Court of Final Appeal", "Court of Appeal",
-        "Court of First Instance", "District Court",
-        "Magistrates’ Court",
-    ]:
-        if re.search(re.escape(key), header_blob, re.IGNORECASE) or re.search(
-            re.escape(key), title, re.IGNORECASE
-        ):
-            court = key
-            break
-
-    date_iso = None
-    try:
-        dt = dtparser.parse(header_blob, fuzzy=True)
-        if dt:
-            date_iso = dt.date().isoformat()
-    except Exception:
-        pass
-
-    return {
-        "title": title,
-        "court": court,
-        "year": year,
-        "date": date_iso,
-        "content": body_text,
-        "length": len(body_text),
-        "headers_seen": header_candidates[:8],
-    }
-
 async def human_pause(page):
     import random, asyncio
     await asyncio.sleep(random.uniform(*HUMAN_DELAY_SEC))
@@ -124,14 +48,15 @@ async def human_pause(page):
 # ==========================================================
 # PAGE HELPERS
 # ==========================================================
-async def extract_search_results_html(page) -> str:
+async def extract_search_results_html(page, screenshots: bool = False) -> str:
     await page.wait_for_load_state("networkidle", timeout=NAV_TIMEOUT_MS)
     html = await page.content()
-    (CACHE_DIR / "rendered_search.html").write_text(html, encoding="utf-8")
-    try:
-        await page.screenshot(path=str(CACHE_DIR / "rendered_search.png"), full_page=True)
-    except Exception:
-        pass
+    if screenshots:
+        (CACHE_DIR / "rendered_search.html").write_text(html, encoding="utf-8")
+        try:
+            await page.screenshot(path=str(CACHE_DIR / "rendered_search.png"), full_page=True)
+        except Exception:
+            pass
     return html
 
 async def click_next_page(page) -> bool:
@@ -179,51 +104,171 @@ async def click_case_filter(page):
         pass
     return False
 
-def parse_result_links(html: str, max_items: int) -> List[Dict[str, str]]:
-    soup = BeautifulSoup(html, "lxml")
-    results: List[Dict[str, str]] = []
-    seen_keys = set()
-    ALLOW = re.compile(r"/(eng/hk|en)/cases/.+(\.html?)?($|\?)", re.I)
-    DENY  = re.compile(r"/en/legis/|/en/reg/|/databases|/about|/news|/donors|hklii2023|/feedback|/operators", re.I)
-    anchors = soup.select(".v-data-table__wrapper a[href], a.routing[href], a[href]")
-    for a in anchors:
-        href = (a.get("href") or "").strip()
-        text = clean_text(a.get_text(" "))
-        if not href or not text:
-            continue
-        url = normalize_url(href)
-        if not url or DENY.search(url) or not ALLOW.search(url):
-            continue
-        key = case_key_from_url(url)
-        if key in seen_keys:
-            continue
-        seen_keys.add(key)
-        results.append({"title": text, "url": canonicalize_url(url)})
-        if len(results) >= max_items:
-            break
-    return results
-
 # ==========================================================
-# MAIN EXECUTION
+# CRAWLER SESSION
 # ==========================================================
-async def run(query: str, max_results: int = RESULTS_PER_RUN_DEFAULT, headful: bool = False):
-    out_search = CACHE_DIR / f"search_{re.sub(r'[^a-z0-9]+','_',query.lower()).strip('_')}.json"
-    print(f"[i] Starting Playwright for query: {query}")
-
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=not headful, args=["--disable-blink-features=AutomationControlled"])
-        context = await browser.new_context()
-        page = await context.new_page()
-        page.set_default_timeout(NAV_TIMEOUT_MS)
-
-        await page.goto(START_URL, wait_until="domcontentloaded")
-        await human_pause(page)
+def query_slug(query: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', query.lower()).strip('_')
+
+async def _block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+class CrawlerSession:
+    """
+    One Chromium browser and context serving many queries.
+
+        async with CrawlerSession() as session:
+            for q in queries:
+                await session.run_query(q, max_results=5)
+
+    Cookies and localStorage persist in STORAGE_STATE_FILE between
+    sessions; images, fonts and media are never downloaded; screenshots
+    and HTML dumps of results pages are written only when asked for.
+
+    Search runs on a pool of `search_tabs` tabs (one by default), so
+    several queries can be in flight at once. Case pages are fetched concurrently over
+    plain HTTP (case_fetcher.py), falling back to a pool of `concurrency`
+    tabs only for pages served without a judgment body; every request is
+    paced by the per-host limiter (rate_limit.py). Results are stored in
+    search-result order. Case pages and search results are parsed in a
+    process pool (LEXCHAIN_EXTRACT_WORKERS), so navigation never waits on
+    BeautifulSoup: while one page is parsed the next ones download.
+
+    Result links go through the shared crawl frontier (frontier.py): only
+    URLs this session manages to lease are fetched, so a case another
+    tool (or an earlier query) already fetched is skipped unless its
+    revisit is due (revisit.py), and a failed fetch is retried later
+    with backoff rather than immediately.
+    """
+
+    def __init__(self, headful: bool = False, screenshots: bool = SCREENSHOTS,
+                 storage_state: Optional[Path] = STORAGE_STATE_FILE,
+                 concurrency: int = CRAWL_CONCURRENCY, limiter: Optional[HostLimiter] = None,
+                 tool: str = "search", search_tabs: int = 1):
+        self.tool = tool
+        self.search_tabs = max(1, search_tabs)
+        self.headful = headful
+        self.screenshots = screenshots
+        self.storage_state = storage_state
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or HostLimiter(concurrency=self.concurrency)
+        self.store: Optional[CorpusStore] = None
+        self.fetcher: Optional[CaseFetcher] = None
+        self.frontier: Optional[Frontier] = None
+        self.executor = None
+        self._pw = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self._pool: Optional[asyncio.Queue] = None
+        self._search_pool: Optional[asyncio.Queue] = None
+        self._generation = 0
+        self._relaunch: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "CrawlerSession":
+        self._relaunch = asyncio.Lock()
+        self.store = CorpusStore()
+        self.frontier = open_frontier(self.tool, self.store)
+        self.executor = make_extract_pool()
+        self.fetcher = CaseFetcher(self.limiter, browser_fetch=self._render, executor=self.executor)
+        self._pw = await async_playwright().start()
+        await self._launch()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._shutdown()
+        await self._pw.stop()
+        await self.fetcher.aclose()
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.frontier.close()
+        self.store.close()
+
+    async def _launch(self):
+        self.browser = await self._pw.chromium.launch(
+            headless=not self.headful, args=["--disable-blink-features=AutomationControlled"])
+        state = self.storage_state if self.storage_state and self.storage_state.exists() else None
+        self.context = await self.browser.new_context(storage_state=str(state) if state else None)
+        await self.context.route("**/*", _block_heavy_resources)
+        self.page = await self.context.new_page()
+        self.page.set_default_timeout(NAV_TIMEOUT_MS)
+        self._search_pool = asyncio.Queue()
+        self._search_pool.put_nowait(self.page)
+        for _ in range(self.search_tabs - 1):
+            tab = await self.context.new_page()
+            tab.set_default_timeout(NAV_TIMEOUT_MS)
+            self._search_pool.put_nowait(tab)
+        self._generation += 1
+
+    async def _shutdown(self):
+        if self.context is not None:
+            if self.storage_state:
+                try:
+                    await self.context.storage_state(path=str(self.storage_state))
+                except Exception:
+                    pass
+            await self.context.close()
+        if self.browser is not None:
+            await self.browser.close()
+        self.browser = self.context = self.page = None
+        self._pool = self._search_pool = None
+
+    async def _page_pool(self) -> asyncio.Queue:
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            for _ in range(self.concurrency):
+                tab = await self.context.new_page()
+                tab.set_default_timeout(NAV_TIMEOUT_MS)
+                self._pool.put_nowait(tab)
+        return self._pool
+
+    async def _ensure_alive(self):
+        """Relaunch if a previous query crashed the browser (once, however many tasks notice)."""
+        async with self._relaunch:
+            if self.browser is None or not self.browser.is_connected():
+                print("[!] Browser gone; relaunching…")
+                try:
+                    await self._shutdown()
+                except Exception:
+                    self.browser = self.context = self.page = self._pool = self._search_pool = None
+                await self._launch()
+
+    async def _goto(self, page, url: str):
+        """Navigate under the limiter, reporting the response status to it."""
+        async with self.limiter.slot(url) as t:
+            resp = await page.goto(url, wait_until="domcontentloaded")
+            t.status = resp.status if resp is not None else None
+        return resp
+
+    # ----- search -----
+    async def search(self, query: str, max_results: int,
+                     stop_after_first_page: Optional[Callable[[List[Dict[str, Any]]], bool]] = None
+                     ) -> List[Dict[str, Any]]:
+        """
+        Result links for `query` (the search UI is JS-driven, so it is rendered).
+        If `stop_after_first_page(results)` is true, later pages are not opened.
+        """
+        pool, generation = self._search_pool, self._generation
+        page = await pool.get()
+        try:
+            return await self._search(page, query, max_results, stop_after_first_page)
+        finally:
+            if generation == self._generation:  # tabs of a crashed browser are not reused
+                pool.put_nowait(page)
 
+    async def _search(self, page, query: str, max_results: int,
+                      stop_after_first_page: Optional[Callable[[List[Dict[str, Any]]], bool]]) -> List[Dict[str, Any]]:
         search_locators = [
             "input[name='q']", "input[type='search']",
             "input[placeholder*='Search']", "input[placeholder*='search']",
             "form input[type='text']", "input"
         ]
+        # Same tab and cookies every time; with heavy resources blocked the homepage is cheap
+        await self._goto(page, START_URL)
+        await human_pause(page)
         found = False
         for sel in search_locators:
             loc = page.locator(sel)
@@ -238,7 +283,7 @@ async def run(query: str, max_results: int = RESULTS_PER_RUN_DEFAULT, headful: b
                     continue
         if not found:
             print("[!] Could not find search box; using fallback URL…")
-            await page.goto(f"{START_URL}en/search/?q={query}", wait_until="domcontentloaded")
+            await self._goto(page, f"{START_URL}en/search/?q={query}")
 
         await human_pause(page)
         await click_case_filter(page)
@@ -248,75 +293,203 @@ async def run(query: str, max_results: int = RESULTS_PER_RUN_DEFAULT, headful: b
             pass
 
         await human_pause(page)
-        html = await extract_search_results_html(page)
-        results = parse_result_links(html, max_results)
+        html = await extract_search_results_html(page, self.screenshots)
+        results = await run_cpu(self.executor, parse_result_links, html, max_results)
+        if stop_after_first_page is not None and stop_after_first_page(results):
+            return results
 
         while len(results) < max_results:
             moved = await click_next_page(page)
             if not moved:
                 break
             await human_pause(page)
-            html = await extract_search_results_html(page)
-            more = parse_result_links(html, max_results - len(results))
+            html = await extract_search_results_html(page, self.screenshots)
+            more = await run_cpu(self.executor, parse_result_links, html, max_results - len(results))
             results.extend(more)
-
+        return results
+
+    # ----- case pages -----
+    async def _render(self, url: str) -> str:
+        """HTML of a page rendered on a pooled tab (the fetcher's fallback)."""
+        await self._ensure_alive()
+        pool = await self._page_pool()
+        tab = await pool.get()
+        try:
+            await self._goto(tab, url)
+            return await tab.content()
+        finally:
+            pool.put_nowait(tab)
+
+    async def fetch_case(self, url: str, query: str,
+                         validators: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], Dict]:
+        """
+        Fetch one case page (HTTP first, browser if needed) and extract it.
+        Returns (case, response validators); case is None on a 304.
+        """
+        case_data, via, fresh = await self.fetcher.fetch(url, validators)
+        if case_data is None:
+            return None, fresh
+        case_data.update({
+            "source": "HKLII",
+            "url": url,
+            "query": query,
+            "ts": now_iso(),
+            "ok": case_data.get("length", 0) > 800,
+            "via": via,  # http | browser (not stored)
+        })
+        return case_data, fresh
+
+    # ----- one query end to end -----
+    async def run_query(self, query: str, max_results: int = RESULTS_PER_RUN_DEFAULT,
+                        max_overlap: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Search, then fetch and store the result cases. With `max_overlap`, a query
+        whose first results page is already that fraction fetched (per the
+        frontier) is not paginated further — its result set is mostly crawled.
+        """
+        await self._ensure_alive()
+        print(f"[i] Query: {query}")
+        overlap: Dict[str, float] = {}
+
+        def mostly_crawled(first_page: List[Dict[str, Any]]) -> bool:
+            overlap["ratio"] = self.frontier.done_fraction(case_key_from_url(item["url"]) for item in first_page)
+            return bool(first_page) and overlap["ratio"] >= max_overlap
+
+        results = await self.search(query, max_results, mostly_crawled if max_overlap is not None else None)
+        truncated = bool(results) and max_overlap is not None and overlap.get("ratio", 0.0) >= max_overlap
+        if truncated:
+            print(f"[i] {overlap['ratio']:.0%} of the first page already crawled; not paginating")
+        out_search = CACHE_DIR / f"search_{query_slug(query)}.json"
         save_json(out_search, {"query": query, "ts": now_iso(), "count": len(results), "results": results})
         print(f"[i] Saved search JSON → {out_search} (found {len(results)} unique links)")
 
+        # Only URLs leased from the frontier are fetched. Leases are taken a
+        # limiter-sized batch at a time, just before that batch is fetched, so
+        # none expires while waiting behind the rest of the result list; each
+        # batch is in flight at once and awaited in result order so the store
+        # and summary are deterministic
+        keys = self.frontier.add((item["url"] for item in results), source=f"search:{query}")
+        self.frontier.requeue_due(len(keys), keys=keys)   # stored cases are re-fetched only when due
+        items = list(zip(keys, results))
+        batch = max(1, self.limiter.concurrency)
         extracted: List[Dict[str, Any]] = []
-        for i, item in enumerate(results, 1):
-            url = item["url"]
-            print(f"[i] [{i}/{len(results)}] Opening case: {url}")
+        skipped = 0
+        for start in range(0, len(items), batch):
+            part = items[start:start + batch]
+            leased = {row["case_key"]: row for row in self.frontier.claim(len(part), keys=[k for k, _ in part])}
+            tasks = {
+                key: asyncio.ensure_future(self.fetch_case(item["url"], query, leased[key]))
+                for key, item in part if key in leased
+            }
+            for i, (key, item) in enumerate(part, start + 1):
+                url = item["url"]
+                if key not in tasks:
+                    skipped += 1
+                    print(f"[i] [{i}/{len(results)}] {url}\n    ↳ skipped → {key} (already fetched or leased)")
+                    continue
+                try:
+                    case_data, fresh = await tasks[key]
+                    if case_data is None:
+                        self.frontier.complete(key, 304)
+                        skipped += 1
+                        print(f"[i] [{i}/{len(results)}] {url}\n    ↳ not modified → {key}")
+                        continue
+                    h = content_hash(case_data.get("content") or "")
+                    if h == leased[key].get("content_hash"):
+                        self.frontier.complete(key, 200, content_hash=h, decided=case_data.get("date"), **fresh)
+                        skipped += 1
+                        print(f"[i] [{i}/{len(results)}] {url}\n    ↳ unchanged → {key}")
+                        continue
+                    self.store.put(case_data)
+                    self.frontier.complete(key, 200, content_hash=h, decided=case_data.get("date"), **fresh)
+                    print(f"[i] [{i}/{len(results)}] {url}\n    ↳ saved → {key} (len={case_data.get('length')}, via {case_data['via']})")
+                    extracted.append(case_data)
+                except Exception as e:
+                    status = self.frontier.fail(key, e, error_status(e))
+                    print(f"[i] [{i}/{len(results)}] {url}\n    [x] Failed to open/parse: {url} | {e} ({status})")
+
+        summary = {
+            "query": query,
+            "ts": now_iso(),
+            "total_found": len(results),
+            "total_extracted": sum(1 for c in extracted if c.get('ok')),
+            "total_skipped": skipped,
+            "overlap": overlap.get("ratio"),
+            "truncated": truncated,
+            "cases": [
+                {
+                    "title": c.get("title"),
+                    "court": c.get("court"),
+                    "year": c.get("year"),
+                    "date": c.get("date"),
+                    "length": c.get("length"),
+                    "url": c.get("url"),
+                    "ok": c.get("ok")
+                }
+                for c in extracted
+            ],
+        }
+        save_json(CACHE_DIR / f"summary_{query_slug(query)}.json", summary)
+        print(f"[✓] Done. Extracted {summary['total_extracted']} full case(s) out of {summary['total_found']} unique links"
+              f" ({skipped} skipped).")
+        print(f"    ↳ session fetches so far: {self.fetcher.stats['http']} over HTTP, {self.fetcher.stats['browser']} rendered")
+        return summary
+
+    async def run_queries(self, queries: Iterable[str], max_results: int = RESULTS_PER_RUN_DEFAULT,
+                          max_overlap: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Run queries in order; a failed query is reported and skipped."""
+        summaries = []
+        for query in queries:
             try:
-                await page.goto(url, wait_until="domcontentloaded")
-                await human_pause(page)
-                case_html = await page.content()
-                case_data = extract_case_body(case_html)
-                case_data.update({
-                    "source": "HKLII",
-                    "url": url,
-                    "query": query,
-                    "ts": now_iso(),
-                    "ok": case_data.get("length", 0) > 800
-                })
-                case_key = case_key_from_url(url)
-                safe_key = re.sub(r"[^a-z0-9]+", "_", case_key).strip("_")[:120]
-                out_case = CACHE_DIR / f"case_{safe_key}.json"
-                save_json(out_case, case_data)
-                print(f"    ↳ saved → {out_case} (len={case_data.get('length')})")
-                extracted.append(case_data)
+                summaries.append(await self.run_query(query, max_results, max_overlap))
             except Exception as e:
-                print(f"    [x] Failed to open/parse: {url} | {e}")
-
-        await context.close()
-        await browser.close()
-
-    summary = {
-        "query": query,
-        "ts": now_iso(),
-        "total_found": len(results),
-        "total_extracted": sum(1 for c in extracted if c.get('ok')),
-        "cases": [
-            {
-                "title": c.get("title"),
-                "court": c.get("court"),
-                "year": c.get("year"),
-                "date": c.get("date"),
-                "length": c.get("length"),
-                "url": c.get("url"),
-                "ok": c.get("ok")
-            }
-            for c in extracted
-        ],
-    }
-    save_json(CACHE_DIR / f"summary_{re.sub(r'[^a-z0-9]+','_',query.lower()).strip('_')}.json", summary)
-    print(f"[✓] Done. Extracted {summary['total_extracted']} full case(s) out of {summary['total_found']} unique links.")
-    print(f"[✓] All data saved to → {CACHE_DIR}")
+                print(f"[!] ERROR query='{query}': {e}")
+                summaries.append({"query": query, "ts": now_iso(), "error": str(e)})
+        return summaries
+
+    async def run_queue(self, queue: "asyncio.Queue[Optional[str]]", max_results: int = RESULTS_PER_RUN_DEFAULT):
+        """Consume queries from `queue` until a None sentinel arrives."""
+        while True:
+            query = await queue.get()
+            try:
+                if query is None:
+                    return
+                await self.run_queries([query], max_results)
+            finally:
+                queue.task_done()
+
+# ==========================================================
+# MAIN EXECUTION
+# ==========================================================
+async def run(query: str, max_results: int = RESULTS_PER_RUN_DEFAULT, headful: bool = False):
+    """Single query in its own session (kept for callers of the old entry point)."""
+    await run_many([query], max_results=max_results, headful=headful)
+
+async def run_many(queries: List[str], max_results: int = RESULTS_PER_RUN_DEFAULT, headful: bool = False,
+                   screenshots: bool = SCREENSHOTS, concurrency: int = CRAWL_CONCURRENCY,
+                   tool: str = "search") -> List[Dict[str, Any]]:
+    print(f"[i] Starting Playwright session for {len(queries)} quer{'y' if len(queries) == 1 else 'ies'}")
+    async with CrawlerSession(headful=headful, screenshots=screenshots, concurrency=concurrency, tool=tool) as session:
+        summaries = await session.run_queries(queries, max_results)
+    print(f"[✓] All data saved to → {CACHE_DIR} (cases in {CORPUS_PATH.name})")
+    return summaries
+
+def read_queries(path: Path) -> List[str]:
+    return [s for s in (line.strip() for line in path.read_text(encoding="utf-8").splitlines())
+            if s and not s.startswith("#")]
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="HKLII Playwright extractor")
-    parser.add_argument("--query", "-q", required=True, help="Search term (e.g. arbitration)")
+    parser.add_argument("--query", "-q", action="append", default=[], help="Search term (e.g. arbitration); repeatable")
+    parser.add_argument("--queries-file", type=Path, help="File with one search term per line")
     parser.add_argument("--max", "-k", type=int, default=RESULTS_PER_RUN_DEFAULT, help="Max result links to open")
     parser.add_argument("--headful", action="store_true", help="Run with a visible browser window")
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY,
+                        help="Case pages fetched at once (rate still capped by LEXCHAIN_CRAWL_RPS)")
+    parser.add_argument("--screenshots", action="store_true", help="Save rendered results pages (HTML + PNG) for debugging")
     args = parser.parse_args()
-    asyncio.run(run(args.query, max_results=args.max, headful=args.headful))
+    queries = args.query + (read_queries(args.queries_file) if args.queries_file else [])
+    if not queries:
+        parser.error("give --query and/or --queries-file")
+    asyncio.run(run_many(queries, max_results=args.max, headful=args.headful,
+                         screenshots=args.screenshots or SCREENSHOTS, concurrency=args.concurrency))
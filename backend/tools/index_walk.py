@@ -1,105 +1,333 @@
 # ==========================================================
 # LexChain Index-Walk Collector (Phase 2 - Step 2)
 # ==========================================================
-import os, json, random, time
-from datetime import date, datetime, timedelta
+# Walks HKLII's per-court, per-year listings
+# (/en/cases/<court>/<year>/) and stores every case page not
+# yet in the corpus. Runs on asyncio: one keep-alive httpx
+# client for the whole run, several court/year listings in
+# flight at once, and every request paced by one global
+# per-host limiter (rate_limit.py) instead of fixed sleeps.
+#
+# Case URLs go through the shared crawl frontier
+# (frontier.py): listing links are queued there, fetched
+# only under a lease, and retried with backoff on failure.
+# A run first finishes whatever an earlier (even crashed)
+# run left queued, in listing order, then moves on.
+#
+# Requests are conditional: ETag / Last-Modified of each 200
+# are kept in the frontier and sent back as If-None-Match /
+# If-Modified-Since, so an unchanged listing (or case, with
+# RECHECK=1) costs one 304 and no parsing.
+#
+# Each run also spends up to LEXCHAIN_REVISIT_BUDGET fetches
+# on stored cases whose revisit is due (revisit.py), most
+# likely-changed first; unchanged text is not rewritten.
+#
+#   MODE=indexwalk python tools/index_walk.py   # backfill (default)
+#   MODE=fresh     python tools/index_walk.py   # new cases past each court's high-water mark
+# ==========================================================
+import asyncio, os, subprocess, sys
+from datetime import date, datetime
 from pathlib import Path
-import requests
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
 from bs4 import BeautifulSoup
 
+from case_fetcher import (
+    BrowserRenderer, CaseFetcher, error_status, has_judgment_body, make_client, make_extract_pool, response_validators, run_cpu,
+)
+from corpus_store import CorpusStore, content_hash
+from frontier import Frontier, open_frontier
+from rate_limit import HostLimiter
+from revisit import REVISIT_BUDGET
+
 # ---------- Config ----------
 BASE_URL = "https://www.hklii.hk"
 COURTS = ["hkcfa", "hkca", "hkcfi", "hkdc"]
 START_YEAR = 1990
 END_YEAR = date.today().year
-CACHE_DIR = Path("../data/hklii_cache").resolve()
-STATE_FILE = Path("../data/indexwalk_state.json").resolve()
-MAX_CASES_PER_RUN = 300
-SLEEP_BETWEEN = (1, 3)  # seconds
+BASE_DIR = Path(__file__).resolve().parent
+CACHE_DIR = (BASE_DIR.parent / "data" / "hklii_cache").resolve()
+MAX_CASES_PER_RUN = int(os.getenv("MAX_CASES_PER_RUN", "300"))
+LISTING_CONCURRENCY = int(os.getenv("LEXCHAIN_WALK_LISTINGS", "4"))  # court/year listings in flight
+CLAIM_BATCH = 16
+RECHECK = os.getenv("RECHECK", "0") == "1"   # conditional GET for cases already stored
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 # ---------- Helpers ----------
-def save_json(path: Path, data: dict):
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+def _natural(href: str) -> List[Any]:
+    return [int(t) if t.isdigit() else t for t in href.split("/")]
 
-def list_case_links(court: str, year: int):
-    url = f"{BASE_URL}/en/cases/{court}/{year}/"
-    try:
-        r = requests.get(url, timeout=10)
-        if r.status_code != 200:
+def parse_links(html: str, prefix: str) -> List[str]:
+    """Case links under `prefix`, in case-number order."""
+    soup = BeautifulSoup(html, "html.parser")
+    return sorted({a["href"] for a in soup.select("a[href]") if a["href"].startswith(prefix)}, key=_natural)
+
+def listing_url(court: str, year: int) -> str:
+    return f"{BASE_URL}/en/cases/{court}/{year}/"
+
+def key_prefix(court: str, year: Any = None) -> str:
+    return f"en/cases/{court}/" + (f"{year}/" if year is not None else "")
+
+# ---------- Collector ----------
+class Collector:
+    """Store, frontier and fetcher for one run; counts what it saved or skipped."""
+
+    def __init__(self, store: CorpusStore, frontier: Frontier, fetcher: CaseFetcher, quota: int):
+        self.store = store
+        self.frontier = frontier
+        self.fetcher = fetcher
+        self.quota = quota
+        self.stats = {"saved": 0, "not_modified": 0, "errors": 0}  # saved includes changed revisits
+
+    @property
+    def quota_reached(self) -> bool:
+        return self.stats["saved"] >= self.quota
+
+    async def list_links(self, url: str, prefix: str) -> List[str]:
+        """Listing links; a 304 reuses the links stored with the validators."""
+        listing = self.frontier.listing(url)
+        try:
+            r = await self.fetcher.fetch_http(url, listing if listing and listing["links"] is not None else None)
+        except httpx.HTTPError as e:
+            print(f"  [!] Error reading index {url}: {type(e).__name__}")
+            self.stats["errors"] += 1
             return []
-        soup = BeautifulSoup(r.text, "html.parser")
-        links = [
-            a["href"]
-            for a in soup.select("a[href]")
-            if a["href"].startswith(f"/en/cases/{court}/{year}/")
-        ]
-        return sorted(set(links))
-    except Exception as e:
-        print(f"  [!] Error reading index {court}-{year}: {e}")
-        return []
-
-def fetch_case(url_path: str):
-    """Download and return full case HTML + metadata dict."""
-    full_url = f"{BASE_URL}{url_path}"
-    try:
-        r = requests.get(full_url, timeout=15)
+        if r.status_code == 304:
+            self.frontier.touch_listing(url)
+            self.stats["not_modified"] += 1
+            return listing["links"]
         if r.status_code != 200:
-            print(f"  [!] HTTP {r.status_code} → {full_url}")
-            return None
-        return {"url": full_url, "html": r.text}
-    except Exception as e:
-        print(f"  [!] Fetch error {full_url}: {e}")
-        return None
+            print(f"  [!] HTTP {r.status_code} → {url}")
+            return []
+        links = await run_cpu(self.fetcher.executor, parse_links, r.text, prefix)
+        self.frontier.set_listing(url, links=links, **response_validators(r))
+        return links
 
-def read_state():
-    if STATE_FILE.exists():
+    async def fetch_one(self, row: Dict[str, Any], label: str) -> bool:
+        key = row["case_key"]
         try:
-            return json.loads(STATE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            pass
-    return {"court": COURTS[0], "year": START_YEAR}
+            case, _, fresh = await self.fetcher.fetch(row["url"], row)
+        except (httpx.HTTPError, RuntimeError) as e:
+            status = self.frontier.fail(key, e, error_status(e))
+            self.stats["errors"] += 1
+            print(f"  [!] Fetch error {row['url']}: {e} ({status})")
+            return False
+        if case is None:
+            self.frontier.complete(key, 304)
+            self.stats["not_modified"] += 1
+            return False
+        h = content_hash(case.get("content") or "")
+        if h == row.get("content_hash"):   # revisit found the same text
+            self.frontier.complete(key, 200, content_hash=h, decided=case.get("date"), **fresh)
+            self.stats["not_modified"] += 1
+            return False
+        case.update({
+            "source": "HKLII",
+            "url": row["url"],
+            "ts": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "ok": has_judgment_body(case),
+        })
+        self.store.put(case)
+        self.frontier.complete(key, 200, content_hash=h, decided=case.get("date"), **fresh)
+        self.stats["saved"] += 1
+        print(f"  [✓] {'Updated' if row.get('content_hash') else label} {key} ({self.stats['saved']}/{self.quota})")
+        return True
 
-def write_state(court: str, year: int):
-    save_json(STATE_FILE, {"court": court, "year": year})
+    async def drain(self, prefixes: Iterable[str], label: str = "Saved"):
+        """Fetch leased URLs under `prefixes`, a batch at a time, until none are left or the quota is met."""
+        prefixes = list(prefixes)
+        while not self.quota_reached:
+            rows = self.frontier.claim(min(CLAIM_BATCH, self.quota - self.stats["saved"]), prefixes)
+            if not rows:
+                return
+            await asyncio.gather(*(self.fetch_one(row, label) for row in rows))
+
+    async def walk_year(self, court: str, year: int):
+        """Queue one listing's links, fetch them, and close the listing once a past year is done."""
+        url = listing_url(court, year)
+        links = await self.list_links(url, f"/en/cases/{court}/{year}/")
+        keys = self.frontier.add((f"{BASE_URL}{l}" for l in links), source="index_walk", court=court, year=year)
+        if RECHECK:
+            self.frontier.requeue(keys)
+        print(f"\n[{court.upper()} {year}] {len(links)} case links, {self.frontier.open_count(key_prefix(court, year))} to fetch")
+        await self.drain([key_prefix(court, year)])
+        if links and year < END_YEAR and self.frontier.open_count(key_prefix(court, year)) == 0:
+            self.frontier.close_listing(url)   # the current year keeps growing — never closed
 
 # ---------- Freshness Mode ----------
-def crawl_recent_days(days=7, max_cases=50):
-    """Quick pass for new cases from the last N days per court."""
-    print(f"\n=== Recent {days}-Day Freshness Pass ===")
-    cutoff = datetime.now() - timedelta(days=days)
-    total = 0
-    for court in COURTS:
-        url = f"{BASE_URL}/en/cases/{court}/"
+# Each court keeps a high-water mark in the frontier: the newest
+# (year, case number) seen. A daily pass probes numbers just past
+# it — a window at a time, in order — and stops after
+# FRESH_MISS_TOLERANCE numbers in a row that do not exist yet, so
+# it costs O(new cases) requests, not a walk of this year's
+# listing. Cases another tool already fetched count as found
+# without a request. The first pass for a court (no mark yet)
+# seeds the mark from its current listing. A 200 without a
+# judgment body may be HKLII's JS shell for a case that does
+# exist, so it is rendered (BrowserRenderer) before it counts
+# as a miss.
+FRESH_MAX_CASES = int(os.getenv("LEXCHAIN_FRESH_MAX_CASES", "50"))
+FRESH_MISS_TOLERANCE = int(os.getenv("LEXCHAIN_FRESH_MISSES", "3"))   # gaps HKLII leaves in numbering
+FRESH_INGEST = os.getenv("LEXCHAIN_FRESH_INGEST", "1") == "1"          # run ingest_delta after new cases
+
+def case_number(href: str) -> int:
+    tail = href.rstrip("/").rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+class _ProbeError(Exception):
+    """A response that says nothing about whether the case exists (5xx, network, failed render)."""
+
+async def _probe(c: Collector, court: str, year: int, number: int) -> Optional[Dict[str, Any]]:
+    """The case at `number` if it exists (fetched and stored unless already known), else None."""
+    url = f"{BASE_URL}/en/cases/{court}/{year}/{number}"
+    key = key_prefix(court, year) + str(number)
+    if c.frontier.status(key) in ("done", "leased"):
+        return {"case_key": key, "known": True}
+    try:
+        r = await c.fetcher.fetch_http(url)
+    except httpx.HTTPError as e:
+        raise _ProbeError(type(e).__name__)
+    if r.status_code in (404, 410):
+        return None
+    if r.status_code != 200:
+        raise _ProbeError(f"HTTP {r.status_code}")
+    case, validators = await c.fetcher.extract(r.text), response_validators(r)
+    if not has_judgment_body(case):
+        if c.fetcher.browser_fetch is None:
+            raise _ProbeError("no judgment body and no browser to render it")
         try:
-            r = requests.get(url, timeout=10)
-            if r.status_code != 200:
-                continue
-            soup = BeautifulSoup(r.text, "html.parser")
-            year = datetime.now().year
-            links = [
-                a["href"]
-                for a in soup.select("a[href]")
-                if f"/{year}/" in a["href"]
-            ]
-            for link in sorted(set(links)):
-                parts = link.strip("/").split("/")
-                file_id = "_".join(parts[-3:]).replace(".html", "")
-                out_path = CACHE_DIR / f"case_en_cases_{file_id}.json"
-                if out_path.exists():
-                    continue
-                case = fetch_case(link)
-                if case:
-                    save_json(out_path, case)
-                    total += 1
-                    print(f"  [✓] Fresh {court.upper()} {file_id}")
-                if total >= max_cases:
-                    print("[⚓] Freshness quota reached.")
-                    return
-                time.sleep(random.uniform(*SLEEP_BETWEEN))
+            case = await c.fetcher.render(url)
         except Exception as e:
-            print(f"  [!] Freshness error {court}: {e}")
-    print(f"[✓] Freshness complete, {total} new cases.")
+            raise _ProbeError(f"render failed: {type(e).__name__}: {e}")
+        if not has_judgment_body(case):
+            return None   # the site shell for a number not (yet) published
+        validators = {"etag": None, "last_modified": None}
+    c.frontier.add([url], source="fresh", court=court, year=year)
+    if not c.frontier.claim(1, keys=[key]):
+        return {"case_key": key, "known": True}   # another run is on it
+    case.update({"source": "HKLII", "url": url, "ts": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), "ok": True})
+    c.store.put(case)
+    c.frontier.complete(key, 200, content_hash=content_hash(case["content"]), decided=case.get("date"),
+                        **validators)
+    c.stats["saved"] += 1
+    print(f"  [✓] Fresh {court.upper()} {key} ({c.stats['saved']}/{c.quota})")
+    return {"case_key": key, "date": case.get("date"), "known": False}
+
+async def advance_court(c: Collector, court: str, year: int, after: int) -> int:
+    """Probe `year` numbers past `after` until the misses run out; returns the new mark."""
+    window = max(1, c.fetcher.limiter.concurrency)
+    mark, misses, n = after, 0, after
+    while misses < FRESH_MISS_TOLERANCE and not c.quota_reached:
+        numbers = list(range(n + 1, n + 1 + min(window, c.quota - c.stats["saved"])))
+        results = await asyncio.gather(*(_probe(c, court, year, k) for k in numbers), return_exceptions=True)
+        for k, res in zip(numbers, results):
+            if isinstance(res, BaseException):
+                print(f"  [!] {court.upper()} {year}/{k}: {res}; stopping here until the next run")
+                return mark
+            if res is None:
+                misses += 1
+                if misses >= FRESH_MISS_TOLERANCE:
+                    break
+                continue
+            misses = 0
+            mark = k
+            c.frontier.raise_high_water(court, year, k, res.get("date"))
+        n = numbers[-1]
+    return mark
+
+async def seed_high_water(c: Collector, court: str, year: int) -> Optional[int]:
+    """No mark yet: queue the court's listing for `year` (or the year before) and mark its newest case."""
+    for y in (year, year - 1):
+        links = await c.list_links(listing_url(court, y), f"/en/cases/{court}/{y}/")
+        if links:
+            c.frontier.add((f"{BASE_URL}{l}" for l in links), source="fresh", court=court, year=y)
+            await c.drain([key_prefix(court, y)], f"Fresh {court.upper()}")
+            top = max(case_number(l) for l in links)
+            c.frontier.raise_high_water(court, y, top)
+            return y
+    return None
+
+def run_ingest() -> int:
+    """Upsert the new cases into the live index (tools/ingest_delta.py, run from backend/)."""
+    print("[i] Running delta ingest for the new cases…")
+    return subprocess.run([sys.executable, str(BASE_DIR / "ingest_delta.py")], cwd=str(BASE_DIR.parent)).returncode
+
+def crawl_recent_days(max_cases=FRESH_MAX_CASES):
+    """New cases per court since its high-water mark, then (optionally) delta ingest."""
+    print("\n=== High-Water-Mark Freshness Pass ===")
+    stats = asyncio.run(_crawl_recent(max_cases))
+    if stats["saved"] and FRESH_INGEST:
+        code = run_ingest()
+        print("[✓] Delta ingest done." if code == 0 else f"[x] Delta ingest exited with {code}.")
+
+async def _crawl_recent(max_cases: int) -> Dict[str, Any]:
+    year = datetime.now().year
+    limiter = HostLimiter()
+    pool = make_extract_pool()
+    with CorpusStore() as store, open_frontier("index_walk", store) as frontier:
+        async with make_client(limiter.concurrency) as client, BrowserRenderer(limiter) as renderer:
+            fetcher = CaseFetcher(limiter, client, browser_fetch=renderer.render, executor=pool)
+            c = Collector(store, frontier, fetcher, max_cases)
+
+            async def court_pass(court: str):
+                hw = frontier.high_water(court)
+                if hw is None:
+                    if await seed_high_water(c, court, year) is None:
+                        print(f"  [!] {court.upper()}: no listing to seed a high-water mark from")
+                        return
+                    hw = frontier.high_water(court)
+                # finish the mark's year (late publications), then roll into the current one
+                for y in range(hw["year"], year + 1):
+                    after = hw["number"] if y == hw["year"] else 0
+                    mark = await advance_court(c, court, y, after)
+                    if mark > after or y == year:
+                        print(f"  [i] {court.upper()} {y}: high-water mark {after} → {mark}")
+
+            try:
+                await asyncio.gather(*(court_pass(court) for court in COURTS))
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+            if c.quota_reached:
+                print("[⚓] Freshness quota reached.")
+    print(f"[✓] Freshness complete, {c.stats['saved']} new cases ({limiter.requests} requests).")
+    return c.stats
+
+# ---------- Index-Walk Backfill ----------
+async def _index_walk(store: CorpusStore, frontier: Frontier, quota: int = MAX_CASES_PER_RUN) -> Dict[str, Any]:
+    limiter = HostLimiter()
+    pool = make_extract_pool()
+    try:
+        async with make_client(limiter.concurrency) as client:
+            c = Collector(store, frontier, CaseFetcher(limiter, client, executor=pool), quota)
+
+            # 1. revisits due, then whatever an earlier run queued but did not finish (incl. retries due)
+            due = frontier.requeue_due(min(REVISIT_BUDGET, quota), [key_prefix(court) for court in COURTS])
+            if due:
+                print(f"[i] {len(due)} stored case(s) due for a revisit")
+            await c.drain(key_prefix(court) for court in COURTS)
+
+            # 2. open listings, a few at a time, in court/year order
+            closed = frontier.closed_listings()
+            pending = [(court, year) for court in COURTS for year in range(START_YEAR, END_YEAR + 1)
+                       if listing_url(court, year) not in closed]
+            print(f"[i] {len(pending)} court/year listings to walk ({len(closed)} closed)")
+            for i in range(0, len(pending), max(1, LISTING_CONCURRENCY)):
+                if c.quota_reached:
+                    print("\n[⚓] Quota reached — stopping for tonight.")
+                    break
+                await asyncio.gather(*(c.walk_year(court, year) for court, year in pending[i:i + LISTING_CONCURRENCY]))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    stats = frontier.stats()
+    print(f"[i] Frontier: {stats['pending'] + stats['failed']} queued, {stats['dead']} dead-lettered")
+    print(f"\n=== Walk finished: {c.stats['saved']} new/updated cases, {c.stats['not_modified']} unchanged, "
+          f"{c.stats['errors']} errors, {limiter.requests} requests ===")
+    return c.stats
 
 # ---------- Compact Driver ----------
 def main():
@@ -110,45 +338,8 @@ def main():
 
     # default: index-walk backfill
     print("=== Phase 2: Index-Walk Collector ===")
-    state = read_state()
-    total_saved = 0
-    start_found = False
-
-    for court in COURTS:
-        for year in range(START_YEAR, END_YEAR + 1):
-            if not start_found:
-                if court == state.get("court") and year == state.get("year"):
-                    start_found = True
-                else:
-                    continue
-
-            links = list_case_links(court, year)
-            print(f"\n[{court.upper()} {year}] Found {len(links)} case links")
-
-            for link in links:
-                parts = link.strip("/").split("/")
-                file_id = "_".join(parts[-3:]).replace(".html", "")
-                out_path = CACHE_DIR / f"case_en_cases_{file_id}.json"
-                if out_path.exists():
-                    continue
-
-                case_data = fetch_case(link)
-                if case_data:
-                    save_json(out_path, case_data)
-                    total_saved += 1
-                    print(f"  [✓] Saved {out_path.name} ({total_saved}/{MAX_CASES_PER_RUN})")
-
-                time.sleep(random.uniform(*SLEEP_BETWEEN))
-
-                if total_saved >= MAX_CASES_PER_RUN:
-                    print("\n[⚓] Quota reached — stopping for tonight.")
-                    write_state(court, year)
-                    print(f"[i] Progress saved → {STATE_FILE}")
-                    return
-
-            write_state(court, year)
-
-    print(f"\n=== Crawl complete. Total new cases saved: {total_saved} ===")
+    with CorpusStore() as store, open_frontier("index_walk", store) as frontier:
+        asyncio.run(_index_walk(store, frontier))
 
 if __name__ == "__main__":
     main()
@@ -2,105 +2,395 @@
 # LexChain — Delta Ingest Tool
 # ==========================================================
 # Purpose:
-#   Detect new or updated HKLII case JSONs since last ingest
-#   and merge them into the existing FAISS index.
+#   Detect new, updated or deleted HKLII cases in the corpus
+#   store since the last ingest and upsert them into the
+#   existing FAISS index. metadata.json is a manifest of
+#   (content hash, docstore IDs) per case: change detection
+#   is one query over the store's content_hash column, only
+#   changed cases are read and chunked (in a process pool),
+#   and stale chunks are deleted before replacements are
+#   inserted (FAISS.delete removes the rows outright, so the
+#   index never accumulates dead vectors).
+#   Cases are normalized (site chrome stripped, header fields
+#   lifted into metadata) and cut into token-sized chunks of
+#   whole paragraphs that link to their neighbours. Changed
+#   cases are topic-tagged from their new vectors; when the
+#   topic list changes, every case is re-tagged from the
+#   stored vectors. Near-duplicates of an indexed case (MinHash
+#   /LSH, app/indexing/dedup.py) that are also the same case by
+#   citation, action number or title are recorded as its
+#   aliases instead of being chunked and embedded again.
+#   The result is written as a new build next to the live one
+#   (manifest, chrome model and column table included) and
+#   then published.
 # ==========================================================
 
-import os, json, glob, hashlib
+import os, sys, json, hashlib, shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from langchain_openai import OpenAIEmbeddings
+from typing import Dict, List, Any, Optional, Tuple
 from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # backend/ → app.indexing
+from app.indexing.chunking import CHUNK_TOKENS, CHUNKER_VERSION, chunk_text, link_metadata
+from app.indexing.columns import write_columns
+from app.indexing.compressed import build_vectorstore, load_vectorstore
+from app.indexing.dedup import DEDUP_VERSION, MinHashLSH, case_identity, load_signatures, minhash, save_signatures
+from app.indexing.embed_cache import EmbeddingCache
+from app.indexing.embed_engine import EmbedEngine
+from app.indexing.providers import get_embeddings
+from app.indexing.normalize import NORMALIZE_VERSION, ChromeModel, normalize_case
+from app.indexing.topics import TopicTagger, retag_vectorstore
+from app.indexing.versions import new_build_dir, publish, read_manifest, resolve_index_path, write_manifest
+from corpus_store import CorpusStore, CORPUS_PATH
+from hklii_parse import case_file_stem
 
 # ---------- Config ----------
-DATA_DIR = Path("../data/hklii_cache").resolve()
-INDEX_PATH = Path(os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")).resolve()
+INDEX_PATH = Path(os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")).resolve()  # root of builds/
 MODEL_NAME = os.getenv("LEXCHAIN_EMBED_MODEL", "text-embedding-3-large")
-META_FILE = INDEX_PATH / "metadata.json"
+META_FILE = "metadata.json"      # per build
+CHROME_FILE = "chrome.json"      # per build
+WORKERS = int(os.getenv("LEXCHAIN_INGEST_WORKERS", str(os.cpu_count() or 1)))
+POOL_MIN_CASES = 32  # below this, a process pool costs more than it saves
+MIN_CONTENT_CHARS = 500
+MANIFEST_FORMAT = 4
+# Anything that changes chunk text or boundaries; a mismatch re-chunks every case
+PIPELINE = f"norm{NORMALIZE_VERSION}-chunk{CHUNKER_VERSION}-{CHUNK_TOKENS}t-dedup{DEDUP_VERSION}"
 
 # ---------- Helpers ----------
-def hash_text(text: str) -> str:
+def legacy_hash_text(text: str) -> str:
+    # Content hash used by manifests before format 3
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
-def load_metadata():
-    if META_FILE.exists():
-        with open(META_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+def chunk_ids(case_key: str, n: int) -> List[str]:
+    """Deterministic docstore IDs for the chunks of one case."""
+    stem = case_file_stem(case_key)
+    return [f"{stem}#{i}" for i in range(n)]
+
+def case_key_from_file(name: str) -> str:
+    # case_en_cases_hkca_1972_248.json → en/cases/hkca/1972/248
+    return Path(name).stem[len("case_"):].replace("_", "/")
 
-def save_metadata(meta):
-    META_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(META_FILE, "w", encoding="utf-8") as f:
+def load_metadata(index_dir: Path) -> Dict[str, Any]:
+    """
+    Manifest layout:
+      {"format": 4, "pipeline": PIPELINE, "topics": tagger signature,
+       "cases": {case_key: {"content_hash": str, "ids": [docstore ids], "topics": [str], "path": str,
+                            "aliases": [case_key] (canonical copies) | "alias_of": case_key (ids empty)}}}
+    Formats 1–3 were keyed by case_*.json file name (format 1 a flat
+    {file: md5(content)} map). They are re-keyed by case_key on read; md5
+    hashes are checked once against the content, then rewritten.
+    """
+    meta_file = Path(index_dir) / META_FILE
+    if meta_file.exists():
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") == MANIFEST_FORMAT:
+            return meta
+        if meta.get("format") in (2, 3):
+            files = meta.get("files", {})
+        else:
+            files = {name: {"hash": h, "ids": None} for name, h in meta.items()}
+        cases = {}
+        for name, entry in files.items():
+            cases[case_key_from_file(name)] = {
+                "content_hash": entry.get("content_hash"),
+                "hash": entry.get("hash"),
+                "ids": entry.get("ids"),
+                "path": name,
+            }
+        return {"format": MANIFEST_FORMAT, "cases": cases}
+    return {"format": MANIFEST_FORMAT, "cases": {}}
+
+def save_metadata(meta: Dict[str, Any], index_dir: Path):
+    meta_file = Path(index_dir) / META_FILE
+    meta_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = meta_file.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, meta_file)
+
+def case_metadata(j: Dict[str, Any], fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "source": j.get("url"),
+        "title": j.get("title"),
+        "court": j.get("court"),
+        "year": j.get("year"),
+        "case_key": j["case_key"],
+        "path": case_file_stem(j["case_key"]) + ".json",
+        **(fields or {}),
+    }
+
+def load_chrome(store: CorpusStore, index_dir: Path) -> ChromeModel:
+    """Chrome model saved with the index; learned from the corpus on first use."""
+    if (Path(index_dir) / CHROME_FILE).exists():
+        return ChromeModel.load(Path(index_dir) / CHROME_FILE)
+    chrome = ChromeModel.learn(j["content"] for j in store.iter_cases(min_length=MIN_CONTENT_CHARS))
+    print(f"[i] Learned {len(chrome.ngrams)} chrome n-grams")
+    return chrome
+
+# ---------- Per-case work (runs in pool workers) ----------
+_store: Optional[CorpusStore] = None
+_chrome: Optional[ChromeModel] = None
+
+def _init_worker(chrome: ChromeModel):
+    global _chrome
+    _chrome = chrome
+
+def prepare_case(args: Tuple[str, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Read and chunk one case whose content hash differs from the manifest.
+    Returns {"case_key", "content_hash", "status", "texts", "metas", "ids",
+    "minhash", "identity", "chars"} where status is "same" (legacy md5 matched),
+    "changed" or "missing".
+    """
+    global _store
+    key, prev = args
+    if _store is None:
+        _store = CorpusStore(readonly=True)
+    j = _store.get(key)
+    out: Dict[str, Any] = {"case_key": key, "content_hash": None, "status": "changed",
+                           "texts": [], "metas": [], "ids": []}
+    if j is None:
+        out["status"] = "missing"
+        return out
+    out["content_hash"] = j["content_hash"]
+    if prev and not prev.get("content_hash") and prev.get("hash") == legacy_hash_text(j["content"]):
+        out["status"] = "same"
+        return out
+
+    norm = normalize_case(j["content"], _chrome)
+    meta = case_metadata(j, norm["fields"])
+    out["minhash"] = minhash(norm["text"])
+    out["identity"] = case_identity(meta)
+    out["chars"] = len(norm["text"])
+    out["texts"] = chunk_text(norm["text"], MODEL_NAME)
+    out["ids"] = chunk_ids(key, len(out["texts"]))
+    out["metas"] = [{**meta, **links} for links in link_metadata(out["ids"])]
+    return out
+
+def prepare_cases(jobs: List[Tuple[str, Optional[Dict[str, Any]]]], chrome: ChromeModel) -> List[Dict[str, Any]]:
+    global _store
+    if len(jobs) < POOL_MIN_CASES or WORKERS <= 1:
+        _init_worker(chrome)
+        try:
+            return [prepare_case(j) for j in jobs]
+        finally:
+            if _store is not None:
+                _store.close()
+                _store = None
+    with ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_worker, initargs=(chrome,)) as pool:
+        return list(pool.map(prepare_case, jobs, chunksize=16))
+
+def update_aliases(vs: FAISS, cases: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Recompute each canonical case's "aliases" from the alias_of links in
+    the manifest and copy changes into its chunks' metadata. Returns the
+    number of canonical cases whose alias list changed.
+    """
+    aliases: Dict[str, List[str]] = {}
+    for key, entry in cases.items():
+        if entry.get("alias_of"):
+            aliases.setdefault(entry["alias_of"], []).append(key)
+    updated = 0
+    for key, entry in cases.items():
+        want = sorted(aliases.get(key, []))
+        if entry.get("alias_of") or entry.get("aliases", []) == want:
+            continue
+        if want:
+            entry["aliases"] = want
+        else:
+            entry.pop("aliases", None)
+        for doc_id in entry.get("ids") or []:
+            doc = vs.docstore.search(doc_id)
+            if hasattr(doc, "metadata"):
+                doc.metadata["aliases"] = want
+        updated += 1
+    return updated
+
+def ids_by_path(vs: FAISS) -> Dict[str, List[str]]:
+    """Recover per-file chunk IDs from the docstore (for manifests written before IDs were tracked)."""
+    out: Dict[str, List[str]] = {}
+    for doc_id in vs.index_to_docstore_id.values():
+        doc = vs.docstore.search(doc_id)
+        path = (getattr(doc, "metadata", None) or {}).get("path")
+        if path:
+            out.setdefault(path, []).append(doc_id)
+    return out
+
+# ---------- Main ----------
+def main():
+    print(f"[i] Using data from: {CORPUS_PATH}")
+    base = resolve_index_path(INDEX_PATH)
+    print(f"[i] Index path: {INDEX_PATH} (live: {base.name})")
+    print(f"[i] Model: {MODEL_NAME}")
+
+    manifest = load_metadata(base)
+    old_cases: Dict[str, Dict[str, Any]] = manifest["cases"]
+    new_cases_meta: Dict[str, Dict[str, Any]] = {}
+    embeddings = get_embeddings(MODEL_NAME)
+    engine = EmbedEngine(embeddings, MODEL_NAME, cache=EmbeddingCache())
+    tagger = TopicTagger.from_engine(engine)
+    topic_sig = tagger.signature(MODEL_NAME)
+
+    # ---------- Step 1: Compare content hashes, prepare only cases that moved ----------
+    with CorpusStore(readonly=True) as store:
+        current = store.content_hashes(min_length=MIN_CONTENT_CHARS)
+        chrome = load_chrome(store, base)
+    # A new normalizer/chunker changes every case's chunks, even where content didn't move
+    same_pipeline = manifest.get("pipeline") == PIPELINE
+    if old_cases and not same_pipeline:
+        print(f"[i] Chunking pipeline changed ({manifest.get('pipeline')} → {PIPELINE}); re-chunking all cases.")
+    jobs: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+    for key, h in current.items():
+        prev = old_cases.get(key) if same_pipeline else None
+        if prev and prev.get("content_hash") == h:
+            new_cases_meta[key] = prev
+        else:
+            jobs.append((key, prev))
+    # Aliases of a canonical copy that changed or went away must find a new canonical
+    queued = {key for key, _ in jobs}
+    for key in queued | (old_cases.keys() - current.keys()):
+        for alias in old_cases.get(key, {}).get("aliases", []):
+            if new_cases_meta.pop(alias, None) is not None:
+                jobs.append((alias, None))
+    jobs.sort()
+    print(f"[i] {len(current)} cases in corpus; {len(jobs)} new or changed by hash.")
+
+    changed: List[Dict[str, Any]] = []
+    for res in prepare_cases(jobs, chrome):
+        key = res["case_key"]
+        if res["status"] == "missing":
+            continue
+        if res["status"] == "same":
+            new_cases_meta[key] = {**old_cases[key], "content_hash": res["content_hash"]}
+            new_cases_meta[key].pop("hash", None)
+        else:
+            changed.append(res)
+
+    # Deleted cases, and cases that fell under MIN_CONTENT_CHARS, lose their chunks
+    changed_keys = {c["case_key"] for c in changed}
+    removed = [key for key in old_cases if key not in new_cases_meta and key not in changed_keys]
+
+    # Near-duplicates: indexed canonical copies win, then the longest changed case
+    stored_sigs, identities = load_signatures(base)
+    signatures = {k: s for k, s in stored_sigs.items() if k in new_cases_meta}
+    lsh = MinHashLSH()
+    for key, entry in new_cases_meta.items():
+        if key in signatures and not entry.get("alias_of"):
+            lsh.add(key, signatures[key], identities.get(key))
+    fresh: List[Dict[str, Any]] = []
+    for c in sorted(changed, key=lambda c: (-c["chars"], c["case_key"])):
+        signatures[c["case_key"]] = c["minhash"]
+        identities[c["case_key"]] = c["identity"]
+        canon = lsh.find(c["minhash"], c["identity"])
+        if canon is None:
+            lsh.add(c["case_key"], c["minhash"], c["identity"])
+            fresh.append(c)
+        else:
+            new_cases_meta[c["case_key"]] = {"content_hash": c["content_hash"], "ids": [], "alias_of": canon}
+    fresh.sort(key=lambda c: c["case_key"])
+    n_aliased = len(changed) - len(fresh)
+
+    print(f"[i] Found {len(changed)} new or changed ({n_aliased} near-duplicates), {len(removed)} removed cases.")
+    # New topic list, model or thresholds: existing cases' tags are stale too
+    retag = bool(new_cases_meta) and manifest.get("topics") != topic_sig
+    if retag:
+        print("[i] Topic list changed; re-tagging all cases from stored vectors.")
+
+    if not changed and not removed and not retag:
+        # A published build is immutable (build.json checksums its metadata.json);
+        # refreshed hashes are recorded with the next build. Only an unversioned
+        # index still has its manifest updated in place.
+        if new_cases_meta != old_cases and read_manifest(base) is None:
+            save_metadata({"format": MANIFEST_FORMAT, "pipeline": PIPELINE, "topics": topic_sig,
+                           "cases": new_cases_meta}, base)
+        print("[✓] No new cases to ingest. FAISS index is current.")
+        return
+
+    # ---------- Step 2: Load existing FAISS index ----------
+    if (base / "index.faiss").exists():
+        vs = load_vectorstore(str(base), embeddings)
+        print("[i] Loaded existing FAISS index.")
+    else:
+        vs = None
+        print("[i] No existing index found. Creating a new one.")
+
+    # ---------- Step 3: Delete stale chunks ----------
+    stale_ids: List[str] = []
+    legacy = None
+    for key in [c["case_key"] for c in changed] + removed:
+        prev = old_cases.get(key)
+        if not prev:
+            continue
+        ids = prev.get("ids")
+        if ids is None and vs is not None:
+            legacy = legacy if legacy is not None else ids_by_path(vs)
+            ids = legacy.get(prev.get("path") or case_file_stem(key) + ".json", [])
+        stale_ids.extend(ids or [])
+
+    if vs is not None and stale_ids:
+        live = set(vs.index_to_docstore_id.values())
+        stale_ids = [i for i in stale_ids if i in live]
+        if stale_ids:
+            vs.delete(stale_ids)
+            print(f"[i] Deleted {len(stale_ids)} stale chunks.")
+
+    # ---------- Step 4: Collect replacement chunks ----------
+    texts, metas, ids, groups = [], [], [], []
+    for g, c in enumerate(fresh):
+        texts.extend(c["texts"])
+        metas.extend(c["metas"])
+        ids.extend(c["ids"])
+        groups.extend([g] * len(c["ids"]))
+        new_cases_meta[c["case_key"]] = {"content_hash": c["content_hash"], "ids": c["ids"]}
+
+    print(f"[i] Prepared {len(texts)} text chunks for ingestion.")
+
+    # ---------- Step 5: Upsert into FAISS ----------
+    if texts:
+        hits_before = engine.cache_hits  # the topic list was embedded through the same engine
+        vectors = engine.embed(texts)
+        print(f"[i] Embedding cache hits: {engine.cache_hits - hits_before}/{len(texts)} chunks")
+        tags = tagger.tag(vectors, groups)
+        for meta, g in zip(metas, groups):
+            meta["topics"] = tags[g]
+        for g, c in enumerate(fresh):
+            new_cases_meta[c["case_key"]]["topics"] = tags.get(g, [])
+        if vs:
+            vs.add_embeddings(zip(texts, vectors.tolist()), metadatas=metas, ids=ids)
+        else:
+            vs = build_vectorstore(texts, vectors, embeddings, metadatas=metas, ids=ids)
+
+    if vs is None:
+        print("[✓] Nothing indexed yet and nothing to add.")
+        return
+
+    if retag:
+        for key, topics in retag_vectorstore(vs, tagger).items():
+            if key in new_cases_meta:
+                new_cases_meta[key]["topics"] = topics
+    n_alias_updates = update_aliases(vs, new_cases_meta)
+    if n_alias_updates:
+        print(f"[i] Updated aliases on {n_alias_updates} canonical cases.")
+
+    # ---------- Step 6: Write a new build and publish it ----------
+    build_dir = new_build_dir(INDEX_PATH)
+    try:
+        vs.save_local(str(build_dir))
+        chrome.save(build_dir / CHROME_FILE)
+        write_columns(vs, build_dir)
+        save_signatures({k: s for k, s in signatures.items() if k in new_cases_meta}, identities, build_dir)
+        save_metadata({"format": MANIFEST_FORMAT, "pipeline": PIPELINE, "topics": topic_sig, "cases": new_cases_meta}, build_dir)
+        parent = read_manifest(base)
+        write_manifest(build_dir, vs, MODEL_NAME, pipeline=PIPELINE, source="ingest_delta",
+                       parent=parent["version"] if parent else None)
+        publish(build_dir, INDEX_PATH)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    print(f"[✓] Delta ingest complete. Published build {build_dir.name} → {INDEX_PATH}")
 
-# ---------- Step 1: Setup ----------
-print(f"[i] Using data from: {DATA_DIR}")
-print(f"[i] Index path: {INDEX_PATH}")
-print(f"[i] Model: {MODEL_NAME}")
-
-old_meta = load_metadata()
-new_meta = {}
-splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=150)
-embeddings = OpenAIEmbeddings(model=MODEL_NAME)
-
-# ---------- Step 2: Detect new or changed files ----------
-case_files = sorted(DATA_DIR.glob("case_*.json"))
-new_files = []
-
-for fp in case_files:
-    with open(fp, "r", encoding="utf-8") as f:
-        j = json.load(f)
-    content = j.get("content") or ""
-    if len(content) < 500:
-        continue
-
-    content_hash = hash_text(content)
-    new_meta[fp.name] = content_hash
-
-    # Compare hashes to detect new or updated cases
-    if old_meta.get(fp.name) != content_hash:
-        new_files.append(fp)
-
-print(f"[i] Found {len(new_files)} new or changed case files.")
-
-if not new_files:
-    print("[✓] No new cases to ingest. FAISS index is current.")
-    exit(0)
-
-# ---------- Step 3: Load existing FAISS index ----------
-if INDEX_PATH.exists():
-    vs = FAISS.load_local(str(INDEX_PATH), embeddings, allow_dangerous_deserialization=True)
-    print("[i] Loaded existing FAISS index.")
-else:
-    vs = None
-    print("[i] No existing index found. Creating a new one.")
-
-# ---------- Step 4: Build new chunks ----------
-texts, metas = [], []
-for fp in new_files:
-    with open(fp, "r", encoding="utf-8") as f:
-        j = json.load(f)
-    chunks = splitter.split_text(j["content"])
-    for c in chunks:
-        texts.append(c)
-        metas.append({
-            "source": j.get("url"),
-            "title": j.get("title"),
-            "court": j.get("court"),
-            "year": j.get("year"),
-            "path": fp.name
-        })
-
-print(f"[i] Prepared {len(texts)} text chunks for ingestion.")
-
-# ---------- Step 5: Add to FAISS ----------
-if vs:
-    vs.add_texts(texts, metadatas=metas)
-else:
-    vs = FAISS.from_texts(texts, embeddings, metadatas=metas)
-
-vs.save_local(str(INDEX_PATH))
-save_metadata(new_meta)
-
-print(f"[✓] Delta ingest complete. Index updated → {INDEX_PATH}")
-print(f"[✓] Metadata saved → {META_FILE}")
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,149 @@
 # ==========================================================
 # LexChain — HKLII Vectorization Ingest Tool
 # ==========================================================
-# Purpose: Convert cached HKLII case JSON files into
-# searchable FAISS embeddings for LexChain.
+# Purpose: Convert the cached HKLII corpus (corpus.sqlite3)
+# into searchable FAISS embeddings for LexChain. Cases are
+# normalized first (site chrome learned from the corpus is
+# stripped, header fields go to metadata), then packed into
+# token-sized chunks of whole paragraphs. Near-duplicate
+# judgments are collapsed to one canonical copy (MinHash/LSH,
+# app/indexing/dedup.py) before chunking. Set
+# LEXCHAIN_INDEX_STORAGE (sq8|fp16) and/or LEXCHAIN_INDEX_DIM
+# for a compressed index with exact re-rank; the build
+# reports memory per million chunks and the recall delta.
+# Every case is tagged with topics from tools/topics.txt
+# (see app/indexing/topics.py). Each run writes a new
+# versioned build and publishes it (see
+# app/indexing/versions.py).
 # ==========================================================
 
-import os, json, glob
+import os, sys
 from pathlib import Path
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # backend/ → app.indexing
+from app.indexing.embed_cache import EmbeddingCache
+from app.indexing.embed_engine import EmbedEngine
+from app.indexing.chunking import CHUNK_TOKENS, chunk_text, link_metadata
+from app.indexing.columns import write_columns
+from app.indexing.dedup import case_identity, cluster, minhash, save_signatures
+from app.indexing.compressed import INDEX_DIM, STORAGE, build_vectorstore, evaluate, read_compression, write_compression
+from app.indexing.providers import get_embeddings
+from app.indexing.normalize import ChromeModel, normalize_case
+from app.indexing.topics import TopicTagger
+from app.indexing.versions import new_build_dir, publish, write_manifest
+from corpus_store import CorpusStore, CORPUS_PATH
+from ingest_delta import CHROME_FILE, MANIFEST_FORMAT, PIPELINE, case_metadata, chunk_ids, save_metadata
 
 # ---------- Config ----------
-DATA_DIR = Path("../data/hklii_cache").resolve()
-INDEX_PATH = Path(os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")).resolve()
+INDEX_PATH = Path(os.getenv("LEXCHAIN_INDEX_PATH", "./data/indexes/faiss_v1")).resolve()  # root of builds/
 MODEL_NAME = os.getenv("LEXCHAIN_EMBED_MODEL", "text-embedding-3-large")
 
 # ---------- Step 1: Verify Inputs ----------
-if not DATA_DIR.exists():
-    raise FileNotFoundError(f"HKLII cache folder not found: {DATA_DIR}")
+if not CORPUS_PATH.exists():
+    raise FileNotFoundError(f"HKLII corpus not found: {CORPUS_PATH} (run: python tools/corpus_store.py migrate)")
 
 INDEX_PATH.mkdir(parents=True, exist_ok=True)
-print(f"[i] Using data from: {DATA_DIR}")
-print(f"[i] Saving index to: {INDEX_PATH}")
+print(f"[i] Using data from: {CORPUS_PATH}")
+print(f"[i] Publishing index under: {INDEX_PATH}")
 print(f"[i] Embedding model: {MODEL_NAME}")
 
-# ---------- Step 2: Prepare Splitter ----------
-splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=150)
-
-# ---------- Step 3: Gather Cases ----------
-case_files = sorted(DATA_DIR.glob("case_*.json"))
-if not case_files:
-    raise FileNotFoundError("No case_*.json files found in hklii_cache folder.")
-print(f"[i] Found {len(case_files)} case files.")
-
-texts, metas = [], []
-
-for fp in case_files:
-    try:
-        with open(fp, "r", encoding="utf-8") as f:
-            j = json.load(f)
-        content = j.get("content") or ""
-        if len(content) < 500:
-            continue  # skip short ones
-        chunks = splitter.split_text(content)
-        for c in chunks:
-            texts.append(c)
-            metas.append({
-                "source": j.get("url"),
-                "title": j.get("title"),
-                "court": j.get("court"),
-                "year": j.get("year"),
-                "path": fp.name
-            })
-    except Exception as e:
-        print(f"[x] Failed to read {fp.name}: {e}")
+print(f"[i] Chunk size: {CHUNK_TOKENS} tokens")
+print(f"[i] Index storage: {STORAGE}, dim: {INDEX_DIM or 'full'}")
+
+# ---------- Step 2: Gather Cases ----------
+cases = []        # (case_key, content_hash, metadata, normalized text)
+signatures, identities = {}, {}
+n_cases = raw_chars = norm_chars = 0
+
+with CorpusStore(readonly=True) as store:
+    print(f"[i] Corpus holds {store.count()} cases.")
+    chrome = ChromeModel.learn(j["content"] for j in store.iter_cases(min_length=500))
+    print(f"[i] Learned {len(chrome.ngrams)} chrome n-grams")
+    for j in store.iter_cases(min_length=500):  # skip short ones
+        n_cases += 1
+        norm = normalize_case(j["content"], chrome)
+        raw_chars += len(j["content"])
+        norm_chars += len(norm["text"])
+        meta = case_metadata(j, norm["fields"])
+        cases.append((j["case_key"], j["content_hash"], meta, norm["text"]))
+        signatures[j["case_key"]] = minhash(norm["text"])
+        identities[j["case_key"]] = case_identity(meta)
+
+if not n_cases:
+    raise FileNotFoundError("No cases with content found in the corpus store.")
+print(f"[i] Read {n_cases} cases; normalized {raw_chars} → {norm_chars} chars.")
+
+# Near-duplicates: the longest copy of each group is indexed, the others become its aliases
+aliases = cluster(signatures, identities, [c[0] for c in sorted(cases, key=lambda c: (-len(c[3]), c[0]))])
+by_canon = {}
+for alias, canon in sorted(aliases.items()):
+    by_canon.setdefault(canon, []).append(alias)
+print(f"[i] Near-duplicates: {len(aliases)} cases are aliases of {len(by_canon)} canonical cases.")
 
+texts, metas, ids, groups = [], [], [], []
+manifest_cases = {}
+for g, (key, content_hash, meta, text) in enumerate(cases):
+    if key in aliases:
+        manifest_cases[key] = {"content_hash": content_hash, "ids": [], "alias_of": aliases[key]}
+        continue
+    chunks = chunk_text(text, MODEL_NAME)
+    case_ids = chunk_ids(key, len(chunks))
+    if key in by_canon:
+        meta["aliases"] = by_canon[key]
+    texts.extend(chunks)
+    metas.extend({**meta, **links} for links in link_metadata(case_ids))
+    ids.extend(case_ids)
+    groups.extend([g] * len(chunks))
+    manifest_cases[key] = {"content_hash": content_hash, "ids": case_ids}
+    if key in by_canon:
+        manifest_cases[key]["aliases"] = by_canon[key]
 print(f"[i] Total text chunks prepared: {len(texts)}")
 
-# ---------- Step 4: Build & Save FAISS ----------
+# ---------- Step 3: Build & Save FAISS ----------
 if not texts:
     raise RuntimeError("No valid text chunks to index.")
 
-embeddings = OpenAIEmbeddings(model=MODEL_NAME)
-vs = FAISS.from_texts(texts, embeddings, metadatas=metas)
-vs.save_local(str(INDEX_PATH))
+embeddings = get_embeddings(MODEL_NAME)
+engine = EmbedEngine(embeddings, MODEL_NAME, cache=EmbeddingCache())
+vectors = engine.embed(texts)
+print(f"[i] Embedding cache hits: {engine.cache_hits}/{len(texts)} chunks")
+
+tagger = TopicTagger.from_engine(engine)
+tags = tagger.tag(vectors, groups)
+for meta, g in zip(metas, groups):
+    meta["topics"] = tags[g]
+for g, (key, *_) in enumerate(cases):
+    if key not in aliases:
+        manifest_cases[key]["topics"] = tags.get(g, [])
+print(f"[i] Tagged {sum(1 for t in tags.values() if t)}/{n_cases - len(aliases)} cases with {len(tagger.topics)} topics")
+
+vs = build_vectorstore(texts, vectors, embeddings, metadatas=metas, ids=ids)
+build_dir = new_build_dir(INDEX_PATH)
+vs.save_local(str(build_dir))
+chrome.save(build_dir / CHROME_FILE)
+columns = write_columns(vs, build_dir)
+save_signatures(signatures, identities, build_dir)
+print(f"[i] Column table: {len(columns)} rows, {len(columns.courts)} courts")
+
+# ---------- Step 4: Report memory and recall ----------
+report = evaluate(vs, vectors)
+print(f"[i] Index memory: {report['index_mb_per_million']} MB per million chunks "
+      f"(float32 flat: {report['float32_mb_per_million']} MB)")
+if "recall@10_reranked" in report:
+    print(f"[i] Recall@10 vs exact full-precision search: compressed {report['recall@10_compressed']}, "
+          f"re-ranked {report['recall@10_reranked']} (delta {report['recall@10_delta']:+})")
+    info = read_compression(build_dir)
+    info["report"] = report
+    write_compression(build_dir, info)
+# Manifest so the next delta ingest starts from this build
+save_metadata({"format": MANIFEST_FORMAT, "pipeline": PIPELINE,
+               "topics": tagger.signature(MODEL_NAME), "cases": manifest_cases}, build_dir)
+
+# ---------- Step 5: Publish ----------
+write_manifest(build_dir, vs, MODEL_NAME, pipeline=PIPELINE, source="ingest_vectorize", cases=n_cases)
+publish(build_dir, INDEX_PATH)
 
-print(f"[✓] Vector index successfully built and saved → {INDEX_PATH}")
+print(f"[✓] Vector index built and published → {build_dir}")
 print(f"[✓] Total chunks indexed: {len(texts)}")
 print(f"[✓] All systems green. LexChain memory ready.")
 
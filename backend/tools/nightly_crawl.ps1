@@ -44,7 +44,7 @@ try {
 }
 
 # Run the actual nightly crawl Python
-# (Assumes backend/tools/nightly_crawl.py exists and handles its own warmup + topics)
+# (Assumes backend/tools/nightly_crawl.py exists and runs its topics in one browser session)
 "Starting nightly_crawl.py ..." | Tee-Object -FilePath $LogFile -Append
 $cmd = "python .\tools\nightly_crawl.py"
 cmd /c $cmd 2>&1 | Tee-Object -FilePath $LogFile -Append
@@ -1,34 +1,28 @@
 # ===============================================================
 # LexChain Nightly Crawl — Randomized Topics Mode (Phase 1)
 # ===============================================================
-import os, sys, random, datetime as dt
+import os, sys, random, asyncio, datetime as dt
 from pathlib import Path
 
-# --- Playwright dispatcher: call existing CLI script safely ---
-def run_playwright_query(topic: str):
+# --- Playwright session: one browser for the whole night ---
+def run_playwright_queries(topics: list[str]) -> list[dict]:
     """
-    Calls tools/hklii_playwright_extract.py via CLI:
-      python tools/hklii_playwright_extract.py --query "<topic>" [--max N] [--headful]
+    Runs every topic through one CrawlerSession (tools/hklii_playwright_extract.py):
+    one Chromium launch, one context with persisted cookies, no images/fonts/media.
+    Case URLs are leased from the shared frontier (tools/frontier.py), so cases
+    already fetched by index_walk / historical_sweep — or by an earlier topic
+    tonight — are skipped.
     Env controls:
-      MAX_LINKS: int (default 5)
-      HEADFUL  : "1" to open browser (default off/headless)
+      MAX_LINKS  : int (default 5)
+      HEADFUL    : "1" to open browser (default off/headless)
+      LEXCHAIN_CRAWL_SCREENSHOTS: "1" to keep results-page HTML/PNG for debugging
     """
-    import subprocess
+    sys.path.insert(0, str(Path(__file__).parent))
+    from hklii_playwright_extract import run_many
 
-    TOOLS_DIR = Path(__file__).parent
-    script = TOOLS_DIR / "hklii_playwright_extract.py"
-    if not script.exists():
-        raise FileNotFoundError(f"Cannot find Playwright script: {script}")
-
-    max_links = os.getenv("MAX_LINKS", "5")
+    max_links = int(os.getenv("MAX_LINKS", "5"))
     headful   = os.getenv("HEADFUL", "0") == "1"
-
-    cmd = [sys.executable, str(script), "--query", topic, "--max", str(max_links)]
-    if headful:
-        cmd.append("--headful")
-
-    print(f"[i] Starting Playwright for query: {topic}")
-    subprocess.run(cmd, check=True)
+    return asyncio.run(run_many(topics, max_results=max_links, headful=headful, tool="nightly_crawl"))
 
 # ---------- Topic rotation helpers ----------
 def load_all_topics(topics_file: Path) -> list[str]:
@@ -50,12 +44,6 @@ def pick_tonight_topics(all_topics: list[str], k: int) -> list[str]:
     rng.shuffle(topics)
     return topics[:k]
 
-# ---------- Warm-up ----------
-def warmup():
-    print("[i] Warming up Playwright browser...")
-    run_playwright_query("warmup")
-    print("[✓] Warm-up complete. Beginning main crawl...")
-
 # ---------- Main ----------
 def main():
     TOOLS_DIR = Path(__file__).parent
@@ -73,15 +61,13 @@ def main():
         print("[i] DRY_RUN=1 → not crawling, just listing topics.")
         return
 
-    warmup()
-
-    for idx, topic in enumerate(tonight_topics, 1):
-        print(f"[{dt.datetime.now():%H:%M:%S}] ({idx}/{len(tonight_topics)}) Starting: {topic}")
-        try:
-            run_playwright_query(topic)
-            print(f"[✓] Finished: {topic} at {dt.datetime.now():%H:%M:%S}")
-        except Exception as e:
-            print(f"[!] ERROR topic='{topic}': {e}")
+    summaries = run_playwright_queries(tonight_topics)
+    for idx, s in enumerate(summaries, 1):
+        if "error" in s:
+            print(f"[!] ({idx}/{len(summaries)}) ERROR topic='{s['query']}': {s['error']}")
+        else:
+            print(f"[✓] ({idx}/{len(summaries)}) {s['query']}: {s['total_extracted']}/{s['total_found']} cases"
+                  f" ({s['total_skipped']} already fetched)")
 
     print(f"=== Nightly Crawl Finished at {dt.datetime.now():%Y-%m-%d %H:%M:%S} ===")
 
@@ -0,0 +1,160 @@
+# ==========================================================
+# LexChain — Per-Host Politeness Limiter (asyncio)
+# ==========================================================
+# Every request to a host takes a token from that host's
+# bucket (LEXCHAIN_CRAWL_RPS tokens/second, bursts of up to
+# LEXCHAIN_CRAWL_BURST) and holds one of its
+# LEXCHAIN_CRAWL_CONCURRENCY slots while in flight. Crawl
+# throughput is therefore set by the politeness budget, not
+# by how slow individual pages are.
+#
+#   limiter = HostLimiter()
+#   async with limiter.slot(url) as t:
+#       r = await client.get(url)
+#       t.status = r.status_code
+#
+# With adaptive=True each host's rate is steered by AIMD:
+# every fast, successful response adds a little to the rate;
+# a 429/503, a transport error or a response slower than
+# LEXCHAIN_CRAWL_TARGET_LATENCY cuts it multiplicatively
+# (and a Retry-After empties the bucket for that long).
+# ==========================================================
+import asyncio, os, time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+# ---------- Config ----------
+CRAWL_RPS = float(os.getenv("LEXCHAIN_CRAWL_RPS", "0.5"))          # requests per second per host
+CRAWL_BURST = int(os.getenv("LEXCHAIN_CRAWL_BURST", "2"))
+CRAWL_CONCURRENCY = int(os.getenv("LEXCHAIN_CRAWL_CONCURRENCY", "4"))  # in-flight requests per host
+# adaptive (AIMD) mode
+MIN_RPS = float(os.getenv("LEXCHAIN_CRAWL_MIN_RPS", "0.05"))
+MAX_RPS = float(os.getenv("LEXCHAIN_CRAWL_MAX_RPS", "2.0"))
+RPS_STEP = float(os.getenv("LEXCHAIN_CRAWL_RPS_STEP", "0.02"))          # additive increase per good response
+TARGET_LATENCY = float(os.getenv("LEXCHAIN_CRAWL_TARGET_LATENCY", "4.0"))  # seconds
+THROTTLE_STATUSES = {429, 503}
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; acquire() waits for one."""
+
+    def __init__(self, rate: float = CRAWL_RPS, burst: int = CRAWL_BURST):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:  # FIFO: waiters are served in arrival order
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Owe `seconds` worth of tokens, so the next acquire waits that long."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease of one host's request rate.
+    After a cut, further bad signals are ignored for one delay interval, so
+    responses already in flight when the host pushed back count once.
+    """
+
+    def __init__(self, rate: float = CRAWL_RPS, min_rate: float = MIN_RPS, max_rate: float = MAX_RPS,
+                 step: float = RPS_STEP, target_latency: float = TARGET_LATENCY):
+        self.min_rate = min_rate
+        self.max_rate = max(min_rate, max_rate)
+        self.rate = min(self.max_rate, max(min_rate, rate))
+        self.step = step
+        self.target_latency = target_latency
+        self._hold_until = 0.0
+        self.counts = {"ok": 0, "slow": 0, "throttled": 0, "error": 0}
+
+    def record(self, latency: float, status: Optional[int] = None, error: bool = False) -> float:
+        if error or (status is not None and status >= 500 and status not in THROTTLE_STATUSES):
+            kind, factor = "error", 0.7
+        elif status in THROTTLE_STATUSES:
+            kind, factor = "throttled", 0.5
+        elif latency > self.target_latency:
+            kind, factor = "slow", 0.8
+        else:
+            kind, factor = "ok", None
+        self.counts[kind] += 1
+        now = time.monotonic()
+        if factor is None:
+            self.rate = min(self.max_rate, self.rate + self.step)
+        elif now >= self._hold_until:
+            self.rate = max(self.min_rate, self.rate * factor)
+            self._hold_until = now + 1 / self.rate
+        return self.rate
+
+class Ticket:
+    """Yielded by HostLimiter.slot(); set .status (and .retry_after) from the response."""
+    __slots__ = ("status", "retry_after")
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.retry_after: Optional[float] = None
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:  # HTTP-date form: not worth parsing, fall back to AIMD alone
+        return None
+
+class HostLimiter:
+    """Token bucket plus concurrency cap (and, if adaptive, an AIMD controller) per host."""
+
+    def __init__(self, rate: float = CRAWL_RPS, burst: int = CRAWL_BURST, concurrency: int = CRAWL_CONCURRENCY,
+                 adaptive: bool = False):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = max(1, concurrency)
+        self.adaptive = adaptive
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self.controllers: Dict[str, AIMDController] = {}
+        self.requests = 0
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    @asynccontextmanager
+    async def slot(self, url: str, host: Optional[str] = None):
+        host = host or self._host(url)
+        if host not in self._slots:
+            self._slots[host] = asyncio.Semaphore(self.concurrency)
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+            if self.adaptive:
+                self.controllers[host] = AIMDController(self.rate)
+        async with self._slots[host]:
+            bucket = self._buckets[host]
+            await bucket.acquire()
+            self.requests += 1
+            ticket = Ticket()
+            start = time.monotonic()
+            try:
+                yield ticket
+            except Exception:
+                if host in self.controllers:
+                    bucket.rate = self.controllers[host].record(time.monotonic() - start, error=True)
+                raise
+            if host in self.controllers:
+                bucket.rate = self.controllers[host].record(time.monotonic() - start, ticket.status)
+            if ticket.retry_after:
+                bucket.pause(ticket.retry_after)
+
+    def current_rate(self, url: str) -> float:
+        """Requests/second currently allowed for the host of `url`."""
+        bucket = self._buckets.get(self._host(url))
+        return bucket.rate if bucket else self.rate
@@ -0,0 +1,89 @@
+# ==========================================================
+# LexChain — Revisit Policy for Cached Judgments
+# ==========================================================
+# Purpose:
+#   Decide when a case already in the corpus is worth
+#   fetching again. The frontier (frontier.py) keeps, per
+#   case, the content hash of the last fetch, how often it
+#   was checked and how often it had changed; this module
+#   turns that plus the judgment's age into
+#
+#   • an interval until the next check — halved when a check
+#     finds changed text, grown ×1.5 when it does not, and
+#     capped by age (a judgment from last month is looked at
+#     within a week, one from the 1990s at most every two
+#     years), and
+#   • a priority among due cases — the estimated chance the
+#     text changed since the last fetch, from a Poisson
+#     change rate, so a limited budget goes to recent and
+#     recently amended judgments first.
+#
+# Age comes from the neutral-citation year in the case key
+# (en/cases/<court>/<year>/<n>), refined by the judgment
+# date when the two agree.
+# ==========================================================
+import math, os, random, re, time
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+# ---------- Config ----------
+DAY = 86400.0
+MIN_INTERVAL = 1 * DAY
+# (max age in days, longest interval between checks in days)
+AGE_TIERS = ((90, 7), (365, 30), (3 * 365, 90), (10 * 365, 365))
+OLDEST_INTERVAL_DAYS = 730
+GROW, SHRINK = 1.5, 0.5
+REVISIT_BUDGET = int(os.getenv("LEXCHAIN_REVISIT_BUDGET", "50"))   # re-fetches per run
+
+_KEY_YEAR = re.compile(r"/(\d{4})/")
+
+def decided_on(case_key: str, date_str: Optional[str] = None) -> Optional[date]:
+    """Judgment date: the case date if it falls in the key's citation year, else mid-year."""
+    m = _KEY_YEAR.search("/" + case_key)
+    year = int(m.group(1)) if m else None
+    if date_str:
+        try:
+            d = datetime.strptime(date_str[:10], "%Y-%m-%d").date()
+            if year is None or d.year == year:
+                return d
+        except ValueError:
+            pass
+    return date(year, 7, 1) if year else None
+
+def age_days(case_key: str, date_str: Optional[str] = None, now: Optional[float] = None) -> float:
+    d = decided_on(case_key, date_str)
+    if d is None:
+        return OLDEST_INTERVAL_DAYS  # unknown: treat as an established judgment
+    today = date.fromtimestamp(now or time.time())
+    return max(0.0, float((today - d).days))
+
+def max_interval(age: float) -> float:
+    """Longest gap between checks for a judgment `age` days old, in seconds."""
+    for limit, days in AGE_TIERS:
+        if age <= limit:
+            return days * DAY
+    return OLDEST_INTERVAL_DAYS * DAY
+
+def next_interval(prev: Optional[float], changed: bool, age: float, first: bool = False) -> float:
+    """Seconds until the next check; the first fetch of a case starts at its age cap."""
+    cap = max_interval(age)
+    if first:
+        return cap
+    return min(cap, max(MIN_INTERVAL, (prev or cap) * (SHRINK if changed else GROW)))
+
+def initial_due(age: float, now: Optional[float] = None) -> float:
+    """First check for a case seeded without history, spread over its interval."""
+    return (now or time.time()) + random.uniform(0.1, 1.0) * max_interval(age)
+
+def change_probability(row: Dict[str, Any], now: Optional[float] = None) -> float:
+    """
+    P(text changed since the last fetch) under a Poisson model whose rate is
+    (changes + ½) over the observed span plus one age-capped interval — so a
+    case never seen to change still gets a small, age-dependent rate.
+    """
+    now = now or time.time()
+    age = age_days(row["case_key"], row.get("decided"), now)
+    span = max(0.0, (row.get("last_fetch") or now) - (row.get("added_at") or now)) + max_interval(age)
+    rate = ((row.get("changes") or 0) + 0.5) / span
+    elapsed = max(0.0, now - (row.get("last_fetch") or row.get("added_at") or now))
+    return 1.0 - math.exp(-rate * elapsed)